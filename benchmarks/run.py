@@ -0,0 +1,154 @@
+"""
+Benchmarks for the codec, the client and fleet-scale polling against the simulator.
+
+Run from the repository root:
+
+    python3 -m benchmarks.run --output bench.json
+
+Results are written as JSON, so runs of different releases can be compared.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List
+
+from blaubergvento_client.client.client import Client, READ_TEMPLATE
+from blaubergvento_client.client.device import Device
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.packet import Packet
+from blaubergvento_client.simulator import Simulator, VirtualDevice
+
+FLEET_SIZES = [10, 100, 1000]
+LOSS_RATES = [0.0, 0.01]
+
+
+def _rate(func: Callable[[], object], min_time: float) -> Dict[str, float]:
+    """Measures how many times per second a function can be called."""
+    timer = timeit.Timer(func)
+    # autorange finds a number of calls taking at least 0.2 seconds
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    return {"ops_per_second": 1 / best, "seconds_per_op": best}
+
+
+def _latencies(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def bench_codec(min_time: float) -> List[dict]:
+    device = VirtualDevice("BENCH00000000001")
+    request = READ_TEMPLATE.to_packet(device.id, device.password)
+    response = device.respond([e.parameter for e in request.data_entries])
+    response_bytes = response.to_bytes()
+    write = Device.from_packet(response).to_packet(all_fields=True)
+
+    return [
+        {"name": "packet.to_bytes", "params": {"function": "READ"}, "metrics": _rate(request.to_bytes, min_time)},
+        {"name": "packet.to_bytes", "params": {"function": "WRITEREAD"}, "metrics": _rate(write.to_bytes, min_time)},
+        {
+            "name": "request_template.to_bytes",
+            "params": {"function": "READ"},
+            "metrics": _rate(lambda: READ_TEMPLATE.to_bytes(device.id, device.password), min_time),
+        },
+        {
+            "name": "packet.from_bytes",
+            "params": {"function": "RESPONSE", "size": len(response_bytes)},
+            "metrics": _rate(lambda: Packet.from_bytes(response_bytes), min_time),
+        },
+        {"name": "device.from_packet", "params": {}, "metrics": _rate(lambda: Device.from_packet(response), min_time)},
+    ]
+
+
+async def _simulated_client(simulator: Simulator) -> Client:
+    await simulator.start("127.0.0.1", 0)
+    host, port = simulator.address
+    client = Client(client=ProtocolClient(port=port, broadcast_address=host), concurrency=256)
+    for device_id in simulator.devices:
+        client.registry.put(device_id, host)
+    return client
+
+
+async def bench_find_all(runs: int) -> List[dict]:
+    simulator = Simulator.create(20, latency=0.001)
+    client = await _simulated_client(simulator)
+    try:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            devices = await client.find_all(page=0, size=20)
+            samples.append(time.perf_counter() - start)
+            assert len(devices) == 20
+    finally:
+        client.client.close()
+        simulator.close()
+    return [{"name": "client.find_all", "params": {"size": 20, "latency": 0.001}, "metrics": _latencies(samples)}]
+
+
+async def bench_fleet(sizes: List[int], loss_rates: List[float]) -> List[dict]:
+    results = []
+    for size in sizes:
+        for loss in loss_rates:
+            simulator = Simulator.create(size, latency=0.001, jitter=0.004, loss=loss, seed=size)
+            client = await _simulated_client(simulator)
+            try:
+                start = time.perf_counter()
+                resolved = 0
+                async for _ in client.iter_devices():
+                    resolved += 1
+                duration = time.perf_counter() - start
+            finally:
+                client.client.close()
+                simulator.close()
+            results.append({
+                "name": "fleet.poll",
+                "params": {"devices": size, "loss": loss},
+                "metrics": {
+                    "seconds": duration,
+                    "devices_per_second": resolved / duration,
+                    "resolved": resolved,
+                    "datagrams_received_by_simulator": simulator.requests,
+                },
+            })
+    return results
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results = bench_codec(args.min_time)
+    results += await bench_find_all(args.runs)
+    results += await bench_fleet(args.fleet_sizes, LOSS_RATES)
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the blaubergvento_client benchmarks.")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum time per codec measurement")
+    parser.add_argument("--runs", type=int, default=50, help="number of find_all calls to measure")
+    parser.add_argument("--fleet-sizes", type=int, nargs="+", default=FLEET_SIZES, help="fleet sizes to poll")
+    arguments = parser.parse_args()
+
+    report = asyncio.run(run(arguments))
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
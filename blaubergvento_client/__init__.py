@@ -1,7 +1,29 @@
-from blaubergvento_client.protocol_client import ProtocolClient
-from .client import Client
+import importlib
+
+# The classes are imported on first access, so tools such as the command line interface start quickly
+_EXPORTS = {
+    "ProtocolClient": "blaubergvento_client.protocol_client",
+    "Client": "blaubergvento_client.client",
+    "DeviceRegistry": "blaubergvento_client.client",
+    "SyncClient": "blaubergvento_client.client",
+}
 
 __all__ = [
     "ProtocolClient",
     "Client",
-]
\ No newline at end of file
+    "DeviceRegistry",
+    "SyncClient",
+]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,244 @@
+"""
+Command line interface for managing a fleet of devices.
+
+Every command writes one JSON object per line to standard output as results arrive, so the output can be piped into
+tools such as `jq`. The client classes are imported when a command runs rather than at startup, so `--help` and
+argument errors return immediately.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+# The Device attributes written for each device, in output order
+DEVICE_FIELDS = (
+    "ip_address",
+    "on",
+    "mode",
+    "speed",
+    "manual_speed",
+    "fan1_rpm",
+    "humidity",
+    "filter_alarm",
+    "filter_time",
+    "firmware_version",
+    "firmware_date",
+    "unit_type",
+)
+
+SPEEDS = {"off": 0, "low": 1, "medium": 2, "high": 3, "manual": 255}
+MODES = {"oneway": 0, "twoway": 1, "in": 2}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the command line interface.
+
+    :param argv: The arguments, defaults to `sys.argv[1:]`.
+    :return: The exit code: 0 on success, 1 if a device did not answer or a command failed.
+    """
+    args = _parser().parse_args(argv)
+    import asyncio
+
+    try:
+        return asyncio.run(args.command(args))
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # The reader of the output went away, e.g. `blaubergvento scan | head -1`
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+
+
+async def scan(args: argparse.Namespace) -> int:
+    client = _create_client(args)
+    async for address in client.client.discover(timeout=args.timeout):
+        client.registry.put(address.id, address.ip)
+        _write({"id": address.id, "ip": address.ip})
+    client.registry.save()
+    client.client.close()
+    return 0
+
+
+async def get(args: argparse.Namespace) -> int:
+    import asyncio
+
+    client = _create_client(args)
+    failed = False
+    if args.devices:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def read(device_id: str):
+            async with semaphore:
+                return device_id, await client.find_by_id(device_id)
+
+        for future in asyncio.as_completed([read(device_id) for device_id in args.devices]):
+            device_id, device = await future
+            if device is None:
+                failed = True
+                _write({"id": device_id, "error": "No response"})
+            else:
+                _write(_device_json(device))
+    else:
+        async for device in client.iter_devices():
+            _write(_device_json(device))
+    client.client.close()
+    return 1 if failed else 0
+
+
+async def set_(args: argparse.Namespace) -> int:
+    changes = {
+        field: getattr(args, field)
+        for field in ("speed", "mode", "manual_speed", "on")
+        if getattr(args, field) is not None
+    }
+    if not changes:
+        _parser().error("set: nothing to change, pass --speed, --mode, --manual-speed, --on or --off")
+    if not args.devices and not args.all:
+        _parser().error("set: pass device ids or --all")
+
+    client = _create_client(args)
+    selector = (lambda device: True) if args.all else args.devices
+    failed = False
+    for result in await client.apply(selector, stagger=args.stagger, **changes):
+        failed = failed or not result.success
+        line = {"id": result.device_id, "success": result.success, "latency": round(result.latency, 4)}
+        if result.device is not None:
+            line["device"] = _device_json(result.device)
+        if result.error is not None:
+            line["error"] = result.error
+        _write(line)
+    client.client.close()
+    return 1 if failed else 0
+
+
+async def watch(args: argparse.Namespace) -> int:
+    import asyncio
+
+    client = _create_client(args)
+    fields = args.fields.split(",") if args.fields else None
+    unknown = [field for field in fields or () if field not in DEVICE_FIELDS]
+    if unknown:
+        _parser().error(f"watch: unknown fields: {', '.join(unknown)}")
+    intervals = None
+    if args.interval is not None:
+        from blaubergvento_client.client.poller import DEFAULT_INTERVALS
+        from blaubergvento_client.client.device import PARAMETER_FIELDS
+
+        intervals = {
+            parameter: args.interval for parameter in DEFAULT_INTERVALS
+            if fields is None or set(fields).intersection(PARAMETER_FIELDS.get(parameter, ()))
+        }
+    devices = set(args.devices)
+
+    async def stream():
+        async for event in client.subscribe(fields, intervals):
+            if not devices or event.device_id in devices:
+                _write({"id": event.device_id, "time": round(event.time, 3), "changes": event.changes})
+
+    try:
+        await asyncio.wait_for(stream(), args.duration)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        client.client.close()
+    return 0
+
+
+def _create_client(args: argparse.Namespace):
+    from blaubergvento_client.client.client import Client
+    from blaubergvento_client.client.registry import DeviceRegistry
+    from blaubergvento_client.protocol_client.client import ProtocolClient
+
+    options = {"interfaces": args.interfaces, "subnets": args.subnet, "sweep": args.sweep}
+    if args.timeout is not None:
+        options["timeout"] = args.timeout
+    if args.port is not None:
+        options["port"] = args.port
+    if args.broadcast is not None:
+        options["broadcast_address"] = args.broadcast
+    if args.rate is not None or args.device_rate is not None:
+        from blaubergvento_client.protocol_client.rate_limiter import RateLimiter
+
+        options["rate_limiter"] = RateLimiter(rate=args.rate, device_rate=args.device_rate, aimd=args.aimd)
+    registry = DeviceRegistry(path=args.registry) if args.registry else None
+    return Client(concurrency=args.concurrency, registry=registry, client=ProtocolClient(**options))
+
+
+def _device_json(device) -> dict:
+    result = {"id": device.id}
+    for field in DEVICE_FIELDS:
+        value = getattr(device, field)
+        result[field] = value.isoformat() if isinstance(value, datetime) else value
+    return result
+
+
+def _write(line: dict):
+    sys.stdout.write(json.dumps(line) + "\n")
+    sys.stdout.flush()
+
+
+def _choice(choices: dict):
+    def parse(value: str) -> int:
+        if value.lower() in choices:
+            return choices[value.lower()]
+        try:
+            return int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected one of {', '.join(choices)} or a number, got {value!r}")
+
+    return parse
+
+
+def _parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--timeout", type=float, help="seconds to listen for search replies")
+    common.add_argument("--port", type=int, help="UDP port of the controllers")
+    common.add_argument("--broadcast", help="address to broadcast search packets to")
+    common.add_argument("--interfaces", action="store_true", help="also broadcast on every network interface")
+    common.add_argument("--subnet", action="append", default=[], metavar="CIDR",
+                        help="also broadcast on this subnet, may be repeated")
+    common.add_argument("--sweep", action="append", default=[], metavar="CIDR",
+                        help="send unicast searches to every host of this subnet, may be repeated")
+    common.add_argument("--concurrency", type=int, default=32, help="maximum number of devices queried at once")
+    common.add_argument("--rate", type=float, help="maximum number of packets sent per second in total")
+    common.add_argument("--device-rate", type=float, help="maximum number of packets sent per second to each device")
+    common.add_argument("--aimd", action="store_true",
+                        help="lower the rates when packets are lost and raise them again when they are not")
+    common.add_argument("--registry", metavar="PATH",
+                        help="JSON file caching device addresses between runs, which skips discovery")
+
+    parser = argparse.ArgumentParser(prog="blaubergvento", description="Manage Blauberg Vento ventilators.")
+    commands = parser.add_subparsers(required=True, metavar="command")
+
+    command = commands.add_parser("scan", parents=[common], help="discover devices")
+    command.set_defaults(command=scan)
+
+    command = commands.add_parser("get", parents=[common], help="read the state of devices")
+    command.add_argument("devices", nargs="*", metavar="DEVICE_ID", help="devices to read, defaults to all")
+    command.set_defaults(command=get)
+
+    command = commands.add_parser("set", parents=[common], help="change the state of devices")
+    command.add_argument("devices", nargs="*", metavar="DEVICE_ID", help="devices to change")
+    command.add_argument("--all", action="store_true", help="change all discovered devices")
+    command.add_argument("--speed", type=_choice(SPEEDS), help=f"{', '.join(SPEEDS)} or a number")
+    command.add_argument("--mode", type=_choice(MODES), help=f"{', '.join(MODES)} or a number")
+    command.add_argument("--manual-speed", type=int, help="speed (0-255) used when the speed is manual")
+    command.add_argument("--on", action="store_const", const=True, help="turn on")
+    command.add_argument("--off", action="store_const", const=False, dest="on", help="turn off")
+    command.add_argument("--stagger", type=float, default=0.0, help="seconds between consecutive devices")
+    command.set_defaults(command=set_)
+
+    command = commands.add_parser("watch", parents=[common], help="stream changes of devices")
+    command.add_argument("devices", nargs="*", metavar="DEVICE_ID", help="devices to watch, defaults to all")
+    command.add_argument("--fields", help=f"comma separated fields to watch, from {', '.join(DEVICE_FIELDS)}")
+    command.add_argument("--interval", type=float, help="seconds between polls of each field")
+    command.add_argument("--duration", type=float, help="stop after this many seconds")
+    command.set_defaults(command=watch)
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,22 @@
+from .change_event import ChangeEvent
 from .client import Client
+from .command_result import CommandResult
+from .fleet_manager import FleetManager
+from .fleet_snapshot import FleetSnapshot
+from .poller import Poller, PollResult
+from .read_cache import ReadCache
+from .registry import DeviceRegistry
+from .sync_client import SyncClient
 
-__all__ = ['Client']
\ No newline at end of file
+__all__ = [
+    'ChangeEvent',
+    'Client',
+    'CommandResult',
+    'DeviceRegistry',
+    'FleetManager',
+    'FleetSnapshot',
+    'Poller',
+    'PollResult',
+    'ReadCache',
+    'SyncClient',
+]
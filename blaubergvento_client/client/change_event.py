@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class ChangeEvent:
+    """
+    The fields of a device that changed between two polls.
+    """
+
+    device_id: str
+    """The id of the device."""
+
+    changes: Dict[str, Any]
+    """The new value of each changed Device attribute, e.g. `{"humidity": 62}`."""
+
+    time: float
+    """The time (seconds since the epoch) the change was observed."""
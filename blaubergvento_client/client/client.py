@@ -1,68 +1,479 @@
-from typing import Optional, Dict
+import asyncio
+import time
+from typing import (
+    AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple, TypeVar, Union
+)
 
-from blaubergvento_client.client.device import Device
+from blaubergvento_client.client.change_event import ChangeEvent
+from blaubergvento_client.client.command_result import CommandResult
+from blaubergvento_client.client.device import Device, PARAMETER_FIELDS, WRITABLE_FIELDS
+from blaubergvento_client.client.poller import DEFAULT_INTERVALS, Poller
+from blaubergvento_client.client.read_cache import ReadCache
+from blaubergvento_client.client.registry import DeviceRegistry
 from blaubergvento_client.protocol_client.client import ProtocolClient
 from blaubergvento_client.protocol_client.data_entry import DataEntry
 from blaubergvento_client.protocol_client.function_type import FunctionType
 from blaubergvento_client.protocol_client.packet import Packet
+from blaubergvento_client.protocol_client.packing import merge_responses
 from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.protocol_client.request_template import RequestTemplate
+from blaubergvento_client.protocol_client.response import Response
+from blaubergvento_client.protocol_client.transport import packet_parameters
+
+DEFAULT_CONCURRENCY = 32
+DEFAULT_REDISCOVERY_INTERVAL = 30.0  # seconds
+DEFAULT_PASSWORD = "1111"
+
+# The parameters read to resolve the state of a device
+READ_PARAMETERS = [
+    Parameter.ON_OFF,
+    Parameter.VENTILATION_MODE,
+    Parameter.SPEED,
+    Parameter.MANUAL_SPEED,
+    Parameter.FAN1RPM,
+    Parameter.FILTER_ALARM,
+    Parameter.FILTER_TIMER,
+    Parameter.CURRENT_HUMIDITY,
+    Parameter.READ_FIRMWARE_VERSION,
+    Parameter.CURRENT_IP_ADDRESS
+]
+
+# The request used to read the state of a device, compiled once for all devices
+READ_TEMPLATE = RequestTemplate(FunctionType.READ, [DataEntry.of(p) for p in READ_PARAMETERS])
+READ_PARAMETER_SET = frozenset(READ_PARAMETERS)
+
+T = TypeVar("T")
 
 
 class Client:
-    def __init__(self):
-        self.client = ProtocolClient()
-        self._ip_map: Optional[Dict[str, str]] = None
+    def __init__(
+            self,
+            concurrency: int = DEFAULT_CONCURRENCY,
+            registry: Optional[DeviceRegistry] = None,
+            rediscovery_interval: Optional[float] = DEFAULT_REDISCOVERY_INTERVAL,
+            client: Optional[ProtocolClient] = None,
+            cache: Optional[ReadCache] = None
+    ):
+        """
+        Creates a new Client.
+
+        :param concurrency: The maximum number of devices queried at the same time.
+        :param registry: The registry of device addresses. Defaults to an in-memory registry.
+        :param rediscovery_interval: The minimum time in seconds between two discoveries, or None to never discover,
+                                     for clients whose registry is maintained by someone else.
+        :param client: The protocol client to communicate through. Defaults to a new client with default settings.
+        :param cache: Optional cache answering reads of recently read parameters without contacting the device.
+        """
+        self.client = client if client is not None else ProtocolClient()
+        self.concurrency = concurrency
+        self.registry = registry if registry is not None else DeviceRegistry()
+        self.rediscovery_interval = rediscovery_interval
+        self._discovery: Optional[asyncio.Future] = None
+        self._last_discovery: Optional[float] = None
+        self._discovered_at: Optional[float] = None
+        self.cache = cache
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        # Counted up when a write to a device starts and when it completes, so reads never join an older read
+        self._writes: Dict[str, int] = {}
+
+    async def find_all(self, page: int = 0, size: int = 20, timeout: Optional[float] = None) -> list[Device]:
+        """
+        Resolves a page of devices concurrently.
 
-    async def find_all(self, page: int = 0, size: int = 20) -> list[Device]:
-        ip_map = await self._resolve_ip_map()
-        device_addresses = list(ip_map.items())
+        :param page: The page number, starting from 0.
+        :param size: The number of devices per page.
+        :param timeout: Optional deadline in seconds for the whole call. Devices not resolved in time are left out.
+        :return: The resolved devices in discovery order.
+        """
+        device_addresses = await self.device_addresses()
 
         start = page * size
         end = start + size
         device_addresses = device_addresses[start:end]
 
-        devices = []
-        for device_id, ip in device_addresses:
-            device = await self._resolve_device(device_id, ip)
-            if device:
-                devices.append(device)
+        resolved = {}
+        async for device in self._iter_resolved(device_addresses, timeout):
+            resolved[device.id] = device
 
-        return devices
+        return [resolved[device_id] for device_id, _ in device_addresses if device_id in resolved]
+
+    async def iter_devices(self, timeout: Optional[float] = None) -> AsyncIterator[Device]:
+        """
+        Resolves all known devices concurrently, yielding each device as soon as its response arrives.
+
+        At most `concurrency` requests are in flight at any time, so memory use does not grow with the
+        size of the fleet.
+
+        :param timeout: Optional deadline in seconds for the whole iteration.
+        :return: An async iterator of devices in order of arrival.
+        """
+        async for device in self._iter_resolved(await self.device_addresses(), timeout):
+            yield device
 
     async def find_by_id(self, device_id: str) -> Optional[Device]:
-        ip = (await self._resolve_ip_map()).get(device_id)
+        ip = await self._lookup(device_id)
+        if ip is None:
+            return None
         return await self._resolve_device(device_id, ip)
 
     async def save(self, entity: Device) -> Optional[Device]:
-        ip = (await self._resolve_ip_map()).get(entity.id)
-        response = await self.client.send(entity.to_packet(), ip)
-        return Device.from_packet(response.packet) if response else None
+        """
+        Writes the modified properties of a device and reads them back.
+
+        Only the properties assigned since the device was loaded are written, so values changed in the meantime by
+        another controller are not overwritten. The values read back are applied to the given device. Cached values
+        of the device are invalidated.
+
+        :param entity: The device to save.
+        :return: The device, or None if the device did not answer.
+        """
+        if not entity.dirty_fields:
+            return entity
+        ip = await self._lookup(entity.id)
+        if ip is None:
+            return None
+        return await self._write(entity, ip)
+
+    async def save_many(self, entities: Iterable[Device], stagger: float = 0.0) -> List[CommandResult]:
+        """
+        Saves many devices concurrently.
+
+        :param entities: The devices to save.
+        :param stagger: Optional delay in seconds between starting consecutive saves, in the order given, e.g. to
+                        let paired two-way units alternate direction.
+        :return: The result for each device, in the order given.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def save_one(index: int, entity: Device) -> CommandResult:
+            if stagger:
+                await asyncio.sleep(index * stagger)
+            async with semaphore:
+                start = time.monotonic()
+                try:
+                    if not entity.dirty_fields:
+                        device = entity
+                    else:
+                        # The latency covers the command, not looking up the device
+                        ip = await self._lookup(entity.id)
+                        start = time.monotonic()
+                        device = await self._write(entity, ip) if ip is not None else None
+                except (OSError, ValueError) as e:
+                    return CommandResult(entity.id, False, time.monotonic() - start, error=str(e))
+                latency = time.monotonic() - start
+            if device is None:
+                return CommandResult(entity.id, False, latency, error="No response")
+            return CommandResult(entity.id, True, latency, device=device)
+
+        return list(await asyncio.gather(*(save_one(i, entity) for i, entity in enumerate(entities))))
+
+    async def apply(
+            self,
+            selector: Union[Iterable[str], Callable[[Device], bool]],
+            stagger: float = 0.0,
+            **changes
+    ) -> List[CommandResult]:
+        """
+        Applies the same changes to a group of devices concurrently, e.g. `apply(bedrooms, speed=Speed.LOW)`.
+
+        :param selector: The ids of the devices, or a predicate selecting devices by their current state.
+        :param stagger: Optional delay in seconds between starting consecutive saves.
+        :param changes: The writable properties to change and their new values.
+        :return: The result for each device. For devices selected by id, the state is read back after the write, and
+                 the device of a result is None if it could not be read.
+        :raises ValueError: If a change is not a writable property.
+        """
+        invalid = [field for field in changes if field not in WRITABLE_FIELDS]
+        if invalid:
+            raise ValueError(f"Not writable: {', '.join(invalid)}")
+
+        if callable(selector):
+            entities = [device async for device in self.iter_devices() if selector(device)]
+        else:
+            entities = [Device(device_id, DEFAULT_PASSWORD) for device_id in selector]
+        for entity in entities:
+            for field, value in changes.items():
+                setattr(entity, field, value)
+        results = await self.save_many(entities, stagger)
+        if not callable(selector):
+            # The devices were created without their state, which is read back rather than reporting defaults
+            saved = [(result.device_id, self.registry.get(result.device_id)) for result in results if result.success]
+            saved = [(device_id, ip) for device_id, ip in saved if ip is not None]
+            devices = {device.id: device async for device in self._iter_resolved(saved, None)}
+            for result in results:
+                if result.success:
+                    result.device = devices.get(result.device_id)
+        return results
+
+    async def read_parameters(
+            self,
+            device_id: str,
+            parameters: Iterable[Parameter],
+            cached: bool = True
+    ) -> Optional[Response]:
+        """
+        Reads an arbitrary set of parameters from a device, using as few packets as possible.
+
+        Concurrent reads of the same parameters from the same device share one request.
+
+        :param device_id: The id of the device.
+        :param parameters: The parameters to read.
+        :param cached: Whether values in the client's cache may be used instead of reading them.
+        :return: The merged response, or None if the device did not answer. Parameters that never came back are
+                 listed in its `missing` attribute.
+        """
+        ip = await self._lookup(device_id)
+        if ip is None:
+            return None
+        return await self._read_parameters(device_id, ip, list(parameters), cached)
+
+    async def device_addresses(self) -> List[Tuple[str, str]]:
+        """
+        Gets the ids and IP addresses of all known devices, discovering them first if the registry is stale.
+
+        :return: The device ids and IP addresses in discovery order.
+        """
+        if self.registry.is_stale():
+            await self.discover()
+        return self.registry.items()
+
+    async def discover(self):
+        """
+        Refreshes the registry by discovery. Concurrent callers share a single discovery, and discovery runs
+        at most once per `rediscovery_interval`.
+        """
+        if self.rediscovery_interval is None:
+            return
+        if self._discovery is None or self._discovery.done():
+            last = self._last_discovery
+            if last is not None and time.monotonic() - last < self.rediscovery_interval:
+                return
+            self._discovery = asyncio.ensure_future(self._run_discovery())
+        await asyncio.shield(self._discovery)
+
+    def poller(self, intervals: Optional[Dict[Parameter, float]] = None, **kwargs) -> Poller:
+        """
+        Creates a poller that reads each parameter of every device at its own interval.
+
+        :param intervals: The poll interval in seconds per parameter. Defaults to `DEFAULT_INTERVALS`.
+        :param kwargs: Further arguments for the Poller constructor.
+        :return: The poller. It starts polling when it is iterated or used as an async context manager.
+        """
+        return Poller(self, intervals, **kwargs)
+
+    async def subscribe(
+            self,
+            fields: Optional[Iterable[str]] = None,
+            intervals: Optional[Dict[Parameter, float]] = None,
+            **kwargs
+    ) -> AsyncIterator[ChangeEvent]:
+        """
+        Polls all devices and yields an event whenever fields of a device change.
+
+        Changes are detected on the raw values before they are decoded, so unchanged responses are cheap. The first
+        poll of each device yields all of its fields.
+
+        :param fields: The Device attributes to report, e.g. `["humidity", "speed"]`. Defaults to all attributes.
+        :param intervals: The poll interval in seconds per parameter. Defaults to the parameters of the requested
+                          fields with their default intervals.
+        :param kwargs: Further arguments for the Poller constructor.
+        :return: An async iterator of change events.
+        :raises ValueError: If a field is not a Device attribute set by a parameter.
+        """
+        wanted = set(fields) if fields is not None else None
+        known = {field for parameter_fields in PARAMETER_FIELDS.values() for field in parameter_fields}
+        unknown = sorted(wanted - known) if wanted is not None else []
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if intervals is None:
+            intervals = {
+                parameter: interval for parameter, interval in DEFAULT_INTERVALS.items()
+                if wanted is None or wanted.intersection(PARAMETER_FIELDS.get(parameter, ()))
+            }
+
+        async with self.poller(intervals, **kwargs) as poller:
+            async for result in poller:
+                changes = {}
+                for entry in result.changed:
+                    for field in PARAMETER_FIELDS.get(entry.parameter, ()):
+                        if wanted is None or field in wanted:
+                            changes[field] = getattr(result.device, field)
+                if changes:
+                    yield ChangeEvent(result.device.id, changes, result.time)
+
+    async def _write(self, entity: Device, ip: str) -> Optional[Device]:
+        self._invalidate(entity.id)
+        packet = entity.to_packet()
+        try:
+            response = await self._send(entity.id, ip, packet.to_bytes(), packet_parameters(packet))
+        finally:
+            # Reads that overlapped the write may have returned the values from before it
+            self._invalidate(entity.id)
+        if response is None:
+            return None
+        if self.cache is not None:
+            self.cache.put(entity.id, response.packet.data_entries)
+        entity.mark_clean()
+        for entry in response.packet.data_entries:
+            Device.apply_parameter(entity, entry)
+        return entity
+
+    def _invalidate(self, device_id: str):
+        self._writes[device_id] = self._writes.get(device_id, 0) + 1
+        if self.cache is not None:
+            self.cache.invalidate(device_id)
 
     async def _resolve_device(self, device_id: str, ip: str) -> Optional[Device]:
-        packet = Packet(
+        response = await self._read_parameters(device_id, ip, READ_PARAMETERS, True)
+        return Device.from_packet(response.packet) if response else None
+
+    async def _read_parameters(
+            self,
+            device_id: str,
+            ip: str,
+            parameters: List[Parameter],
+            cached: bool
+    ) -> Optional[Response]:
+        """
+        Reads parameters from a device, taking those with a cached value from the cache if allowed.
+        """
+        cached_entries: List[DataEntry] = []
+        if self.cache is not None and cached:
+            cached_entries, parameters = self.cache.split(device_id, parameters)
+            if not parameters:
+                return Response(Packet(device_id, DEFAULT_PASSWORD, FunctionType.RESPONSE, cached_entries), ip)
+
+        writes = self._writes.get(device_id, 0)
+        if parameters == READ_PARAMETERS:
+            data = READ_TEMPLATE.to_bytes(device_id, DEFAULT_PASSWORD)
+            response = await self._single_flight(
+                (device_id, writes, data),
+                lambda: self._send(device_id, ip, data, READ_PARAMETER_SET)
+            )
+        else:
+            response = await self._single_flight(
+                (device_id, writes, tuple(parameters)),
+                lambda: self._request(
+                    device_id,
+                    ip,
+                    lambda address: self.client.read_parameters(device_id, DEFAULT_PASSWORD, parameters, address)
+                )
+            )
+        if response is None or not cached_entries:
+            return response
+        cached_response = Response(Packet(device_id, DEFAULT_PASSWORD, FunctionType.RESPONSE, cached_entries), ip)
+        return merge_responses([response, cached_response])
+
+    async def _single_flight(self, key: Hashable, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs a read request, unless an identical one is already in flight, in which case its result is shared.
+        """
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(request())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded, so a caller that is cancelled does not cancel the request for the others
+        return await asyncio.shield(future)
+
+    async def _send(self, device_id: str, ip: str, data: bytes, parameters: FrozenSet[int]) -> Optional[Response]:
+        """
+        Sends a serialized packet to a device. If the device does not answer, it is re-discovered and the packet
+        is sent once more if the device turns out to have a new IP address.
+        """
+        return await self._request(
             device_id,
-            "1111",
-            FunctionType.READ,
-            [
-                DataEntry.of(Parameter.ON_OFF),
-                DataEntry.of(Parameter.VENTILATION_MODE),
-                DataEntry.of(Parameter.SPEED),
-                DataEntry.of(Parameter.MANUAL_SPEED),
-                DataEntry.of(Parameter.FAN1RPM),
-                DataEntry.of(Parameter.FILTER_ALARM),
-                DataEntry.of(Parameter.FILTER_TIMER),
-                DataEntry.of(Parameter.CURRENT_HUMIDITY),
-                DataEntry.of(Parameter.READ_FIRMWARE_VERSION),
-                DataEntry.of(Parameter.CURRENT_IP_ADDRESS)
-            ]
+            ip,
+            lambda address: self.client.send_bytes(data, device_id, address, parameters)
         )
-        response = await self.client.send(packet, ip)
-        return Device.from_packet(response.packet) if response else None
 
-    async def _resolve_ip_map(self) -> Dict[str, str]:
-        if self._ip_map is None:
-            self._ip_map = {}
-            addresses = await self.client.find_devices()
-            for addr in addresses:
-                self._ip_map[addr.id] = addr.ip
-        return self._ip_map
\ No newline at end of file
+    async def _request(
+            self,
+            device_id: str,
+            ip: str,
+            request: Callable[[str], Awaitable[Optional[Response]]]
+    ) -> Optional[Response]:
+        generation = self.cache.generation(device_id) if self.cache is not None else None
+        response = await request(ip)
+        if response is None:
+            # Only a device that answered after the last discovery may have moved since. Otherwise discovery has
+            # already had the chance to find it, and a device that is switched off would trigger one per request.
+            confirmed_at = self.registry.confirmed_at(device_id)
+            if confirmed_at is None or (self._discovered_at is not None and confirmed_at <= self._discovered_at):
+                return None
+            await self.discover()
+            new_ip = self.registry.get(device_id)
+            if new_ip is None or new_ip == ip:
+                return None
+            response = await request(new_ip)
+            if response is None:
+                return None
+
+        self._confirm(device_id, response)
+        if self.cache is not None:
+            self.cache.put(device_id, response.packet.data_entries, generation)
+        return response
+
+    def _confirm(self, device_id: str, response: Response):
+        """
+        Records the address of a device that has just answered. The address reported by the device itself
+        takes precedence over the source address of the response.
+        """
+        ip = response.ip
+        for entry in response.packet.data_entries:
+            if entry.parameter == Parameter.CURRENT_IP_ADDRESS and entry.value is not None and len(entry.value) == 4:
+                ip = ".".join(str(b) for b in entry.value)
+        if self.registry.put(device_id, ip):
+            self.registry.save()
+
+    async def _iter_resolved(
+            self,
+            device_addresses: List[Tuple[str, str]],
+            timeout: Optional[float]
+    ) -> AsyncIterator[Device]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        remaining_addresses = iter(device_addresses)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < self.concurrency:
+                    address = next(remaining_addresses, None)
+                    if address is None:
+                        break
+                    pending.add(asyncio.ensure_future(self._resolve_device(*address)))
+                if not pending:
+                    return
+
+                wait_time = None
+                if deadline is not None:
+                    wait_time = deadline - loop.time()
+                    if wait_time <= 0:
+                        return
+
+                done, pending = await asyncio.wait(pending, timeout=wait_time, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    device = task.result()
+                    if device:
+                        yield device
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _lookup(self, device_id: str) -> Optional[str]:
+        ip = self.registry.get(device_id)
+        if ip is None:
+            await self.discover()
+            ip = self.registry.get(device_id)
+        return ip
+
+    async def _run_discovery(self):
+        try:
+            async for address in self.client.discover():
+                self.registry.put(address.id, address.ip)
+            # Devices that have not been seen for the time to live are gone, rather than due for rediscovery
+            self.registry.prune()
+            self.registry.save()
+        finally:
+            self._last_discovery = time.monotonic()
+            self._discovered_at = time.time()
@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from blaubergvento_client.client.device import Device
+
+
+@dataclass
+class CommandResult:
+    """
+    The outcome of a command sent to a single device as part of a bulk command.
+    """
+
+    device_id: str
+    """The id of the device."""
+
+    success: bool
+    """Whether the device confirmed the command."""
+
+    latency: float
+    """The time in seconds from sending the command until it completed or failed."""
+
+    device: Optional[Device] = None
+    """The device with the values read back, if the command succeeded."""
+
+    error: Optional[str] = None
+    """A description of the failure, if the command failed."""
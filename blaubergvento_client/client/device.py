@@ -1,12 +1,35 @@
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, Optional, Set, Tuple
 
 from blaubergvento_client.protocol_client.data_entry import DataEntry
 from blaubergvento_client.protocol_client.function_type import FunctionType
 from blaubergvento_client.protocol_client.packet import Packet
-from blaubergvento_client.protocol_client.parameter import Parameter
-from mode import Mode
-from speed import Speed
+from blaubergvento_client.protocol_client.parameter import Parameter, decoders, encoders
+from blaubergvento_client.client.mode import Mode
+from blaubergvento_client.client.speed import Speed
+
+# The Device attributes set by each parameter
+PARAMETER_FIELDS = {
+    Parameter.CURRENT_HUMIDITY: ("humidity",),
+    Parameter.VENTILATION_MODE: ("mode",),
+    Parameter.FAN1RPM: ("fan1_rpm",),
+    Parameter.FILTER_ALARM: ("filter_alarm",),
+    Parameter.FILTER_TIMER: ("filter_time",),
+    Parameter.CURRENT_IP_ADDRESS: ("ip_address",),
+    Parameter.MANUAL_SPEED: ("manual_speed",),
+    Parameter.SPEED: ("speed",),
+    Parameter.ON_OFF: ("on",),
+    Parameter.READ_FIRMWARE_VERSION: ("firmware_version", "firmware_date"),
+    Parameter.UNIT_TYPE: ("unit_type",),
+}
+
+# The writable Device attributes, in the order they are written, and the parameter each is written to
+WRITABLE_FIELDS = {
+    "speed": Parameter.SPEED,
+    "mode": Parameter.VENTILATION_MODE,
+    "manual_speed": Parameter.MANUAL_SPEED,
+    "on": Parameter.ON_OFF,
+}
 
 
 class Device:
@@ -15,8 +38,32 @@ class Device:
 
     This class provides methods to serialize and deserialize device state
     from and to `Packet` instances, and to manage device-specific properties.
+
+    Assignments to the writable properties (speed, mode, manual_speed and on) are tracked,
+    so only the modified ones are written when the device is saved.
+
+    Attributes are stored in slots rather than a per-instance dict, which keeps each instance small.
+    Use `FleetSnapshot` to hold the state of many devices compactly.
     """
 
+    __slots__ = (
+        "id",
+        "password",
+        "_speed",
+        "_mode",
+        "_manual_speed",
+        "_on",
+        "_dirty",
+        "fan1_rpm",
+        "humidity",
+        "filter_alarm",
+        "filter_time",
+        "firmware_version",
+        "firmware_date",
+        "unit_type",
+        "ip_address",
+    )
+
     def __init__(self, device_id: str, password: str):
         """
         Creates an instance of the Device class.
@@ -27,31 +74,86 @@ class Device:
         self.id: str = device_id
         self.password: str = password
 
-        self.speed: Optional[Speed] = None
-        self.mode: Optional[Mode] = None
-        self.manual_speed: Optional[int] = None
+        self._speed: Optional[Speed] = None
+        self._mode: Optional[Mode] = None
+        self._manual_speed: Optional[int] = None
+        self._on: bool = False
+        self._dirty = set()
+
         self.fan1_rpm: Optional[int] = None
         self.humidity: Optional[int] = None
         self.filter_alarm: bool = False
         self.filter_time: Optional[int] = None
-        self.on: bool = False
         self.firmware_version: Optional[str] = None
         self.firmware_date: Optional[datetime] = None
         self.unit_type: Optional[int] = None
         self.ip_address: Optional[str] = None
 
-    def to_packet(self) -> Packet:
+    @property
+    def speed(self) -> Optional[Speed]:
+        """Gets the speed."""
+        return self._speed
+
+    @speed.setter
+    def speed(self, value: Optional[Speed]):
+        self._speed = value
+        self._dirty.add("speed")
+
+    @property
+    def mode(self) -> Optional[Mode]:
+        """Gets the ventilation mode."""
+        return self._mode
+
+    @mode.setter
+    def mode(self, value: Optional[Mode]):
+        self._mode = value
+        self._dirty.add("mode")
+
+    @property
+    def manual_speed(self) -> Optional[int]:
+        """Gets the manual speed (0-255), used when speed is `Speed.MANUAL`."""
+        return self._manual_speed
+
+    @manual_speed.setter
+    def manual_speed(self, value: Optional[int]):
+        self._manual_speed = value
+        self._dirty.add("manual_speed")
+
+    @property
+    def on(self) -> bool:
+        """Gets whether the device is turned on."""
+        return self._on
+
+    @on.setter
+    def on(self, value: bool):
+        self._on = value
+        self._dirty.add("on")
+
+    @property
+    def dirty_fields(self) -> Set[str]:
+        """Gets the writable properties assigned since the device was loaded or last saved."""
+        return set(self._dirty)
+
+    def mark_clean(self):
+        """
+        Forgets all modifications, e.g. after they have been saved.
+        """
+        self._dirty.clear()
+
+    def to_packet(self, all_fields: bool = False) -> Packet:
         """
         Converts the device state to a `Packet` for communication.
 
-        :return: Packet containing the device's current state.
+        :param all_fields: Whether to write all writable properties instead of only the modified ones.
+        :return: Packet writing the device's modified state and reading back the written parameters.
         """
-        data_entries = [
-            DataEntry.of(Parameter.SPEED, self.speed),
-            DataEntry.of(Parameter.VENTILATION_MODE, self.mode),
-            DataEntry.of(Parameter.MANUAL_SPEED, self.manual_speed),
-            DataEntry.of(Parameter.ON_OFF, 1 if self.on else 0),
-        ]
+        data_entries = []
+        for field, parameter in WRITABLE_FIELDS.items():
+            if not all_fields and field not in self._dirty:
+                continue
+            value = getattr(self, field)
+            if value is not None:
+                data_entries.append(DataEntry(parameter, encoders[parameter](value)))
         return Packet(self.id, self.password, FunctionType.WRITEREAD, data_entries)
 
     @staticmethod
@@ -72,34 +174,42 @@ class Device:
         """
         Applies a DataEntry to a Device instance, updating its properties.
 
+        Values applied this way reflect the state of the physical device and are not tracked as modifications.
+
         :param device: Device to update.
         :param data_entry: DataEntry containing the parameter and value.
         """
-        p = data_entry.parameter
-        v = data_entry.value
-
-        if p == Parameter.CURRENT_HUMIDITY:
-            device.humidity = v[0]
-        elif p == Parameter.VENTILATION_MODE:
-            device.mode = v[0]
-        elif p == Parameter.FAN1RPM:
-            device.fan1_rpm = v[0] + (v[1] << 8)
-        elif p == Parameter.FILTER_ALARM:
-            device.filter_alarm = v[0] == 1
-        elif p == Parameter.FILTER_TIMER:
-            device.filter_time = v[0] + (v[2] * 24 + v[1]) * 60
-        elif p == Parameter.CURRENT_IP_ADDRESS:
-            device.ip_address = f"{v[0]}.{v[1]}.{v[2]}.{v[3]}"
-        elif p == Parameter.MANUAL_SPEED:
-            device.manual_speed = v[0]
-        elif p == Parameter.SPEED:
-            device.speed = v[0]
-        elif p == Parameter.ON_OFF:
-            device.on = v[0] == 1
-        elif p == Parameter.READ_FIRMWARE_VERSION:
-            major, minor, day, month, year_low, year_high = v
-            year = year_low + (year_high << 8)
-            device.firmware_version = f"{major}.{minor}"
-            device.firmware_date = datetime(year, month, day)
-        elif p == Parameter.UNIT_TYPE:
-            device.unit_type = v[0]
+        applier = _APPLIERS.get(data_entry.parameter)
+        if applier is not None and data_entry.value is not None:
+            applier(device, data_entry.value)
+
+
+def _applier(parameter: Parameter, fields: Tuple[str, ...]) -> Callable[[Device, bytes], None]:
+    """
+    Creates the function applying the value of a parameter to the fields of a device.
+    """
+    decode = decoders[parameter]
+    if len(fields) > 1:
+        def apply(device: Device, value: bytes):
+            for field, item in zip(fields, decode(value)):
+                setattr(device, field, item)
+    elif fields[0] in WRITABLE_FIELDS:
+        # Set through the backing field, as the value is the state of the device rather than a modification
+        field = fields[0]
+        attribute = f"_{field}"
+
+        def apply(device: Device, value: bytes):
+            setattr(device, attribute, decode(value))
+            device._dirty.discard(field)
+    else:
+        field = fields[0]
+
+        def apply(device: Device, value: bytes):
+            setattr(device, field, decode(value))
+    return apply
+
+
+# The function applying each parameter to a device, derived from the parameter schema
+_APPLIERS: Dict[int, Callable[[Device, bytes], None]] = {
+    parameter: _applier(parameter, fields) for parameter, fields in PARAMETER_FIELDS.items()
+}
@@ -0,0 +1,359 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from blaubergvento_client.client.change_event import ChangeEvent
+from blaubergvento_client.client.client import DEFAULT_CONCURRENCY, Client
+from blaubergvento_client.client.command_result import CommandResult
+from blaubergvento_client.client.device import Device, PARAMETER_FIELDS, WRITABLE_FIELDS
+from blaubergvento_client.client.fleet_snapshot import FleetSnapshot
+from blaubergvento_client.client.fleet_worker import (
+    CONTROL, DEFAULT_BATCH_INTERVAL, TELEMETRY, decode_records, run_worker, send_control
+)
+from blaubergvento_client.client.poller import DEFAULT_SYNC_INTERVAL
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.parameter import Parameter
+
+STOP_TIMEOUT = 5.0  # seconds
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FleetManager:
+    """
+    Polls a very large fleet with a pool of worker processes.
+
+    The fleet manager discovers devices and shards them across the workers, each of which polls its shard with its
+    own `Client` and socket on its own event loop, so decoding is spread over several cores. Changed values flow
+    back over pipes as compact binary records and are applied to `devices`, the aggregated state of the fleet.
+    Commands are routed to the workers owning the devices.
+
+    Devices that appear are assigned to the least loaded worker, devices that disappear are removed, and devices are
+    moved between workers whenever the shards differ in size by more than one. When a worker exits, its pending
+    commands fail and its devices are assigned to the remaining workers at the next sync.
+    """
+
+    def __init__(
+            self,
+            workers: Optional[int] = None,
+            intervals: Optional[Dict[Parameter, float]] = None,
+            client: Optional[Client] = None,
+            concurrency: int = DEFAULT_CONCURRENCY,
+            sync_interval: float = DEFAULT_SYNC_INTERVAL,
+            batch_interval: float = DEFAULT_BATCH_INTERVAL,
+            protocol_options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Creates a new FleetManager.
+
+        :param workers: The number of worker processes. Defaults to the number of CPUs.
+        :param intervals: The poll interval in seconds per parameter. Defaults to the poller's default intervals.
+        :param client: The client used to discover devices. Defaults to a client using `protocol_options`.
+        :param concurrency: The maximum number of devices each worker queries at the same time.
+        :param sync_interval: How often in seconds to discover devices and rebalance the shards.
+        :param batch_interval: How often in seconds workers send changed values.
+        :param protocol_options: Keyword arguments for the ProtocolClient of each worker, e.g. `port`. They are sent
+                                 to the worker processes, so they must be picklable.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.protocol_options = dict(protocol_options or {})
+        self.client = client if client is not None else Client(client=ProtocolClient(**self.protocol_options))
+        self.sync_interval = sync_interval
+        self.devices: Dict[str, Device] = {}
+        self._options = {
+            "concurrency": concurrency,
+            "intervals": intervals,
+            "batch_interval": batch_interval,
+            "protocol_options": self.protocol_options,
+        }
+        self._processes: List[multiprocessing.Process] = []
+        self._connections = []
+        self._shards: List[Set[str]] = []
+        self._owners: Dict[str, int] = {}
+        self._addresses: Dict[str, str] = {}
+        self._subscribers: List[asyncio.Queue] = []
+        # Pending commands by request id, with the worker handling them
+        self._requests: Dict[int, Tuple[int, asyncio.Future]] = {}
+        self._dead: Set[int] = set()
+        self._request_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def shards(self) -> List[Set[str]]:
+        """Gets the ids of the devices assigned to each worker."""
+        return [set(shard) for shard in self._shards]
+
+    async def start(self):
+        """
+        Starts the workers, discovers the fleet and keeps it in sync on the running event loop.
+        """
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        # Workers are spawned rather than forked, as forking a process with a running event loop is unsafe
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.workers):
+            connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=run_worker,
+                args=(child_connection, self._options),
+                name=f"blaubergvento-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self._processes.append(process)
+            self._connections.append(connection)
+            self._shards.append(set())
+            threading.Thread(target=self._receive, args=(index, connection), daemon=True).start()
+        await self.sync()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Stops the workers.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for connection in self._connections:
+            try:
+                send_control(connection, ("stop",))
+            except OSError:
+                pass
+        loop = asyncio.get_running_loop()
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        for _, future in self._requests.values():
+            future.cancel()
+        self._processes, self._connections, self._shards = [], [], []
+        self._dead.clear()
+        self._owners.clear()
+        self._addresses.clear()
+        self._requests.clear()
+        self.client.client.close()
+
+    async def __aenter__(self) -> "FleetManager":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def sync(self):
+        """
+        Discovers devices, assigns new devices to workers, removes devices that disappeared and rebalances the
+        shards.
+        """
+        await self.client.discover()
+        addresses = dict(self.client.registry.items())
+        live = [index for index in range(len(self._shards)) if index not in self._dead]
+        if not live:
+            raise RuntimeError("All workers have exited")
+        assigned: Dict[int, list] = {}
+        removed: Dict[int, list] = {}
+
+        for device_id in [d for d in self._owners if d not in addresses]:
+            owner = self._owners.pop(device_id)
+            self._shards[owner].discard(device_id)
+            self._addresses.pop(device_id, None)
+            removed.setdefault(owner, []).append(device_id)
+
+        for device_id, ip in addresses.items():
+            owner = self._owners.get(device_id)
+            if owner is None:
+                owner = min(live, key=lambda index: len(self._shards[index]))
+                self._owners[device_id] = owner
+                self._shards[owner].add(device_id)
+            elif self._addresses.get(device_id) == ip:
+                continue
+            self._addresses[device_id] = ip
+            assigned.setdefault(owner, []).append((device_id, ip))
+
+        # Move devices from the largest to the smallest shard until they differ by at most one
+        while True:
+            largest = max(live, key=lambda index: len(self._shards[index]))
+            smallest = min(live, key=lambda index: len(self._shards[index]))
+            if len(self._shards[largest]) - len(self._shards[smallest]) <= 1:
+                break
+            device_id = self._shards[largest].pop()
+            self._shards[smallest].add(device_id)
+            self._owners[device_id] = smallest
+            pending = assigned.get(largest, [])
+            if any(assigned_id == device_id for assigned_id, _ in pending):
+                # Assigned in this sync, so the worker does not know the device yet
+                assigned[largest] = [address for address in pending if address[0] != device_id]
+            else:
+                removed.setdefault(largest, []).append(device_id)
+            assigned.setdefault(smallest, []).append((device_id, self._addresses[device_id]))
+
+        for owner, device_ids in removed.items():
+            send_control(self._connections[owner], ("remove", device_ids))
+        for owner, device_addresses in assigned.items():
+            send_control(self._connections[owner], ("assign", device_addresses))
+
+    def snapshot(self) -> FleetSnapshot:
+        """
+        Gets the current state of the fleet in columnar form.
+
+        :return: The snapshot.
+        """
+        return FleetSnapshot.from_devices(self.devices.values())
+
+    async def events(self) -> AsyncIterator[ChangeEvent]:
+        """
+        Yields an event whenever fields of a device change. Events are only buffered while iterating.
+
+        :return: An async iterator of change events.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers.remove(queue)
+
+    async def apply(
+            self,
+            selector: Union[Iterable[str], Callable[[Device], bool]],
+            stagger: float = 0.0,
+            **changes
+    ) -> List[CommandResult]:
+        """
+        Applies the same changes to a group of devices, through the workers owning them.
+
+        :param selector: The ids of the devices, or a predicate selecting devices by their aggregated state.
+        :param stagger: Optional delay in seconds between starting consecutive saves within each worker.
+        :param changes: The writable properties to change and their new values.
+        :return: The result for each device, in the order given.
+        :raises ValueError: If a change is not a writable property.
+        :raises RuntimeError: If a worker failed or exited before completing the command.
+        """
+        invalid = [field for field in changes if field not in WRITABLE_FIELDS]
+        if invalid:
+            raise ValueError(f"Not writable: {', '.join(invalid)}")
+
+        if callable(selector):
+            device_ids = [device.id for device in list(self.devices.values()) if selector(device)]
+        else:
+            device_ids = list(selector)
+        groups: Dict[int, List[str]] = {}
+        results: Dict[str, CommandResult] = {}
+        for device_id in device_ids:
+            owner = self._owners.get(device_id)
+            if owner is None:
+                results[device_id] = CommandResult(device_id, False, 0.0, error="Unknown device")
+            else:
+                groups.setdefault(owner, []).append(device_id)
+
+        futures = []
+        for owner, group in groups.items():
+            request_id = next(self._request_ids)
+            future = self._loop.create_future()
+            self._requests[request_id] = (owner, future)
+            futures.append(future)
+            send_control(self._connections[owner], ("apply", request_id, group, changes, stagger))
+        for group_results in await asyncio.gather(*futures):
+            for result in group_results:
+                results[result.device_id] = result
+                if result.success and result.device is not None:
+                    self._update(result.device, changes)
+        return [results[device_id] for device_id in device_ids]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            # A failed sync, e.g. a discovery error, is retried at the next interval rather than ending the loop
+            try:
+                await self.sync()
+            except Exception:
+                _LOGGER.exception("Failed to sync the fleet")
+
+    def _receive(self, index: int, connection):
+        """
+        Reads messages from a worker on a separate thread and hands them to the event loop.
+        """
+        while True:
+            try:
+                data = connection.recv_bytes()
+            except (EOFError, OSError):
+                try:
+                    self._loop.call_soon_threadsafe(self._exited, index, connection)
+                except RuntimeError:
+                    pass
+                return
+            try:
+                self._loop.call_soon_threadsafe(self._handle, data)
+            except RuntimeError:
+                # The event loop has been closed
+                return
+
+    def _handle(self, data: bytes):
+        if data[0] == TELEMETRY:
+            for timestamp, device_id, entries in decode_records(data, 1):
+                device = self.devices.get(device_id)
+                if device is None:
+                    device = self.devices[device_id] = Device(device_id, "")
+                fields = []
+                for entry in entries:
+                    before = [getattr(device, field) for field in PARAMETER_FIELDS.get(entry.parameter, ())]
+                    Device.apply_parameter(device, entry)
+                    for field, old in zip(PARAMETER_FIELDS.get(entry.parameter, ()), before):
+                        if getattr(device, field) != old:
+                            fields.append(field)
+                if fields:
+                    self._emit(ChangeEvent(device_id, {field: getattr(device, field) for field in fields}, timestamp))
+        elif data[0] == CONTROL:
+            message = pickle.loads(data[1:])
+            _, future = self._requests.pop(message[1], (None, None))
+            if future is None or future.done():
+                return
+            if message[0] == "results":
+                future.set_result(message[2])
+            else:
+                future.set_exception(RuntimeError(message[2]))
+
+    def _exited(self, index: int, connection):
+        """
+        Fails the pending commands of a worker that has exited, and releases its devices to be assigned to the
+        remaining workers.
+        """
+        if index >= len(self._connections) or self._connections[index] is not connection:
+            # The connection was closed by stop()
+            return
+        self._dead.add(index)
+        for request_id in [r for r, (owner, _) in self._requests.items() if owner == index]:
+            _, future = self._requests.pop(request_id)
+            if not future.done():
+                future.set_exception(RuntimeError(f"Worker {index} exited"))
+        for device_id in self._shards[index]:
+            del self._owners[device_id]
+            self._addresses.pop(device_id, None)
+        self._shards[index].clear()
+
+    def _update(self, saved: Device, fields: Iterable[str]):
+        """
+        Applies the values written by a command to the aggregated state.
+        """
+        device = self.devices.get(saved.id)
+        if device is None:
+            device = self.devices[saved.id] = Device(saved.id, "")
+        for field in fields:
+            # Set through the backing field, as the aggregated state is never saved
+            setattr(device, f"_{field}", getattr(saved, field))
+
+    def _emit(self, event: ChangeEvent):
+        for queue in self._subscribers:
+            queue.put_nowait(event)
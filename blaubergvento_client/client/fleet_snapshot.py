@@ -0,0 +1,205 @@
+import operator
+import socket
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from blaubergvento_client.client.device import WRITABLE_FIELDS, Device
+
+# NumPy is optional and imported on first use, as importing it takes longer than importing the rest of the package
+numpy = None
+_numpy_loaded = False
+
+MISSING = -1
+"""The value stored for an unknown field."""
+
+OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def _encode_int(value: Optional[int]) -> int:
+    return MISSING if value is None else int(value)
+
+
+def _decode_int(value: int) -> Optional[int]:
+    return None if value == MISSING else value
+
+
+def _encode_bool(value: Optional[bool]) -> int:
+    return MISSING if value is None else int(bool(value))
+
+
+def _decode_bool(value: int) -> Optional[bool]:
+    return None if value == MISSING else value == 1
+
+
+def _encode_version(value: Optional[str]) -> int:
+    if value is None:
+        return MISSING
+    major, minor = value.split(".")
+    return int(major) << 8 | int(minor)
+
+
+def _decode_version(value: int) -> Optional[str]:
+    return None if value == MISSING else f"{value >> 8}.{value & 0xFF}"
+
+
+def _encode_date(value: Optional[datetime]) -> int:
+    return MISSING if value is None else value.toordinal()
+
+
+def _decode_date(value: int) -> Optional[datetime]:
+    return None if value == MISSING else datetime.fromordinal(value)
+
+
+def _encode_ip(value: Optional[str]) -> int:
+    return MISSING if value is None else int.from_bytes(socket.inet_aton(value), "big")
+
+
+def _decode_ip(value: int) -> Optional[str]:
+    return None if value == MISSING else socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+def _numpy():
+    global numpy, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        numpy = module
+        _numpy_loaded = True
+    return numpy
+
+
+# The array type code, encoder and decoder of each column, named after the Device attribute it holds
+COLUMNS: Dict[str, Tuple[str, Callable[[Any], int], Callable[[int], Any]]] = {
+    "speed": ("h", _encode_int, _decode_int),
+    "mode": ("h", _encode_int, _decode_int),
+    "manual_speed": ("h", _encode_int, _decode_int),
+    "on": ("b", _encode_bool, _decode_bool),
+    "fan1_rpm": ("i", _encode_int, _decode_int),
+    "humidity": ("h", _encode_int, _decode_int),
+    "filter_alarm": ("b", _encode_bool, _decode_bool),
+    "filter_time": ("i", _encode_int, _decode_int),
+    "unit_type": ("h", _encode_int, _decode_int),
+    "firmware_version": ("i", _encode_version, _decode_version),
+    "firmware_date": ("i", _encode_date, _decode_date),
+    "ip_address": ("q", _encode_ip, _decode_ip),
+}
+
+
+class FleetSnapshot:
+    """
+    The state of a fleet of devices at one point in time, stored in columns.
+
+    Each Device attribute is kept in a typed array indexed by device, which takes a few bytes per device instead
+    of a full object. Unknown values are stored as `MISSING`. Queries such as `where("humidity", ">", 70)` run
+    vectorized on NumPy views of the columns when NumPy is installed, and fall back to plain Python otherwise.
+    """
+
+    def __init__(self, timestamp: Optional[float] = None):
+        """
+        Creates an empty FleetSnapshot.
+
+        :param timestamp: The time (seconds since the epoch) of the snapshot. Defaults to now.
+        """
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._columns: Dict[str, array] = {name: array(typecode) for name, (typecode, _, _) in COLUMNS.items()}
+
+    @staticmethod
+    def from_devices(devices: Iterable[Device], timestamp: Optional[float] = None) -> "FleetSnapshot":
+        """
+        Creates a snapshot of a set of devices.
+
+        :param devices: The devices.
+        :param timestamp: The time of the snapshot. Defaults to now.
+        :return: The snapshot.
+        """
+        snapshot = FleetSnapshot(timestamp)
+        for device in devices:
+            snapshot.update(device)
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._index
+
+    def update(self, device: Device):
+        """
+        Stores the state of a device, adding a row if the device is not in the snapshot yet.
+
+        :param device: The device.
+        """
+        row = self._index.get(device.id)
+        if row is None:
+            self._index[device.id] = len(self.ids)
+            self.ids.append(device.id)
+            for name, (_, encode, _) in COLUMNS.items():
+                self._columns[name].append(encode(getattr(device, name)))
+        else:
+            for name, (_, encode, _) in COLUMNS.items():
+                self._columns[name][row] = encode(getattr(device, name))
+
+    def device(self, device_id: str) -> Optional[Device]:
+        """
+        Rebuilds a Device from its row.
+
+        :param device_id: The id of the device.
+        :return: The device, or None if it is not in the snapshot.
+        """
+        row = self._index.get(device_id)
+        if row is None:
+            return None
+        device = Device(device_id, "")
+        for name, (_, _, decode) in COLUMNS.items():
+            # Writable properties are set through their backing fields so they are not marked as modified
+            attribute = f"_{name}" if name in WRITABLE_FIELDS else name
+            setattr(device, attribute, decode(self._columns[name][row]))
+        return device
+
+    def column(self, name: str):
+        """
+        Gets a column.
+
+        :param name: The Device attribute the column holds.
+        :return: A copy of the column, as a NumPy array if NumPy is installed, otherwise as a typed array. It is not
+                 affected by later updates, and holding it does not keep devices from being added.
+        """
+        values = self._columns[name]
+        np = _numpy()
+        if np is not None:
+            return np.array(values, dtype=values.typecode)
+        return array(values.typecode, values)
+
+    def where(self, name: str, op: str, value: Any) -> List[str]:
+        """
+        Finds the devices whose value of a field satisfies a condition, e.g. `where("humidity", ">", 70)` or
+        `where("filter_alarm", "==", True)`. Devices with an unknown value never match.
+
+        :param name: The Device attribute to compare.
+        :param op: The comparison, one of `OPERATORS`.
+        :param value: The value to compare with, in the type of the Device attribute.
+        :return: The ids of the matching devices.
+        """
+        compare = OPERATORS[op]
+        _, encode, _ = COLUMNS[name]
+        encoded = encode(value)
+        values = self._columns[name]
+        np = _numpy()
+        if np is not None:
+            column = np.frombuffer(values, dtype=values.typecode)
+            rows = np.flatnonzero(compare(column, encoded) & (column != MISSING))
+            return [self.ids[row] for row in rows]
+        return [self.ids[row] for row, v in enumerate(values) if v != MISSING and compare(v, encoded)]
@@ -0,0 +1,207 @@
+import asyncio
+import pickle
+import signal
+import struct
+import threading
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.client.poller import Poller
+from blaubergvento_client.client.registry import DeviceRegistry
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+
+# The first byte of each message between the fleet manager and a worker
+TELEMETRY = 0x54
+"""Followed by telemetry records."""
+CONTROL = 0x43
+"""Followed by a pickled control message."""
+
+# A telemetry record is the time, the size of the device id, the device id, the number of data entries and the data
+# entries, each being the parameter number, the size of the value and the value
+RECORD_HEADER = struct.Struct("<dB")
+ENTRY_HEADER = struct.Struct("<HB")
+
+DEFAULT_BATCH_INTERVAL = 0.05  # seconds
+WORKER_SYNC_INTERVAL = 1.0  # seconds
+
+
+def encode_record(buffer: bytearray, timestamp: float, device_id: str, entries: List[DataEntry]):
+    """
+    Appends a telemetry record to a buffer.
+
+    :param buffer: The buffer.
+    :param timestamp: The time (seconds since the epoch) the values were read.
+    :param device_id: The id of the device.
+    :param entries: The data entries read.
+    """
+    device = device_id.encode("latin-1")
+    buffer += RECORD_HEADER.pack(timestamp, len(device))
+    buffer += device
+    entries = [entry for entry in entries if entry.value is not None]
+    buffer.append(len(entries))
+    for entry in entries:
+        buffer += ENTRY_HEADER.pack(entry.parameter, len(entry.value))
+        buffer += entry.value
+
+
+def decode_records(data: bytes, index: int = 0) -> Iterator[Tuple[float, str, List[DataEntry]]]:
+    """
+    Decodes the telemetry records in a buffer.
+
+    :param data: The buffer.
+    :param index: The position of the first record.
+    :return: An iterator of the time, device id and data entries of each record.
+    """
+    end = len(data)
+    while index < end:
+        timestamp, size = RECORD_HEADER.unpack_from(data, index)
+        index += RECORD_HEADER.size
+        device_id = str(data[index:index + size], "latin-1")
+        index += size
+        count = data[index]
+        index += 1
+        entries = []
+        for _ in range(count):
+            parameter, size = ENTRY_HEADER.unpack_from(data, index)
+            index += ENTRY_HEADER.size
+            entries.append(DataEntry(parameter, bytes(data[index:index + size])))
+            index += size
+        yield timestamp, device_id, entries
+
+
+def send_control(connection: Connection, message: Tuple[Any, ...]):
+    """
+    Sends a control message over a pipe.
+
+    :param connection: The end of the pipe.
+    :param message: The message, a tuple starting with the name of the command.
+    """
+    connection.send_bytes(bytes([CONTROL]) + pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+
+def run_worker(connection: Connection, options: Dict[str, Any]):
+    """
+    The entry point of a worker process.
+
+    :param connection: The worker's end of the pipe to the fleet manager.
+    :param options: The options of the worker, see `FleetWorker`.
+    """
+    # Interrupts are handled by the fleet manager, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(FleetWorker(connection, options).run())
+
+
+class FleetWorker:
+    """
+    Polls the shard of a fleet assigned to a worker process by a `FleetManager`.
+
+    The worker runs its own `Client` and socket, so decoding happens in parallel with other workers. It never
+    discovers devices itself; the fleet manager assigns and removes devices. Changed values are sent to the fleet
+    manager as compact telemetry records, batched every `batch_interval` seconds.
+    """
+
+    def __init__(self, connection: Connection, options: Dict[str, Any]):
+        """
+        Creates a new FleetWorker.
+
+        :param connection: The worker's end of the pipe to the fleet manager.
+        :param options: `concurrency`, `intervals`, `batch_interval` and the keyword arguments `protocol_options` and
+                        `poller_options` for the ProtocolClient and Poller constructors.
+        """
+        self.connection = connection
+        self.batch_interval = options.get("batch_interval", DEFAULT_BATCH_INTERVAL)
+        self.client = Client(
+            concurrency=options.get("concurrency", 32),
+            registry=DeviceRegistry(ttl=None),
+            rediscovery_interval=None,
+            client=ProtocolClient(**options.get("protocol_options", {}))
+        )
+        # Devices are assigned at any time, so the poller must pick them up quickly
+        poller_options = {"sync_interval": WORKER_SYNC_INTERVAL, **options.get("poller_options", {})}
+        self.poller = Poller(self.client, options.get("intervals"), **poller_options)
+        self._buffer = bytearray([TELEMETRY])
+        self._stopped: Optional[asyncio.Future] = None
+
+    async def run(self):
+        """
+        Polls the assigned devices until the fleet manager stops the worker or goes away.
+        """
+        loop = asyncio.get_running_loop()
+        self._stopped = loop.create_future()
+        threading.Thread(target=self._receive, args=(loop,), daemon=True).start()
+        tasks = [asyncio.ensure_future(self._collect()), asyncio.ensure_future(self._flush())]
+        try:
+            await self._stopped
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.poller.stop()
+            self.client.client.close()
+            self._send_buffer()
+            self.connection.close()
+
+    def _receive(self, loop: asyncio.AbstractEventLoop):
+        """
+        Reads control messages from the pipe on a separate thread and hands them to the event loop.
+        """
+        while True:
+            try:
+                data = self.connection.recv_bytes()
+            except (EOFError, OSError):
+                message = ("stop",)
+            else:
+                message = pickle.loads(data[1:])
+            loop.call_soon_threadsafe(self._handle, message)
+            if message[0] == "stop":
+                return
+
+    def _handle(self, message: Tuple[Any, ...]):
+        command = message[0]
+        if command == "assign":
+            for device_id, ip in message[1]:
+                self.client.registry.put(device_id, ip)
+                self.poller.add_device(device_id)
+        elif command == "remove":
+            for device_id in message[1]:
+                self.client.registry.remove(device_id)
+                self.poller.remove_device(device_id)
+        elif command == "apply":
+            asyncio.ensure_future(self._apply(*message[1:]))
+        elif command == "stop" and not self._stopped.done():
+            self._stopped.set_result(None)
+
+    async def _apply(self, request_id: int, device_ids: List[str], changes: Dict[str, Any], stagger: float):
+        try:
+            results = await self.client.apply(device_ids, stagger, **changes)
+        except Exception as e:
+            self._send(("error", request_id, str(e)))
+        else:
+            self._send(("results", request_id, results))
+
+    async def _collect(self):
+        async for result in self.poller:
+            if result.changed:
+                encode_record(self._buffer, result.time, result.device.id, result.changed)
+
+    async def _flush(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            self._send_buffer()
+
+    def _send_buffer(self):
+        if len(self._buffer) > 1:
+            data, self._buffer = self._buffer, bytearray([TELEMETRY])
+            try:
+                self.connection.send_bytes(data)
+            except OSError:
+                # The fleet manager has gone away, the receiving thread stops the worker
+                pass
+
+    def _send(self, message: Tuple[Any, ...]):
+        try:
+            send_control(self.connection, message)
+        except OSError:
+            pass
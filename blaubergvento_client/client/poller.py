@@ -0,0 +1,237 @@
+import asyncio
+import heapq
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from blaubergvento_client.client.device import Device
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.parameter import Parameter
+
+if TYPE_CHECKING:
+    from blaubergvento_client.client.client import Client
+
+_LOGGER = logging.getLogger(__name__)
+
+# Poll intervals in seconds. Values that change often are polled often, static values rarely.
+DEFAULT_INTERVALS: Dict[Parameter, float] = {
+    Parameter.CURRENT_HUMIDITY: 5.0,
+    Parameter.ON_OFF: 10.0,
+    Parameter.SPEED: 10.0,
+    Parameter.MANUAL_SPEED: 10.0,
+    Parameter.VENTILATION_MODE: 10.0,
+    Parameter.FAN1RPM: 10.0,
+    Parameter.FILTER_ALARM: 300.0,
+    Parameter.FILTER_TIMER: 3600.0,
+    Parameter.CURRENT_IP_ADDRESS: 3600.0,
+    Parameter.READ_FIRMWARE_VERSION: 86400.0,
+    Parameter.UNIT_TYPE: 86400.0,
+}
+DEFAULT_COALESCE_WINDOW = 1.0  # seconds
+DEFAULT_JITTER = 0.1  # fraction of the shortest interval
+DEFAULT_SYNC_INTERVAL = 60.0  # seconds
+
+
+@dataclass
+class PollResult:
+    """
+    The values read from a device in a single poll.
+    """
+
+    device: Device
+    """The device, with every value read so far applied."""
+
+    entries: List[DataEntry]
+    """The data entries read in this poll."""
+
+    changed: List[DataEntry]
+    """The data entries whose raw value differs from the previous poll, or that were read for the first time."""
+
+    time: float
+    """The time (seconds since the epoch) the response was received."""
+
+
+class Poller:
+    """
+    Polls every device known to a `Client`, reading each parameter at its own interval.
+
+    Parameters of a device that are due within the same coalescing window are read in a single request, and the
+    polls of different devices are spread out with a random phase and jitter, so the fleet is never polled in a
+    burst. Results are delivered by iterating the poller.
+    """
+
+    def __init__(
+            self,
+            client: "Client",
+            intervals: Optional[Dict[Parameter, float]] = None,
+            coalesce_window: float = DEFAULT_COALESCE_WINDOW,
+            jitter: float = DEFAULT_JITTER,
+            sync_interval: float = DEFAULT_SYNC_INTERVAL
+    ):
+        """
+        Creates a new Poller.
+
+        :param client: The client to poll through.
+        :param intervals: The poll interval in seconds per parameter. Defaults to `DEFAULT_INTERVALS`.
+        :param coalesce_window: Parameters of a device due within this many seconds are read together.
+        :param jitter: The maximum random delay added to each poll, as a fraction of the shortest interval.
+        :param sync_interval: How often in seconds to pick up devices added to or removed from the registry.
+        :raises ValueError: If no parameters are to be polled.
+        """
+        if intervals is not None and not intervals:
+            raise ValueError("No parameters to poll")
+        self.client = client
+        self.intervals = dict(intervals if intervals is not None else DEFAULT_INTERVALS)
+        self.coalesce_window = coalesce_window
+        self.jitter = jitter
+        self.sync_interval = sync_interval
+        self.devices: Dict[str, Device] = {}
+        self._schedules: Dict[str, Dict[Parameter, float]] = {}
+        self._values: Dict[str, Dict[int, bytes]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._random = random.Random()
+        self._results: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._polls: Set[asyncio.Task] = set()
+
+    def add_device(self, device_id: str):
+        """
+        Starts polling a device. The first poll reads every parameter and happens at a random time within the
+        shortest interval.
+
+        :param device_id: The id of the device.
+        """
+        if device_id in self._schedules:
+            return
+        now = time.monotonic()
+        first = now + self._random.uniform(0, min(self.intervals.values()))
+        self._schedules[device_id] = {parameter: first for parameter in self.intervals}
+        self.devices[device_id] = Device(device_id, "")
+        heapq.heappush(self._heap, (first, device_id))
+
+    def remove_device(self, device_id: str):
+        """
+        Stops polling a device.
+
+        :param device_id: The id of the device.
+        """
+        # The entry in the heap is skipped when it comes up
+        self._schedules.pop(device_id, None)
+        self._values.pop(device_id, None)
+        self.devices.pop(device_id, None)
+
+    def start(self):
+        """
+        Starts polling on the running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._results = asyncio.Queue(maxsize=4 * self.client.concurrency)
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Stops polling and waits for outstanding requests to be cancelled.
+        """
+        tasks = list(self._polls)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "Poller":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def __aiter__(self) -> AsyncIterator[PollResult]:
+        self.start()
+        task = self._task
+        while True:
+            if not self._results.empty():
+                yield self._results.get_nowait()
+                continue
+            # Wait for the scheduler too, so an error that stops it is raised instead of blocking forever
+            get = asyncio.ensure_future(self._results.get())
+            try:
+                await asyncio.wait((get, task), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                get.cancel()
+            if get.done() and not get.cancelled():
+                yield get.result()
+            elif task.cancelled():
+                # Stopped
+                return
+            else:
+                task.result()
+                return
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.client.concurrency)
+        next_sync = 0.0
+        while True:
+            now = time.monotonic()
+            if now >= next_sync:
+                await self._sync_devices()
+                next_sync = now + self.sync_interval
+
+            if not self._heap:
+                await asyncio.sleep(max(0.0, next_sync - now))
+                continue
+            due, device_id = self._heap[0]
+            if due > now:
+                await asyncio.sleep(min(due, next_sync) - now)
+                continue
+            heapq.heappop(self._heap)
+            schedule = self._schedules.get(device_id)
+            if schedule is None:
+                continue
+
+            # Read everything due within the coalescing window and schedule the next poll
+            limit = now + self.coalesce_window
+            parameters = [parameter for parameter, at in schedule.items() if at <= limit]
+            for parameter in parameters:
+                schedule[parameter] = now + self.intervals[parameter]
+            delay = self._random.uniform(0, self.jitter * min(self.intervals.values()))
+            heapq.heappush(self._heap, (min(schedule.values()) + delay, device_id))
+
+            await semaphore.acquire()
+            task = asyncio.ensure_future(self._poll(device_id, parameters))
+            task.add_done_callback(lambda _: semaphore.release())
+            self._polls.add(task)
+            task.add_done_callback(self._polls.discard)
+
+    async def _sync_devices(self):
+        device_ids = {device_id for device_id, _ in await self.client.device_addresses()}
+        for device_id in device_ids:
+            self.add_device(device_id)
+        for device_id in [d for d in self._schedules if d not in device_ids and d not in self.client.registry]:
+            self.remove_device(device_id)
+
+    async def _poll(self, device_id: str, parameters: List[Parameter]):
+        # The polls run as separate tasks nobody awaits, so a failing poll is logged and the device polled again later
+        try:
+            await self._poll_device(device_id, parameters)
+        except Exception:
+            _LOGGER.exception("Failed to poll %s", device_id)
+
+    async def _poll_device(self, device_id: str, parameters: List[Parameter]):
+        response = await self.client.read_parameters(device_id, parameters, cached=False)
+        device = self.devices.get(device_id)
+        if response is None or device is None:
+            return
+
+        # Compare the raw values, so only entries that changed need to be decoded
+        values = self._values.setdefault(device_id, {})
+        changed = []
+        for entry in response.packet.data_entries:
+            if values.get(entry.parameter) != entry.value:
+                values[entry.parameter] = entry.value
+                changed.append(entry)
+                Device.apply_parameter(device, entry)
+        await self._results.put(PollResult(device, response.packet.data_entries, changed, time.time()))
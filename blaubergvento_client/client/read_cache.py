@@ -0,0 +1,129 @@
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.parameter import Parameter
+
+# How long values are cached in seconds. Static values are kept far longer than measurements.
+DEFAULT_TTLS = {
+    Parameter.READ_FIRMWARE_VERSION: 86400.0,
+    Parameter.UNIT_TYPE: 86400.0,
+    Parameter.CURRENT_IP_ADDRESS: 3600.0,
+    Parameter.FILTER_TIMER: 60.0,
+    Parameter.FILTER_ALARM: 60.0,
+    Parameter.ON_OFF: 5.0,
+    Parameter.VENTILATION_MODE: 5.0,
+    Parameter.SPEED: 5.0,
+    Parameter.MANUAL_SPEED: 5.0,
+    Parameter.FAN1RPM: 2.0,
+    Parameter.CURRENT_HUMIDITY: 2.0,
+}
+
+
+class ReadCache:
+    """
+    A cache of parameter values read from devices, with a time to live per parameter.
+
+    Pass an instance to `Client` to answer reads of recently read parameters without contacting the device. The
+    client stores the values of every response in the cache and invalidates the values of a device when it is
+    saved.
+
+    Every invalidation starts a new generation of the device's values. Values read by a request that started in an
+    older generation are not stored, so a read that overlaps a write cannot put the values from before the write
+    back into the cache.
+    """
+
+    def __init__(self, ttls: Optional[Dict[int, float]] = None, default_ttl: float = 0.0):
+        """
+        Creates a new ReadCache.
+
+        :param ttls: The time to live in seconds per parameter. Defaults to `DEFAULT_TTLS`.
+        :param default_ttl: The time to live of parameters not in `ttls`. 0 disables caching of them.
+        """
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._entries: Dict[str, Dict[int, Tuple[DataEntry, float]]] = {}
+        self._generations: Dict[str, int] = {}
+        self._cleared = 0
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def get(self, device_id: str, parameter: int) -> Optional[DataEntry]:
+        """
+        Gets a cached value.
+
+        :param device_id: The id of the device.
+        :param parameter: The parameter.
+        :return: The data entry, or None if the value is not cached or has expired.
+        """
+        cached = self._entries.get(device_id, {}).get(parameter)
+        if cached is None or cached[1] <= time.monotonic():
+            return None
+        return cached[0]
+
+    def split(self, device_id: str, parameters: Iterable[int]) -> Tuple[List[DataEntry], List[int]]:
+        """
+        Splits parameters into those with a cached value and those that must be read.
+
+        :param device_id: The id of the device.
+        :param parameters: The parameters.
+        :return: The cached data entries and the parameters without a cached value.
+        """
+        cached = self._entries.get(device_id, {})
+        now = time.monotonic()
+        fresh = []
+        stale = []
+        for parameter in parameters:
+            entry = cached.get(parameter)
+            if entry is not None and entry[1] > now:
+                fresh.append(entry[0])
+            else:
+                stale.append(parameter)
+        return fresh, stale
+
+    def generation(self, device_id: str) -> int:
+        """
+        Gets the current generation of a device's values, to pass to `put` when the read completes.
+
+        :param device_id: The id of the device.
+        :return: A number that grows whenever the device's values are invalidated.
+        """
+        return max(self._generations.get(device_id, 0), self._cleared)
+
+    def put(self, device_id: str, entries: Iterable[DataEntry], generation: Optional[int] = None):
+        """
+        Stores the values read from a device.
+
+        :param device_id: The id of the device.
+        :param entries: The data entries of a response.
+        :param generation: The generation the read started in. The values are dropped if the device's values have
+                           been invalidated since.
+        """
+        if generation is not None and generation != self.generation(device_id):
+            return
+        now = time.monotonic()
+        cached = None
+        for entry in entries:
+            ttl = self.ttls.get(entry.parameter, self.default_ttl)
+            if ttl <= 0 or entry.value is None:
+                continue
+            if cached is None:
+                cached = self._entries.setdefault(device_id, {})
+            cached[entry.parameter] = (entry, now + ttl)
+
+    def invalidate(self, device_id: Optional[str] = None):
+        """
+        Removes cached values.
+
+        :param device_id: The device whose values to remove, or None to remove all values.
+        """
+        self._counter += 1
+        if device_id is None:
+            self._entries.clear()
+            self._generations.clear()
+            self._cleared = self._counter
+        else:
+            self._entries.pop(device_id, None)
+            self._generations[device_id] = self._counter
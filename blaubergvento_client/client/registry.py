@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_TTL = 3600.0  # seconds
+
+
+@dataclass
+class RegistryEntry:
+    """
+    The last known address of a device.
+    """
+
+    ip: str
+    """The IP address of the device."""
+
+    updated: float
+    """The time (seconds since the epoch) the address was last confirmed."""
+
+
+class DeviceRegistry:
+    """
+    A registry mapping device ids to IP addresses.
+
+    Entries expire after a configurable time to live, after which the client re-discovers the device. The
+    registry can optionally be persisted to a JSON snapshot on disk, so a restarted process can talk to
+    known devices right away instead of waiting for discovery.
+    """
+
+    def __init__(self, ttl: Optional[float] = DEFAULT_TTL, path: Optional[str] = None):
+        """
+        Creates a new DeviceRegistry.
+
+        :param ttl: The time to live of an entry in seconds, or None for entries that never expire.
+        :param path: Optional path of a JSON snapshot to load at startup and to keep updated.
+        """
+        self.ttl = ttl
+        self.path = path
+        self._entries: Dict[str, RegistryEntry] = {}
+        if path is not None:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._entries
+
+    def get(self, device_id: str) -> Optional[str]:
+        """
+        Gets the IP address of a device.
+
+        :param device_id: The id of the device.
+        :return: The IP address, or None if the device is unknown or its entry has expired.
+        """
+        entry = self._entries.get(device_id)
+        if entry is None or self._is_expired(entry, time.time()):
+            return None
+        return entry.ip
+
+    def confirmed_at(self, device_id: str) -> Optional[float]:
+        """
+        Gets when the address of a device was last confirmed.
+
+        :param device_id: The id of the device.
+        :return: The time (seconds since the epoch), or None if the device is unknown.
+        """
+        entry = self._entries.get(device_id)
+        return entry.updated if entry is not None else None
+
+    def items(self) -> List[Tuple[str, str]]:
+        """
+        Gets all devices with an entry that has not expired.
+
+        :return: List of device id and IP address pairs.
+        """
+        now = time.time()
+        return [(device_id, e.ip) for device_id, e in self._entries.items() if not self._is_expired(e, now)]
+
+    def is_stale(self) -> bool:
+        """
+        Whether the registry should be refreshed by discovery, i.e. if it is empty or any entry has expired.
+
+        :return: True if the registry is stale.
+        """
+        if not self._entries:
+            return True
+        now = time.time()
+        return any(self._is_expired(e, now) for e in self._entries.values())
+
+    def put(self, device_id: str, ip: str) -> bool:
+        """
+        Adds or updates the address of a device and marks it as confirmed now.
+
+        :param device_id: The id of the device.
+        :param ip: The IP address of the device.
+        :return: True if the device was unknown or its IP address changed.
+        """
+        entry = self._entries.get(device_id)
+        now = time.time()
+        if entry is not None and entry.ip == ip:
+            entry.updated = now
+            return False
+        self._entries[device_id] = RegistryEntry(ip, now)
+        return True
+
+    def prune(self) -> List[str]:
+        """
+        Removes the entries that have expired, e.g. of devices that did not answer the last discovery.
+
+        :return: The ids of the removed devices.
+        """
+        now = time.time()
+        expired = [device_id for device_id, e in self._entries.items() if self._is_expired(e, now)]
+        for device_id in expired:
+            del self._entries[device_id]
+        return expired
+
+    def remove(self, device_id: str):
+        """
+        Removes a device from the registry.
+
+        :param device_id: The id of the device.
+        """
+        self._entries.pop(device_id, None)
+
+    def load(self):
+        """
+        Loads the snapshot file, if it exists, replacing the current entries.
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._entries = {
+            device_id: RegistryEntry(entry["ip"], entry["updated"])
+            for device_id, entry in data.get("devices", {}).items()
+        }
+
+    def save(self):
+        """
+        Writes the entries to the snapshot file, if a path is configured.
+
+        The file is replaced atomically, so a crash never leaves a partially written snapshot behind.
+        """
+        if self.path is None:
+            return
+        data = {
+            "devices": {
+                device_id: {"ip": e.ip, "updated": e.updated} for device_id, e in self._entries.items()
+            }
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _is_expired(self, entry: RegistryEntry, now: float) -> bool:
+        return self.ttl is not None and now - entry.updated > self.ttl
@@ -0,0 +1,263 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar, Union
+
+from blaubergvento_client.client.change_event import ChangeEvent
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.client.command_result import CommandResult
+from blaubergvento_client.client.device import Device
+from blaubergvento_client.client.registry import DeviceRegistry
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.protocol_client.response import Response
+
+T = TypeVar("T")
+
+
+class SyncClient:
+    """
+    A thread-safe, blocking facade for `Client`.
+
+    The client runs on an event loop in a background thread, which owns the socket, the registry and the round trip
+    time estimates. Any number of threads can call the blocking methods, or the methods ending in `_future` that
+    return a `concurrent.futures.Future`, and their requests share that socket. Discovery runs once for all threads
+    instead of once per call.
+
+    The methods must not be called from the background thread itself, e.g. from a listener callback.
+    """
+
+    def __init__(self, client: Optional[Client] = None, **kwargs):
+        """
+        Creates a new SyncClient and starts its event loop thread.
+
+        :param client: The client to run. Defaults to a new client created with the given keyword arguments.
+        :param kwargs: Arguments for the Client constructor, when no client is given.
+        """
+        self.client = client if client is not None else Client(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="blaubergvento-client", daemon=True)
+        self._thread.start()
+
+    @property
+    def registry(self) -> DeviceRegistry:
+        """Gets the registry of device addresses."""
+        return self.client.registry
+
+    def find_all(self, page: int = 0, size: int = 20, timeout: Optional[float] = None) -> List[Device]:
+        """
+        Resolves a page of devices concurrently. See `Client.find_all`.
+
+        :param page: The page number, starting from 0.
+        :param size: The number of devices per page.
+        :param timeout: Optional deadline in seconds for the whole call.
+        :return: The resolved devices in discovery order.
+        """
+        return self.find_all_future(page, size, timeout).result()
+
+    def find_all_future(
+            self,
+            page: int = 0,
+            size: int = 20,
+            timeout: Optional[float] = None
+    ) -> "concurrent.futures.Future[List[Device]]":
+        """
+        Like `find_all`, but returns a future instead of blocking.
+        """
+        return self.submit(self.client.find_all(page, size, timeout))
+
+    def iter_devices(self, timeout: Optional[float] = None) -> Iterator[Device]:
+        """
+        Resolves all known devices concurrently, yielding each device as soon as its response arrives. See
+        `Client.iter_devices`.
+
+        :param timeout: Optional deadline in seconds for the whole iteration.
+        :return: An iterator of devices in order of arrival.
+        """
+        return self._iterate(lambda: self.client.iter_devices(timeout))
+
+    def find_by_id(self, device_id: str) -> Optional[Device]:
+        """
+        Resolves a device by its id.
+
+        :param device_id: The id of the device.
+        :return: The device, or None if it was not found or did not answer.
+        """
+        return self.find_by_id_future(device_id).result()
+
+    def find_by_id_future(self, device_id: str) -> "concurrent.futures.Future[Optional[Device]]":
+        """
+        Like `find_by_id`, but returns a future instead of blocking.
+        """
+        return self.submit(self.client.find_by_id(device_id))
+
+    def save(self, entity: Device) -> Optional[Device]:
+        """
+        Writes the modified properties of a device and reads them back. See `Client.save`.
+
+        :param entity: The device to save. It must not be modified by other threads until the save completes.
+        :return: The device, or None if the device did not answer.
+        """
+        return self.save_future(entity).result()
+
+    def save_future(self, entity: Device) -> "concurrent.futures.Future[Optional[Device]]":
+        """
+        Like `save`, but returns a future instead of blocking.
+        """
+        return self.submit(self.client.save(entity))
+
+    def save_many(self, entities: Iterable[Device], stagger: float = 0.0) -> List[CommandResult]:
+        """
+        Saves many devices concurrently. See `Client.save_many`.
+
+        :param entities: The devices to save.
+        :param stagger: Optional delay in seconds between starting consecutive saves.
+        :return: The result for each device, in the order given.
+        """
+        return self.save_many_future(entities, stagger).result()
+
+    def save_many_future(
+            self,
+            entities: Iterable[Device],
+            stagger: float = 0.0
+    ) -> "concurrent.futures.Future[List[CommandResult]]":
+        """
+        Like `save_many`, but returns a future instead of blocking.
+        """
+        return self.submit(self.client.save_many(list(entities), stagger))
+
+    def apply(
+            self,
+            selector: Union[Iterable[str], Callable[[Device], bool]],
+            stagger: float = 0.0,
+            **changes
+    ) -> List[CommandResult]:
+        """
+        Applies the same changes to a group of devices concurrently. See `Client.apply`.
+
+        :param selector: The ids of the devices, or a predicate selecting devices by their current state. The
+                         predicate is called on the event loop thread.
+        :param stagger: Optional delay in seconds between starting consecutive saves.
+        :param changes: The writable properties to change and their new values.
+        :return: The result for each device.
+        :raises ValueError: If a change is not a writable property.
+        """
+        return self.apply_future(selector, stagger, **changes).result()
+
+    def apply_future(
+            self,
+            selector: Union[Iterable[str], Callable[[Device], bool]],
+            stagger: float = 0.0,
+            **changes
+    ) -> "concurrent.futures.Future[List[CommandResult]]":
+        """
+        Like `apply`, but returns a future instead of blocking.
+        """
+        if not callable(selector):
+            selector = list(selector)
+        return self.submit(self.client.apply(selector, stagger, **changes))
+
+    def read_parameters(
+            self,
+            device_id: str,
+            parameters: Iterable[Parameter],
+            cached: bool = True
+    ) -> Optional[Response]:
+        """
+        Reads an arbitrary set of parameters from a device. See `Client.read_parameters`.
+
+        :param device_id: The id of the device.
+        :param parameters: The parameters to read.
+        :param cached: Whether values in the client's cache may be used instead of reading them.
+        :return: The merged response, or None if the device did not answer.
+        """
+        return self.read_parameters_future(device_id, parameters, cached).result()
+
+    def read_parameters_future(
+            self,
+            device_id: str,
+            parameters: Iterable[Parameter],
+            cached: bool = True
+    ) -> "concurrent.futures.Future[Optional[Response]]":
+        """
+        Like `read_parameters`, but returns a future instead of blocking.
+        """
+        return self.submit(self.client.read_parameters(device_id, list(parameters), cached))
+
+    def subscribe(
+            self,
+            fields: Optional[Iterable[str]] = None,
+            intervals: Optional[Dict[Parameter, float]] = None,
+            **kwargs
+    ) -> Iterator[ChangeEvent]:
+        """
+        Polls all devices and yields an event whenever fields of a device change. See `Client.subscribe`.
+
+        Polling runs while the iterator is consumed and stops when it is closed.
+
+        :param fields: The Device attributes to report. Defaults to all attributes.
+        :param intervals: The poll interval in seconds per parameter.
+        :param kwargs: Further arguments for the Poller constructor.
+        :return: An iterator of change events.
+        """
+        fields = list(fields) if fields is not None else None
+        return self._iterate(lambda: self.client.subscribe(fields, intervals, **kwargs))
+
+    def submit(self, awaitable: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """
+        Runs a coroutine on the event loop thread, e.g. one of the `Client` methods not mirrored here.
+
+        :param awaitable: The coroutine.
+        :return: A future resolved with the result of the coroutine.
+        :raises RuntimeError: If called from the event loop thread or after the client was closed.
+        """
+        if threading.current_thread() is self._thread:
+            awaitable.close()
+            raise RuntimeError("SyncClient methods must not be called from its event loop thread.")
+        if self._loop.is_closed():
+            awaitable.close()
+            raise RuntimeError("SyncClient is closed.")
+        return asyncio.run_coroutine_threadsafe(awaitable, self._loop)
+
+    def close(self):
+        """
+        Closes the socket and stops the event loop thread.
+        """
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self.client.client.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> "SyncClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _iterate(self, create: Callable[[], AsyncIterator[T]]) -> Iterator[T]:
+        """
+        Consumes an async iterator created on the event loop thread, one item at a time.
+        """
+        iterator = self.submit(_call(create)).result()
+        try:
+            while True:
+                try:
+                    yield self.submit(_next(iterator)).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            if not self._loop.is_closed():
+                self.submit(iterator.aclose()).result()
+
+
+async def _call(function: Callable[[], T]) -> T:
+    return function()
+
+
+async def _next(iterator: AsyncIterator[T]) -> T:
+    return await iterator.__anext__()
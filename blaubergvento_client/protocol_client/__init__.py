@@ -1,3 +1,21 @@
+from .access import Access
+from .capture_log import CaptureLog
+from .capture_reader import CaptureReader
+from .capture_record import CaptureRecord
 from .client import ProtocolClient
+from .metrics import Metrics
+from .parameter_schema import ParameterSchema
+from .rate_limiter import RateLimiter
+from .token_bucket import TokenBucket
 
-__all__ = ['ProtocolClient']
\ No newline at end of file
+__all__ = [
+    'Access',
+    'CaptureLog',
+    'CaptureReader',
+    'CaptureRecord',
+    'ProtocolClient',
+    'Metrics',
+    'ParameterSchema',
+    'RateLimiter',
+    'TokenBucket',
+]
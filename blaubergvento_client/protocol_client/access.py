@@ -0,0 +1,18 @@
+from enum import IntFlag
+
+
+class Access(IntFlag):
+    """
+    Access enumeration.
+
+    Defines whether a parameter can be read, written or both.
+    """
+
+    READ = 0x01
+    """The parameter can be read."""
+
+    WRITE = 0x02
+    """The parameter can be written."""
+
+    READ_WRITE = READ | WRITE
+    """The parameter can be read and written."""
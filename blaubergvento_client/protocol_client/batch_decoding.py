@@ -0,0 +1,287 @@
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy
+
+from blaubergvento_client.protocol_client.capture_log import FILE_HEADER, RECORD_HEADER
+from blaubergvento_client.protocol_client.capture_record import RECEIVED
+from blaubergvento_client.protocol_client.function_type import FunctionType
+from blaubergvento_client.protocol_client.packet import (
+    CHANGE_FUNCTION, CHANGE_PAGE, HEADER, NOT_SUPPORTED, PROTOCOL_TYPE, VALUE_SIZE
+)
+from blaubergvento_client.protocol_client.parameter import Parameter, size_table
+from blaubergvento_client.protocol_client.time_series import TimeSeries
+
+DEFAULT_PARAMETERS = (Parameter.CURRENT_HUMIDITY, Parameter.FAN1RPM, Parameter.FILTER_TIMER)
+CHUNK_SIZE = 1 << 16  # packets of the same size decoded at a time, which bounds memory use
+MIN_PACKET_SIZE = 8  # preamble, two empty credentials, function type and checksum
+MAX_VALUE_SIZE = 8  # values are decoded into int64
+
+
+def _little_endian(values: numpy.ndarray) -> numpy.ndarray:
+    result = numpy.zeros(len(values), dtype=numpy.int64)
+    for index in range(values.shape[1]):
+        result |= values[:, index].astype(numpy.int64) << (8 * index)
+    return result
+
+
+def _filter_timer(values: numpy.ndarray) -> numpy.ndarray:
+    # Minutes, hours and days, converted to minutes the way Device does
+    values = values.astype(numpy.int64)
+    return values[:, 0] + (values[:, 2] * 24 + values[:, 1]) * 60
+
+
+# Decoders for values that are not little-endian integers. Other values of up to 8 bytes are decoded as such.
+VALUE_DECODERS = {
+    Parameter.FILTER_TIMER: _filter_timer,
+}
+
+
+def decode_packets(
+        packets: Sequence[bytes],
+        timestamps: Optional[Iterable[float]] = None,
+        parameters: Optional[Iterable[int]] = DEFAULT_PARAMETERS
+) -> TimeSeries:
+    """
+    Decodes the values of fixed-size parameters from many serialized response packets at once.
+
+    Headers and checksums are validated in bulk. Packets of the same size and layout (which is the case for all
+    responses to the same request) are decoded together as rows of a matrix, so the cost per packet is a few array
+    operations instead of a `Packet.from_bytes` call.
+
+    Args:
+        packets (Sequence[bytes]): The serialized packets.
+        timestamps (Optional[Iterable[float]]): The time each packet was received. Defaults to 0 for all packets.
+        parameters (Optional[Iterable[int]]): The parameters to decode, or None for all parameters with values of
+            up to 8 bytes.
+
+    Returns:
+        TimeSeries: The decoded values, sorted by time. Packets that are not responses or are invalid are counted as
+        rejected.
+    """
+    lengths = numpy.fromiter(map(len, packets), dtype=numpy.int64, count=len(packets))
+    starts = numpy.zeros_like(lengths)
+    numpy.cumsum(lengths[:-1], out=starts[1:])
+    buffer = numpy.frombuffer(b"".join(packets), dtype=numpy.uint8)
+    if timestamps is None:
+        times = numpy.zeros(len(packets), dtype=numpy.float64)
+    else:
+        times = numpy.fromiter(timestamps, dtype=numpy.float64, count=len(packets))
+    return _decode(buffer, starts, lengths, times, parameters)
+
+
+def decode_capture(
+        path: str,
+        direction: int = RECEIVED,
+        parameters: Optional[Iterable[int]] = DEFAULT_PARAMETERS
+) -> TimeSeries:
+    """
+    Decodes the values of fixed-size parameters from the responses in a file written by `CaptureLog`.
+
+    The file is memory-mapped, so only the records and the decoded values are held in memory.
+
+    Args:
+        path (str): The path of the capture file.
+        direction (int): The direction of the records to decode, `RECEIVED` or `SENT`.
+        parameters (Optional[Iterable[int]]): The parameters to decode, or None for all parameters with values of
+            up to 8 bytes.
+
+    Returns:
+        TimeSeries: The decoded values, sorted by time.
+
+    Raises:
+        ValueError: If the file is not a capture log.
+    """
+    buffer = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+    if bytes(buffer[:len(FILE_HEADER)]) != FILE_HEADER:
+        raise ValueError("Invalid capture file.")
+
+    # Records are variable-sized, so finding them takes a sequential scan of the length prefixes
+    offsets = array("q")
+    view = memoryview(buffer)
+    unpack_size = struct.Struct("<H").unpack_from
+    header_size = RECORD_HEADER.size
+    end = len(buffer)
+    index = len(FILE_HEADER)
+    while index + header_size <= end:
+        next_index = index + header_size + unpack_size(view, index + header_size - 2)[0]
+        if next_index > end:
+            break
+        offsets.append(index)
+        index = next_index
+    view.release()
+
+    records = numpy.frombuffer(offsets, dtype=numpy.int64)
+    records = records[buffer[records + 8] == direction]
+    times = buffer[records[:, None] + numpy.arange(8)].view("<f8").ravel()
+    lengths = buffer[records + header_size - 2].astype(numpy.int64) | (
+            buffer[records + header_size - 1].astype(numpy.int64) << 8)
+    return _decode(buffer, records + header_size, lengths, times, parameters)
+
+
+def _decode(
+        buffer: numpy.ndarray,
+        starts: numpy.ndarray,
+        lengths: numpy.ndarray,
+        times: numpy.ndarray,
+        parameters: Optional[Iterable[int]]
+) -> TimeSeries:
+    wanted = None if parameters is None else {int(p) for p in parameters}
+    columns: Tuple[List[numpy.ndarray], ...] = ([], [], [], [])
+    devices: Dict[str, int] = {}
+
+    valid = lengths >= MIN_PACKET_SIZE
+    rejected = len(lengths) - int(valid.sum())
+    starts, lengths, times = starts[valid], lengths[valid], times[valid]
+    for length in numpy.unique(lengths):
+        rows = numpy.flatnonzero(lengths == length)
+        for chunk in range(0, len(rows), CHUNK_SIZE):
+            selected = rows[chunk:chunk + CHUNK_SIZE]
+            block = buffer[starts[selected, None] + numpy.arange(length)]
+            rejected += _decode_block(block, times[selected], wanted, devices, columns)
+
+    if not columns[0]:
+        return TimeSeries(
+            numpy.zeros(0, dtype=numpy.float64),
+            numpy.zeros(0, dtype=numpy.int32),
+            numpy.zeros(0, dtype=numpy.uint16),
+            numpy.zeros(0, dtype=numpy.int64),
+            list(devices),
+            rejected,
+        )
+    timestamp, device, parameter, value = (numpy.concatenate(column) for column in columns)
+    order = numpy.argsort(timestamp, kind="stable")
+    return TimeSeries(timestamp[order], device[order], parameter[order], value[order], list(devices), rejected)
+
+
+def _decode_block(
+        block: numpy.ndarray,
+        times: numpy.ndarray,
+        wanted: Optional[set],
+        devices: Dict[str, int],
+        columns: Tuple[List[numpy.ndarray], ...]
+) -> int:
+    """
+    Decodes packets of the same size, one per row of the block.
+
+    Returns:
+        int: The number of rejected packets.
+    """
+    count, length = block.shape
+    rows = numpy.arange(count)
+    checksum = block[:, 2:length - 2].sum(axis=1, dtype=numpy.uint32) & 0xFFFF
+    valid = (
+            (block[:, 0] == HEADER[0]) & (block[:, 1] == HEADER[1]) & (block[:, 2] == PROTOCOL_TYPE)
+            & (checksum == (block[:, length - 2] | (block[:, length - 1].astype(numpy.uint32) << 8)))
+    )
+
+    # The credentials must leave room for the function type before the checksum
+    id_size = block[:, 3].astype(numpy.int64)
+    password_index = 4 + id_size
+    valid &= password_index < length - 3
+    password_size = block[rows, numpy.minimum(password_index, length - 1)].astype(numpy.int64)
+    function_index = password_index + 1 + password_size
+    valid &= function_index < length - 2
+    valid &= block[rows, numpy.minimum(function_index, length - 1)] == FunctionType.RESPONSE.value
+    rejected = count - int(valid.sum())
+
+    credentials = id_size << 8 | password_size
+    for key in numpy.unique(credentials[valid]):
+        members = numpy.flatnonzero(valid & (credentials == key))
+        packets = block[members]
+        id_size, password_size = int(key) >> 8, int(key) & 0xFF
+        device = _device_codes(packets[:, 4:4 + id_size], devices)
+        rejected += _decode_layouts(packets, 6 + id_size + password_size, times[members], device, wanted, columns)
+    return rejected
+
+
+def _device_codes(ids: numpy.ndarray, devices: Dict[str, int]) -> numpy.ndarray:
+    if ids.shape[1] == 0:
+        return numpy.full(len(ids), devices.setdefault("", len(devices)), dtype=numpy.int32)
+    names, inverse = numpy.unique(numpy.ascontiguousarray(ids).view(f"S{ids.shape[1]}").ravel(), return_inverse=True)
+    codes = numpy.array([devices.setdefault(str(name, "latin-1"), len(devices)) for name in names], dtype=numpy.int32)
+    return codes[inverse.ravel()]
+
+
+def _decode_layouts(
+        packets: numpy.ndarray,
+        data_index: int,
+        times: numpy.ndarray,
+        device: numpy.ndarray,
+        wanted: Optional[set],
+        columns: Tuple[List[numpy.ndarray], ...]
+) -> int:
+    """
+    Decodes packets with the same size and credential sizes. The layout of the data section is read from one
+    packet, and all packets with the same parameters in the same places are decoded with it. This repeats with the
+    remaining packets until all are decoded.
+
+    Returns:
+        int: The number of rejected packets.
+    """
+    rejected = 0
+    pending = numpy.arange(len(packets))
+    while len(pending):
+        reference = packets[pending[0]]
+        try:
+            structure, fields = _read_layout(reference.tobytes(), data_index)
+        except (ValueError, IndexError):
+            rejected += 1
+            pending = pending[1:]
+            continue
+        match = (packets[pending][:, structure] == reference[structure]).all(axis=1)
+        matched = pending[match]
+        pending = pending[~match]
+
+        for parameter, index, size in fields:
+            if (wanted is not None and parameter not in wanted) or not 0 < size <= MAX_VALUE_SIZE:
+                continue
+            decoder = VALUE_DECODERS.get(parameter) if size == size_table[parameter & 0xFF] else None
+            values = (decoder or _little_endian)(packets[matched, index:index + size])
+            columns[0].append(times[matched])
+            columns[1].append(device[matched])
+            columns[2].append(numpy.full(len(matched), parameter, dtype=numpy.uint16))
+            columns[3].append(values)
+    return rejected
+
+
+def _read_layout(data: bytes, index: int) -> Tuple[List[int], List[Tuple[int, int, int]]]:
+    """
+    Reads the layout of the data section of a response, the same way `Packet` decodes it.
+
+    Returns:
+        Tuple[List[int], List[Tuple[int, int, int]]]: The positions of the bytes that are not values (parameter
+        numbers, special bytes and sizes), and the parameter, position and size of each value.
+    """
+    structure = []
+    fields = []
+    page = 0
+    end = len(data) - 2
+    while index < end:
+        parameter = data[index]
+        structure.append(index)
+        index += 1
+        if parameter in (CHANGE_PAGE, NOT_SUPPORTED, CHANGE_FUNCTION):
+            if parameter == CHANGE_PAGE:
+                page = data[index]
+            structure.append(index)
+            index += 1
+            continue
+
+        if parameter == VALUE_SIZE:
+            size = data[index]
+            parameter = data[index + 1]
+            structure.extend((index, index + 1))
+            index += 2
+        elif page == 0:
+            size = size_table[parameter]
+            if size < 0:
+                raise ValueError(f"Invalid parameter [param={parameter}]")
+        else:
+            raise ValueError(f"Invalid parameter [param={page << 8 | parameter}]")
+        fields.append((page << 8 | parameter, index, size))
+        index += size
+    if index > end:
+        raise ValueError("Truncated data section.")
+    return structure, fields
@@ -0,0 +1,131 @@
+import os
+import socket
+import struct
+import time
+from typing import Optional
+
+from blaubergvento_client.protocol_client.capture_record import RECEIVED, SENT
+
+FILE_HEADER = b"BVCAP\x00\x00\x01"
+# Timestamp, direction, IPv4 address and length of the datagram, followed by the datagram itself
+RECORD_HEADER = struct.Struct("<dB4sH")
+DEFAULT_MAX_BYTES = 64 << 20
+DEFAULT_BACKUP_COUNT = 5
+BUFFER_SIZE = 1 << 16
+
+_NO_ADDRESS = bytes(4)
+
+
+class CaptureLog:
+    """
+    An append-only binary log of every datagram sent and received by a `ProtocolClient`.
+
+    Each datagram is stored as a timestamped, length-prefixed record. Records are written through a large buffer,
+    so capturing costs a struct pack and a memory copy per datagram and can be left on in production. When the
+    file reaches `max_bytes` it is rotated the way `logging.handlers.RotatingFileHandler` does: `capture.bin`
+    becomes `capture.bin.1`, `capture.bin.1` becomes `capture.bin.2` and so on, keeping `backup_count` old files.
+
+    Use `CaptureReader` to read a log back.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT):
+        """
+        Opens a capture log, appending to the file if it exists.
+
+        Args:
+            path (str): The path of the log file.
+            max_bytes (int): The size at which the file is rotated, or 0 to never rotate.
+            backup_count (int): The number of rotated files to keep.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._size = 0
+        self._open()
+
+    def record(self, data: bytes, ip: str, direction: int, timestamp: Optional[float] = None):
+        """
+        Appends a datagram to the log.
+
+        Args:
+            data (bytes): The raw datagram.
+            ip (str): The IP address the datagram was sent to or received from.
+            direction (int): `SENT` or `RECEIVED`.
+            timestamp (Optional[float]): The time of the datagram. Defaults to now.
+        """
+        if self._file is None:
+            return
+        try:
+            address = socket.inet_aton(ip)
+        except OSError:
+            address = _NO_ADDRESS
+        size = RECORD_HEADER.size + len(data)
+        if self.max_bytes and self._size + size > self.max_bytes and self._size > len(FILE_HEADER):
+            self.rotate()
+        self._file.write(RECORD_HEADER.pack(time.time() if timestamp is None else timestamp, direction, address,
+                                            len(data)) + data)
+        self._size += size
+
+    def sent(self, data: bytes, ip: str):
+        """
+        Appends a datagram sent by the client.
+
+        Args:
+            data (bytes): The raw datagram.
+            ip (str): The destination IP address.
+        """
+        self.record(data, ip, SENT)
+
+    def received(self, data: bytes, ip: str):
+        """
+        Appends a datagram received by the client.
+
+        Args:
+            data (bytes): The raw datagram.
+            ip (str): The source IP address.
+        """
+        self.record(data, ip, RECEIVED)
+
+    def rotate(self):
+        """
+        Closes the current file, shifts it and the older files one number up and starts a new file.
+        """
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def flush(self):
+        """
+        Writes buffered records to the file.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """
+        Flushes and closes the file. Records passed to a closed log are ignored.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "CaptureLog":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _open(self):
+        self._file = open(self.path, "ab", buffering=BUFFER_SIZE)
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(FILE_HEADER)
+            self._size = len(FILE_HEADER)
@@ -0,0 +1,97 @@
+import mmap
+import socket
+from typing import Iterator, Optional
+
+from blaubergvento_client.protocol_client.capture_log import FILE_HEADER, RECORD_HEADER
+from blaubergvento_client.protocol_client.capture_record import CaptureRecord
+from blaubergvento_client.protocol_client.packet import Packet
+
+
+class CaptureReader:
+    """
+    Reads a file written by `CaptureLog`.
+
+    The file is memory-mapped and records are decoded one at a time as they are iterated, so logs of any size can be
+    read without loading them into memory. A record cut off at the end of the file, e.g. because the writer was
+    still running, ends the iteration.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens a capture file.
+
+        Args:
+            path (str): The path of the file.
+
+        Raises:
+            ValueError: If the file is not a capture log.
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._map: Optional[mmap.mmap] = None
+        try:
+            header = self._file.read(len(FILE_HEADER))
+            if header != FILE_HEADER:
+                raise ValueError("Invalid capture file.")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return self.records()
+
+    def records(self, direction: Optional[int] = None) -> Iterator[CaptureRecord]:
+        """
+        Iterates the records in the file.
+
+        Args:
+            direction (Optional[int]): Only yield records with this direction, `SENT` or `RECEIVED`.
+
+        Returns:
+            Iterator[CaptureRecord]: The records in the order they were written.
+        """
+        buffer = self._map
+        end = len(buffer)
+        index = len(FILE_HEADER)
+        unpack_from = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        while index + header_size <= end:
+            timestamp, record_direction, address, size = unpack_from(buffer, index)
+            start = index + header_size
+            index = start + size
+            if index > end:
+                return
+            if direction is None or record_direction == direction:
+                yield CaptureRecord(timestamp, record_direction, socket.inet_ntoa(address), buffer[start:index])
+
+    def packets(self, direction: Optional[int] = None) -> Iterator[Packet]:
+        """
+        Iterates the decoded packets in the file. Datagrams that cannot be decoded are skipped.
+
+        Args:
+            direction (Optional[int]): Only yield packets with this direction, `SENT` or `RECEIVED`.
+
+        Returns:
+            Iterator[Packet]: The packets in the order they were written.
+        """
+        for record in self.records(direction):
+            try:
+                yield Packet.from_bytes(record.data)
+            except (ValueError, IndexError):
+                continue
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+
+SENT = 0
+RECEIVED = 1
+
+
+@dataclass
+class CaptureRecord:
+    """
+    A datagram read from a capture log.
+    """
+
+    timestamp: float
+    """The time (seconds since the epoch) the datagram was sent or received."""
+
+    direction: int
+    """`SENT` for datagrams sent by the client, `RECEIVED` for datagrams received by it."""
+
+    ip: str
+    """The IP address the datagram was sent to or received from."""
+
+    data: bytes
+    """The raw datagram."""
@@ -1,19 +1,29 @@
-import socket
-import time
+import asyncio
+import logging
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Sequence
 
+from blaubergvento_client.protocol_client.capture_log import CaptureLog
 from blaubergvento_client.protocol_client.packet import Packet
 from blaubergvento_client.protocol_client.function_type import FunctionType
+from blaubergvento_client.protocol_client.interfaces import broadcast_addresses, subnet_broadcast_address, subnet_hosts
 from blaubergvento_client.protocol_client.data_entry import DataEntry
-from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.protocol_client.metrics import Metrics, describe
+from blaubergvento_client.protocol_client.packing import merge_responses, pack_parameters
+from blaubergvento_client.protocol_client.parameter import Parameter, check_writable
+from blaubergvento_client.protocol_client.rate_limiter import RateLimiter
 from blaubergvento_client.protocol_client.response import Response
+from blaubergvento_client.protocol_client.rtt_estimator import RttEstimator
+from blaubergvento_client.protocol_client.transport import Transport, BROADCAST_ADDRESS, PORT, packet_parameters
 
-TIME_OUT = 1.0
-
-BROADCAST_ADDRESS = "255.255.255.255"
 DEFAULT_TIMEOUT = 0.3  # seconds
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 2.0
+DEFAULT_REQUEST_TIMEOUT = 1.0  # seconds
+HEDGE_PERCENTILE = 0.95
+DEFAULT_SWEEP_RATE = 200.0  # packets per second
+
+_LOGGER = logging.getLogger(__name__)
 
 
 @dataclass
@@ -32,22 +42,117 @@ class DeviceAddress:
 class ProtocolClient:
     """
     This class provides methods to discover Blauberg Vento devices on the local network
-    and to communicate with specific controllers via UDP.
+    and to communicate with specific controllers via UDP. All communication goes through one
+    non-blocking socket that is opened lazily on the running event loop.
     """
 
-    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+    def __init__(
+            self,
+            timeout: float = DEFAULT_TIMEOUT,
+            retries: int = DEFAULT_RETRIES,
+            backoff: float = DEFAULT_BACKOFF,
+            request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+            hedge: bool = False,
+            port: int = PORT,
+            broadcast_address: str = BROADCAST_ADDRESS,
+            metrics: Optional[Metrics] = None,
+            capture: Optional[CaptureLog] = None,
+            interfaces: bool = False,
+            subnets: Sequence[str] = (),
+            sweep: Sequence[str] = (),
+            sweep_rate: float = DEFAULT_SWEEP_RATE,
+            rate_limiter: Optional[RateLimiter] = None
+    ):
+        """
+        Creates a new ProtocolClient.
+
+        Args:
+            timeout (float): The time to listen for replies when discovering devices.
+            retries (int): The number of times a request is retransmitted when a device does not answer in time.
+            backoff (float): The factor the timeout is multiplied by for each retransmission.
+            request_timeout (float): The maximum time spent waiting for the answer to a request, over all its
+                transmissions, so a device that does not answer costs no more than this.
+            hedge (bool): Whether to send a duplicate request when a device has not answered within its 95th
+                percentile latency, before the timeout expires.
+            port (int): The UDP port the controllers listen on.
+            broadcast_address (str): The address search packets are broadcast to, e.g. a directed broadcast address
+                or the address of a simulator.
+            metrics (Optional[Metrics]): Optional metrics to record requests, responses and latencies in.
+            capture (Optional[CaptureLog]): Optional log to write every datagram sent and received to. The caller
+                owns the log and closes it.
+            interfaces (bool): Whether discovery also broadcasts on the directed broadcast address of every network
+                interface, for hosts attached to several networks.
+            subnets (Sequence[str]): Subnets in CIDR notation, e.g. "10.20.0.0/24", whose directed broadcast
+                addresses discovery also broadcasts on, for subnets that are routed rather than attached.
+            sweep (Sequence[str]): Subnets in CIDR notation whose hosts discovery sends a unicast search packet to
+                one by one, for networks that drop broadcasts.
+            sweep_rate (float): The maximum number of unicast search packets sent per second during a sweep.
+            rate_limiter (Optional[RateLimiter]): Optional limit of the packets sent per second to each device and in
+                total, including retransmissions and hedged requests. Discovery is not limited by it.
+        """
         self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+        self.hedge = hedge
+        self.port = port
+        self.broadcast_address = broadcast_address
+        self.metrics = metrics
+        self.capture = capture
+        self.interfaces = interfaces
+        self.subnets = list(subnets)
+        self.sweep = list(sweep)
+        self.sweep_rate = sweep_rate
+        self.rate_limiter = rate_limiter
+        self._transport: Optional[Transport] = None
+        self._estimators: Dict[str, RttEstimator] = {}
 
-    async def find_devices(self) -> List[DeviceAddress]:
+    async def find_devices(
+            self,
+            timeout: Optional[float] = None,
+            expected: Optional[int] = None,
+            idle_timeout: Optional[float] = None
+    ) -> List[DeviceAddress]:
         """
         Find devices on the network by emitting a broadcast packet and collecting all answering controllers.
 
+        Args:
+            timeout (Optional[float]): The maximum time to listen for replies. Defaults to the client's timeout.
+            expected (Optional[int]): Stop as soon as this many devices have answered.
+            idle_timeout (Optional[float]): Stop when no new device has answered for this long.
+
         Returns:
             List[DeviceAddress]: List of discovered devices.
         """
-        devices: List[DeviceAddress] = []
-        last_response_time = datetime.now()
+        return [address async for address in self.discover(timeout, expected, idle_timeout)]
 
+    async def discover(
+            self,
+            timeout: Optional[float] = None,
+            expected: Optional[int] = None,
+            idle_timeout: Optional[float] = None
+    ) -> AsyncIterator[DeviceAddress]:
+        """
+        Emits a broadcast search packet and yields each answering controller as soon as its reply arrives.
+
+        The packet is sent to the broadcast address and, depending on how the client is configured, at the same time
+        to the broadcast address of every interface and of every configured subnet. A unicast sweep of the `sweep`
+        subnets runs alongside, limited to `sweep_rate` packets per second.
+
+        Repeated replies from the same device, e.g. one reached both by a broadcast and by the sweep, are only
+        yielded once. Listening stops when the timeout expires, when `expected` devices have answered or when no new
+        device has answered for `idle_timeout` seconds, whichever comes first. The timeout bounds the whole
+        discovery, however many replies arrive. While a sweep is running listening
+        does not stop, and the timeouts start when the last packet of the sweep has been sent.
+
+        Args:
+            timeout (Optional[float]): The maximum time to listen for replies. Defaults to the client's timeout.
+            expected (Optional[int]): Stop as soon as this many devices have answered.
+            idle_timeout (Optional[float]): Stop when no new device has answered for this long.
+
+        Returns:
+            AsyncIterator[DeviceAddress]: The discovered devices in order of arrival.
+        """
         # Build the search packet
         packet = Packet(
             device_id="DEFAULT_DEVICEID",
@@ -56,58 +161,305 @@ class ProtocolClient:
             data_entries=[DataEntry.of(Parameter.SEARCH)]
         )
 
+        replies: asyncio.Queue = asyncio.Queue()
 
-        # Create UDP socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.settimeout(TIME_OUT)
+        def on_response(response: Response):
+            if any(e.parameter == Parameter.SEARCH for e in response.packet.data_entries):
+                replies.put_nowait(DeviceAddress(id=response.packet.device_id, ip=response.ip))
 
-        # Start listening
-        sock.bind(('', 0))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+        idle_deadline = loop.time() + idle_timeout if idle_timeout is not None else None
+        seen = set()
 
-        # Send the broadcast packet
-        sock.sendto(packet.to_bytes(), (BROADCAST_ADDRESS, 4000))
+        data = packet.to_bytes()
+        transport = await self._get_transport()
+        transport.add_listener(on_response)
+        sweep = asyncio.ensure_future(self._sweep(transport, data)) if self.sweep else None
+        reply = None
+        try:
+            for address in self._broadcast_addresses():
+                transport.sendto(data, address, self.port)
+            while expected is None or len(seen) < expected:
+                if sweep is not None and sweep.done():
+                    sweep.result()
+                    sweep = None
+                    deadline = loop.time() + (self.timeout if timeout is None else timeout)
+                    if idle_timeout is not None:
+                        idle_deadline = loop.time() + idle_timeout
+                if sweep is None:
+                    wait_time = deadline - loop.time()
+                    if idle_deadline is not None:
+                        wait_time = min(wait_time, idle_deadline - loop.time())
+                    if wait_time <= 0:
+                        break
+                else:
+                    wait_time = None
+
+                if reply is None:
+                    reply = asyncio.ensure_future(replies.get())
+                done, _ = await asyncio.wait(
+                    (reply,) if sweep is None else (reply, sweep),
+                    timeout=wait_time,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if reply not in done:
+                    if sweep is None:
+                        break
+                    continue
+                address = reply.result()
+                reply = None
+                if address.id in seen:
+                    # Repeated replies do not count as activity, so they cannot keep discovery running
+                    continue
+                seen.add(address.id)
+                if idle_timeout is not None:
+                    idle_deadline = loop.time() + idle_timeout
+                _LOGGER.debug("Received search reply from %s: %s", address.ip, address.id)
+                yield address
+        finally:
+            transport.remove_listener(on_response)
+            for task in (reply, sweep):
+                if task is not None:
+                    task.cancel()
+
+    def _broadcast_addresses(self) -> List[str]:
+        """
+        Gets the addresses discovery broadcasts to.
 
-        # Listen for replies (on the ephemeral port)
-        start_time = time.time()
-        while True:
-            try:
-                data, addr = sock.recvfrom(1024)
-                packet = Packet.from_bytes(data)
-                devices.append(DeviceAddress(id= packet.device_id, ip=addr[0]))
-                print(f"Received reply from {addr}: {packet}")
-            except socket.timeout:
-                break
-            if time.time() - start_time > 1:
-                break
+        Returns:
+            List[str]: The broadcast addresses, without duplicates.
+        """
+        addresses = [self.broadcast_address]
+        if self.interfaces:
+            addresses.extend(broadcast_addresses())
+        addresses.extend(subnet_broadcast_address(subnet) for subnet in self.subnets)
+        return list(dict.fromkeys(addresses))
 
-        sock.close()
+    async def _sweep(self, transport: Transport, data: bytes):
+        """
+        Sends a search packet to every host of the sweep subnets, at most `sweep_rate` packets per second.
 
-        return devices
+        Args:
+            transport (Transport): The transport to send through.
+            data (bytes): The serialized search packet.
+        """
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        for count, host in enumerate(subnet_hosts(self.sweep)):
+            delay = started_at + count / self.sweep_rate - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            transport.sendto(data, host, self.port)
 
     async def send(self, packet: Packet, ip: str = BROADCAST_ADDRESS) -> Optional[Response]:
         """
         Sends a packet to a specific controller.
 
+        The request shares the client's socket with all other in-flight requests, so many devices can be
+        addressed concurrently without blocking the event loop.
+
         Args:
             packet (Packet): The packet to send.
             ip (str): The IP address of the controller (default is broadcast).
 
         Returns:
             Response | None: The response packet, or None if no response is received.
+
+        Raises:
+            ValueError: If the packet writes a parameter that can only be read.
+        """
+        if packet.function_type in (FunctionType.WRITE, FunctionType.WRITEREAD):
+            check_writable(entry.parameter for entry in packet.data_entries)
+        return await self.send_bytes(packet.to_bytes(), packet.device_id, ip, packet_parameters(packet))
+
+    async def read_parameters(
+            self,
+            device_id: str,
+            password: str,
+            parameters: Iterable[int],
+            ip: str = BROADCAST_ADDRESS
+    ) -> Optional[Response]:
+        """
+        Reads an arbitrary set of parameters from a specific controller.
+
+        The parameters are packed into as few READ packets as the maximum packet size allows. The packets are sent
+        concurrently, each response is matched to the packet it answers, and the responses are merged into one.
+
+        Args:
+            device_id (str): The id of the device.
+            password (str): The password of the device.
+            parameters (Iterable[int]): The parameters to read.
+            ip (str): The IP address of the controller (default is broadcast).
+
+        Returns:
+            Response | None: The merged response, or None if no response is received. Parameters that were in
+            unanswered packets are listed in its `missing` attribute.
+        """
+        groups = pack_parameters(device_id, password, parameters)
+        packets = [Packet(device_id, password, FunctionType.READ, [DataEntry(p) for p in group]) for group in groups]
+        responses = await asyncio.gather(*(self.send(packet, ip) for packet in packets))
+        merged = merge_responses(responses)
+        if merged is None:
+            return None
+        received = packet_parameters(merged.packet)
+        merged.missing = [p for group in groups for p in group if p not in received]
+        if merged.missing:
+            _LOGGER.debug("Parameters not received from %s: %s", device_id, merged.missing)
+        return merged
+
+    async def send_bytes(
+            self,
+            data: bytes,
+            device_id: str,
+            ip: str = BROADCAST_ADDRESS,
+            parameters: Optional[FrozenSet[int]] = None
+    ) -> Optional[Response]:
         """
+        Sends an already serialized packet to a specific controller, e.g. one built by a `RequestTemplate`.
+
+        Only a response containing the parameters of the request is accepted as its answer, so concurrent requests
+        to the same device are not answered by each other's responses.
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.setblocking(True)
-        sock.settimeout(1.0)
+        The timeout is derived from the round trip times previously measured for the device. If the device does not
+        answer in time, the packet is retransmitted up to `retries` times with an exponentially growing timeout,
+        until `request_timeout` seconds have been spent waiting. Once the request is answered, the reply to a hedged
+        duplicate still in flight is dropped, so it does not answer a later request with stale values. With a rate
+        limiter, each transmission first waits for the limiter, and the time spent waiting counts neither towards the
+        timeouts nor towards the measured round trip times and latencies.
 
-        # Send packet
-        sock.sendto(packet.to_bytes(), (ip, 4000))
+        Args:
+            data (bytes): The serialized packet.
+            device_id (str): The id of the device the packet is addressed to.
+            ip (str): The IP address of the controller (default is broadcast).
+            parameters (Optional[FrozenSet[int]]): The parameters of the request. Defaults to the parameters
+                decoded from `data`.
 
+        Returns:
+            Response | None: The response packet, or None if no response is received.
+        """
+        if parameters is None:
+            parameters = packet_parameters(Packet.from_bytes(data))
+        transport = await self._get_transport()
+        estimator = self.estimator(device_id)
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics
+        limiter = self.rate_limiter
+        function = describe(data)[1] if metrics is not None else None
+        if ip in (BROADCAST_ADDRESS, self.broadcast_address):
+            # Any controller may answer a broadcast
+            ip = self.broadcast_address
+            source = BROADCAST_ADDRESS
+        else:
+            source = ip
+        waiter = transport.expect(device_id, source, parameters)
+        # The time the answer arrived, as the request may be waiting for the limiter when it does
+        answered_at = []
+        waiter.add_done_callback(lambda _: answered_at.append(loop.time()))
         try:
-            data, addr = sock.recvfrom(1024)
-            received_packet = Packet.from_bytes(data)
-            if received_packet.function_type == FunctionType.RESPONSE:
-                return Response(packet=received_packet, ip=addr[0])
+            timeout = estimator.rto
+            started_at = None
+            remaining = self.request_timeout
+            for attempt in range(self.retries + 1):
+                if remaining <= 0:
+                    break
+                timeout = min(timeout, remaining)
+                if limiter is not None:
+                    await limiter.acquire(ip)
+                sent_at = loop.time()
+                if started_at is None:
+                    started_at = sent_at
+                queued = 0.0
+                transmissions = 0
+                if not waiter.done():
+                    transport.sendto(data, ip, self.port)
+                    transmissions += 1
+
+                hedge_delay = estimator.percentile(HEDGE_PERCENTILE) if self.hedge else None
+                if hedge_delay is not None and hedge_delay < timeout:
+                    await asyncio.wait((waiter,), timeout=hedge_delay)
+                    if not waiter.done() and limiter is not None:
+                        queued_at = loop.time()
+                        await limiter.acquire(ip)
+                        queued = loop.time() - queued_at
+                    if not waiter.done():
+                        transport.sendto(data, ip, self.port)
+                        transmissions += 1
+
+                await asyncio.wait((waiter,), timeout=max(0.0, sent_at + queued + timeout - loop.time()))
+                remaining -= loop.time() - sent_at - queued
+                if waiter.done():
+                    if waiter.cancelled():
+                        return None
+                    answered = answered_at[0] if answered_at else loop.time()
+                    # Responses to retransmissions are ambiguous and not sampled (Karn's algorithm). Responses to
+                    # hedged requests are measured from the first transmission, to not bias the estimate downwards.
+                    if attempt == 0:
+                        estimator.update(answered - sent_at)
+                    if limiter is not None:
+                        limiter.on_response(ip)
+                    if metrics is not None:
+                        metrics.increment("responses", device_id, function)
+                        metrics.observe_latency(device_id, function, answered - started_at)
+                    # The hedged duplicate may still be answered until this attempt would have timed out. Earlier
+                    # attempts timed out before this one was sent, so they are taken as lost.
+                    window = sent_at + queued + timeout - answered
+                    transport.ignore(device_id, source, parameters, transmissions - 1, window)
+                    return waiter.result()
+                if metrics is not None:
+                    metrics.increment("timeouts", device_id, function)
+                if limiter is not None:
+                    limiter.on_timeout(ip, sent_at)
+                timeout = min(timeout * self.backoff, estimator.max_rto)
+            if metrics is not None:
+                metrics.increment("failures", device_id, function)
+            return None
         finally:
-            sock.close()
+            transport.discard(device_id, waiter)
+
+    def estimator(self, device_id: str) -> RttEstimator:
+        """
+        Gets the round trip time estimator of a device, which determines the timeouts of requests to it.
+
+        Args:
+            device_id (str): The id of the device.
+
+        Returns:
+            RttEstimator: The estimator for the device.
+        """
+        estimator = self._estimators.get(device_id)
+        if estimator is None:
+            estimator = self._estimators[device_id] = RttEstimator()
+        return estimator
+
+    def close(self):
+        """
+        Closes the socket used by the client. A new one is opened automatically on the next request.
+        """
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def __aenter__(self) -> "ProtocolClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def _get_transport(self) -> Transport:
+        """
+        Gets the shared transport, opening it on the running event loop if needed.
+
+        Returns:
+            Transport: The transport bound to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        transport = self._transport
+        if transport is None or transport.closed or transport.loop is not loop:
+            transport = await Transport.open(self.metrics, self.capture)
+            if self._transport is not None and not self._transport.closed and self._transport.loop is loop:
+                # Another task opened a transport while we were waiting
+                transport.close()
+            else:
+                self._transport = transport
+        return self._transport
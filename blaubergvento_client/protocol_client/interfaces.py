@@ -0,0 +1,75 @@
+import ipaddress
+import socket
+import struct
+from typing import Iterable, Iterator, List
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl requests and interface flags from <linux/sockios.h> and <net/if.h>
+_SIOCGIFFLAGS = 0x8913
+_SIOCGIFBRDADDR = 0x8919
+_IFF_UP = 0x1
+_IFF_BROADCAST = 0x2
+
+
+def broadcast_addresses() -> List[str]:
+    """
+    Gets the directed broadcast addresses of the network interfaces that are up and support broadcasting.
+
+    Sending to the directed broadcast address of each interface reaches the devices on every attached network,
+    whereas the limited broadcast address (255.255.255.255) is usually only sent out of the interface of the
+    default route. Interfaces are enumerated with ioctl calls, which are only available on Linux. On other
+    platforms the list is empty.
+
+    Returns:
+        List[str]: The broadcast addresses, without duplicates.
+    """
+    if fcntl is None or not hasattr(socket, "if_nameindex"):
+        return []
+    addresses = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, name in socket.if_nameindex():
+            request = struct.pack("256s", name.encode()[:15])
+            try:
+                flags = struct.unpack_from("H", fcntl.ioctl(sock.fileno(), _SIOCGIFFLAGS, request), 16)[0]
+                if not flags & _IFF_UP or not flags & _IFF_BROADCAST:
+                    continue
+                result = fcntl.ioctl(sock.fileno(), _SIOCGIFBRDADDR, request)
+            except OSError:
+                # The interface has no IPv4 address
+                continue
+            address = socket.inet_ntoa(result[20:24])
+            if address not in addresses:
+                addresses.append(address)
+    return addresses
+
+
+def subnet_broadcast_address(subnet: str) -> str:
+    """
+    Gets the directed broadcast address of a subnet.
+
+    Args:
+        subnet (str): The subnet in CIDR notation, e.g. "192.168.10.0/24". Host bits are ignored.
+
+    Returns:
+        str: The broadcast address, e.g. "192.168.10.255".
+    """
+    return str(ipaddress.ip_network(subnet, strict=False).broadcast_address)
+
+
+def subnet_hosts(subnets: Iterable[str]) -> Iterator[str]:
+    """
+    Lazily enumerates the host addresses of a number of subnets.
+
+    Args:
+        subnets (Iterable[str]): The subnets in CIDR notation. Host bits are ignored.
+
+    Returns:
+        Iterator[str]: The host addresses, excluding the network and broadcast addresses.
+    """
+    for subnet in subnets:
+        for host in ipaddress.ip_network(subnet, strict=False).hosts():
+            yield str(host)
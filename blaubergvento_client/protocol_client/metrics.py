@@ -0,0 +1,228 @@
+import bisect
+from typing import Dict, List, Tuple
+
+from blaubergvento_client.protocol_client.function_type import FunctionType
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # seconds
+PREFIX = "blaubergvento"
+
+# Descriptions of the counters, in the order they are exported
+COUNTERS = {
+    "requests": "Datagrams sent to controllers, including retransmissions.",
+    "responses": "Responses matched to a request.",
+    "timeouts": "Requests that were not answered in time, counted per attempt.",
+    "failures": "Requests that were not answered after all retransmissions.",
+    "bytes_sent": "Bytes sent to controllers.",
+    "bytes_received": "Bytes received from controllers.",
+    "decode_errors": "Datagrams that could not be decoded, by reason.",
+}
+
+# Reasons for decode errors, keyed by the message of the ValueError raised by Packet.from_bytes
+DECODE_ERROR_REASONS = {
+    "Invalid header.": "header",
+    "Invalid protocol type.": "protocol_type",
+    "Invalid checksum.": "checksum",
+}
+
+_FUNCTION_NAMES = {f.value: f.name for f in FunctionType}
+
+Labels = Tuple[str, str]
+
+
+class Histogram:
+    """
+    A latency histogram with fixed bucket bounds.
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Creates a new Histogram.
+
+        Args:
+            bounds (Tuple[float, ...]): The upper bounds of the buckets in ascending order.
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Adds a value.
+
+        Args:
+            value (float): The value.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """
+        Gets the cumulative counts of the buckets, the last one being the count of all values.
+
+        Returns:
+            List[int]: The cumulative counts.
+        """
+        result = []
+        total = 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class Metrics:
+    """
+    Counters and latency histograms for the protocol layer, kept per device and function type.
+
+    Pass an instance to `ProtocolClient` to enable collection. A client without metrics only pays for a check
+    against None on each request.
+    """
+
+    def __init__(self, per_device: bool = True, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        """
+        Creates a new Metrics instance.
+
+        Args:
+            per_device (bool): Whether to keep values per device. Disable it for very large fleets to keep the
+                number of series small, in which case all devices are aggregated.
+            buckets (Tuple[float, ...]): The upper bounds of the latency buckets in seconds.
+        """
+        self.per_device = per_device
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[Labels, int]] = {name: {} for name in COUNTERS}
+        self._latencies: Dict[Labels, Histogram] = {}
+
+    def increment(self, name: str, device_id: str, function: str, amount: int = 1):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The name of the counter, one of `COUNTERS`.
+            device_id (str): The id of the device.
+            function (str): The function type name, or for decode errors the reason.
+            amount (int): The amount to add.
+        """
+        labels = (device_id if self.per_device else "", function)
+        counter = self._counters[name]
+        counter[labels] = counter.get(labels, 0) + amount
+
+    def observe_latency(self, device_id: str, function: str, seconds: float):
+        """
+        Records the latency of an answered request.
+
+        Args:
+            device_id (str): The id of the device.
+            function (str): The function type name.
+            seconds (float): The time from the first transmission until the response arrived.
+        """
+        labels = (device_id if self.per_device else "", function)
+        histogram = self._latencies.get(labels)
+        if histogram is None:
+            histogram = self._latencies[labels] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def record_sent(self, data: bytes):
+        """
+        Records a datagram sent to a controller.
+
+        Args:
+            data (bytes): The serialized packet.
+        """
+        device_id, function = describe(data)
+        self.increment("requests", device_id, function)
+        self.increment("bytes_sent", device_id, function, len(data))
+
+    def record_decode_error(self, error: Exception, size: int):
+        """
+        Records a datagram that could not be decoded.
+
+        Args:
+            error (Exception): The error raised by `Packet.from_bytes`.
+            size (int): The size of the datagram.
+        """
+        reason = DECODE_ERROR_REASONS.get(str(error), "malformed") if isinstance(error, ValueError) else "malformed"
+        self.increment("decode_errors", "", reason)
+        self.increment("bytes_received", "", "UNKNOWN", size)
+
+    def snapshot(self) -> dict:
+        """
+        Gets a copy of all values.
+
+        Returns:
+            dict: The counters as `{name: {(device, function): value}}` and the latencies as
+            `{(device, function): {"count", "sum", "buckets"}}`, where buckets maps upper bounds to cumulative counts.
+        """
+        return {
+            "counters": {name: dict(values) for name, values in self._counters.items()},
+            "latencies": {
+                labels: {
+                    "count": h.count,
+                    "sum": h.sum,
+                    "buckets": dict(zip(list(h.bounds) + [float("inf")], h.cumulative())),
+                }
+                for labels, h in self._latencies.items()
+            },
+        }
+
+    def reset(self):
+        """
+        Resets all values to zero.
+        """
+        self._counters = {name: {} for name in COUNTERS}
+        self._latencies = {}
+
+    def to_prometheus(self) -> str:
+        """
+        Exports all values in the Prometheus text exposition format.
+
+        Returns:
+            str: The exported metrics.
+        """
+        lines = []
+        for name, description in COUNTERS.items():
+            metric = f"{PREFIX}_{name}_total"
+            label = "reason" if name == "decode_errors" else "function"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            for (device_id, function), value in sorted(self._counters[name].items()):
+                lines.append(f"{metric}{{{_labels(device_id, **{label: function})}}} {value}")
+
+        metric = f"{PREFIX}_request_latency_seconds"
+        lines.append(f"# HELP {metric} Time from sending a request until its response arrived.")
+        lines.append(f"# TYPE {metric} histogram")
+        for (device_id, function), h in sorted(self._latencies.items()):
+            labels = _labels(device_id, function=function)
+            for bound, count in zip(h.bounds, h.cumulative()):
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f"{metric}_sum{{{labels}}} {h.sum}")
+            lines.append(f"{metric}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def describe(data: bytes) -> Tuple[str, str]:
+    """
+    Extracts the device id and function type name from a serialized packet without decoding it.
+
+    Args:
+        data (bytes): The serialized packet.
+
+    Returns:
+        Tuple[str, str]: The device id and the function type name.
+    """
+    index = 4 + data[3]
+    device_id = str(data[4:index], "latin-1")
+    index += 1 + data[index]
+    return device_id, _FUNCTION_NAMES.get(data[index], "UNKNOWN")
+
+
+def _labels(device_id: str, **labels: str) -> str:
+    pairs = [("device", device_id)] if device_id else []
+    pairs.extend(labels.items())
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in pairs)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
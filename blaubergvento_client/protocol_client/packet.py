@@ -1,11 +1,25 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from blaubergvento_client.protocol_client.data_entry import DataEntry
 from blaubergvento_client.protocol_client.function_type import FunctionType
-from blaubergvento_client.protocol_client.parameter import Parameter, get_size
+from blaubergvento_client.protocol_client.parameter import parameter_table, size_table
 
 MAX_PACKET_SIZE = 256
 HEADER = [0xFD, 0xFD]
 PROTOCOL_TYPE = 0x02
+PREAMBLE = bytes(HEADER + [PROTOCOL_TYPE])
+
+# Function types whose data section carries values
+VALUE_FUNCTIONS = (FunctionType.WRITE, FunctionType.WRITEREAD, FunctionType.RESPONSE)
+
+# Special bytes in the data section
+CHANGE_FUNCTION = 0xFC
+"""Followed by a function type that applies to the rest of the packet."""
+NOT_SUPPORTED = 0xFD
+"""Followed by the number of a parameter the device does not support."""
+VALUE_SIZE = 0xFE
+"""Followed by the size of the value of the next parameter, for values without a fixed size."""
+CHANGE_PAGE = 0xFF
+"""Followed by the page (high byte) of the parameter numbers that follow."""
 
 
 class Packet:
@@ -16,7 +30,14 @@ class Packet:
     function types, data entries, and a checksum to ensure data integrity.
     """
 
-    def __init__(self, device_id: str, password: str, function_type: FunctionType, data_entries: List[DataEntry]):
+    def __init__(
+            self,
+            device_id: str,
+            password: str,
+            function_type: FunctionType,
+            data_entries: List[DataEntry],
+            unsupported_parameters: Optional[List[int]] = None
+    ):
         """
         Creates a new Packet instance.
 
@@ -24,11 +45,13 @@ class Packet:
         :param password: The password for the device.
         :param function_type: The type of function to perform.
         :param data_entries: The data entries to include in the packet.
+        :param unsupported_parameters: The parameters a device reported as not supported (responses only).
         """
         self._device_id = device_id
         self._password = password
         self._function_type = function_type
         self._data_entries = data_entries
+        self._unsupported_parameters = unsupported_parameters if unsupported_parameters is not None else []
 
     @property
     def device_id(self) -> str:
@@ -50,6 +73,11 @@ class Packet:
         """Gets the data entries."""
         return self._data_entries
 
+    @property
+    def unsupported_parameters(self) -> List[int]:
+        """Gets the parameters the device reported as not supported."""
+        return self._unsupported_parameters
+
     def to_bytes(self) -> bytes:
         """
         Serializes the packet to a byte array.
@@ -59,120 +87,163 @@ class Packet:
 
         :return: The serialized byte array of the packet.
         """
-        bytes_arr = bytearray(MAX_PACKET_SIZE)
-        index = 0
+        buffer = bytearray(MAX_PACKET_SIZE)
+        size = self.write_into(buffer)
+        return bytes(memoryview(buffer)[:size])
 
-        # Header
-        bytes_arr[index] = HEADER[0]
-        index += 1
-        bytes_arr[index] = HEADER[1]
-        index += 1
+    def write_into(self, buffer) -> int:
+        """
+        Serializes the packet into a writable buffer, e.g. a reusable `bytearray` or a `memoryview` of one.
 
-        # Protocol Type
-        bytes_arr[index] = PROTOCOL_TYPE
-        index += 1
+        :param buffer: The buffer to write to. It must hold at least `MAX_PACKET_SIZE` bytes to fit any packet.
+        :return: The number of bytes written.
+        :raises IndexError: If the packet does not fit in the buffer.
+        """
+        view = memoryview(buffer)
+        capacity = len(view)
+
+        # Header and protocol type
+        view[0:3] = PREAMBLE
+        index = 3
 
         # Credentials
-        index = self._write_credential(bytes_arr, index, self._device_id)
-        index = self._write_credential(bytes_arr, index, self._password)
+        index = Packet._write_credential(view, index, self._device_id)
+        index = Packet._write_credential(view, index, self._password)
 
         # Function
-        bytes_arr[index] = self._function_type.value
+        if index >= capacity:
+            raise IndexError("Packet exceeds buffer size.")
+        view[index] = self._function_type.value
         index += 1
 
-        # Data
+        # Data. Single byte writes past the end of the buffer raise IndexError by themselves.
+        write_values = self._function_type in VALUE_FUNCTIONS
+        page = 0
         for e in self._data_entries:
-            bytes_arr[index] = e.parameter
+            number = e.parameter
+            if number >> 8 != page:
+                page = number >> 8
+                view[index] = CHANGE_PAGE
+                view[index + 1] = page
+                index += 2
+
+            value = e.value if write_values else None
+            if value is None:
+                view[index] = number & 0xFF
+                index += 1
+                continue
+
+            size = size_table[number] if page == 0 else -1
+            if size <= 0:
+                # Values without a known size are prefixed with their size
+                size = len(value)
+                view[index] = VALUE_SIZE
+                view[index + 1] = size
+                index += 2
+            view[index] = number & 0xFF
             index += 1
-            if e.value is not None and self.function_type in (FunctionType.WRITE, FunctionType.WRITEREAD):
-                size = get_size(e.parameter)
-                for i in range(size):
-                    bytes_arr[index] = e.value[i]
-                    index += 1
+            if index + size > capacity:
+                raise IndexError("Packet exceeds buffer size.")
+            view[index:index + size] = value[:size]
+            index += size
+
+        for number in self._unsupported_parameters:
+            if number >> 8 != page:
+                page = number >> 8
+                view[index] = CHANGE_PAGE
+                view[index + 1] = page
+                index += 2
+            view[index] = NOT_SUPPORTED
+            view[index + 1] = number & 0xFF
+            index += 2
 
         # CRC
-        checksum = Packet._calculate_checksum(bytes_arr[2:index])
-        bytes_arr[index] = checksum & 0xFF
-        index += 1
-        bytes_arr[index] = (checksum >> 8) & 0xFF
-        index += 1
-
-        # Trim
-        return bytes(bytes_arr[:index])
+        if index + 2 > capacity:
+            raise IndexError("Packet exceeds buffer size.")
+        checksum = Packet._calculate_checksum(view[2:index])
+        view[index] = checksum & 0xFF
+        view[index + 1] = (checksum >> 8) & 0xFF
+        return index + 2
 
     @staticmethod
-    def from_bytes(bytes_arr: bytes) -> "Packet":
+    def from_bytes(bytes_arr) -> "Packet":
         """
         Deserializes a byte array into a Packet instance.
 
+        Any bytes-like object is accepted, so a packet can be decoded straight from a slice of a reusable receive
+        buffer filled by `socket.recv_into`. Values are copied out of the buffer, which may therefore be reused
+        as soon as this method returns.
+
         :param bytes_arr: The byte array to deserialize.
         :return: The deserialized Packet instance.
         :raises ValueError: If the header, protocol type, or checksum are invalid.
         """
-        index = 0
+        view = memoryview(bytes_arr)
 
         # Header
-        if bytes_arr[index] != HEADER[0] or bytes_arr[index + 1] != HEADER[1]:
+        if view[0] != HEADER[0] or view[1] != HEADER[1]:
             raise ValueError("Invalid header.")
-        index += 2
 
         # Protocol Type
-        protocol_type = bytes_arr[index]
-        if protocol_type != PROTOCOL_TYPE:
+        if view[2] != PROTOCOL_TYPE:
             raise ValueError("Invalid protocol type.")
-        index += 1
+        index = 3
 
         # Checksum
-        checksum = Packet._calculate_checksum(bytes_arr[2:-2])
-        data_checksum = bytes_arr[-2] + (bytes_arr[-1] << 8)
+        checksum = Packet._calculate_checksum(view[2:-2])
+        data_checksum = view[-2] + (view[-1] << 8)
         if checksum != data_checksum:
             raise ValueError("Invalid checksum.")
 
         # Controller ID
-        controller_id, index = Packet._read_credential(bytes_arr, index)
+        controller_id, index = Packet._read_credential(view, index)
 
         # Password
-        password, index = Packet._read_credential(bytes_arr, index)
+        password, index = Packet._read_credential(view, index)
 
         # Function
-        function_type = FunctionType(bytes_arr[index])
+        function_type = FunctionType(view[index])
         index += 1
 
         # Data
-        data_entries, _ = Packet._read_parameters(bytes_arr, index)
+        data_entries, unsupported_parameters, _ = Packet._read_parameters(
+            view, index, function_type in VALUE_FUNCTIONS
+        )
 
-        return Packet(controller_id, password, function_type, data_entries)
+        return Packet(controller_id, password, function_type, data_entries, unsupported_parameters)
 
     @staticmethod
-    def _read_credential(bytes_arr: bytes, index: int) -> Tuple[str, int]:
+    def _read_credential(view: memoryview, index: int) -> Tuple[str, int]:
         """
         Reads a credential from the byte array.
 
-        :param bytes_arr: The byte array containing the credential.
+        :param view: A memoryview of the byte array containing the credential.
         :param index: The starting index to read from.
         :return: A tuple containing the credential string and the next index.
         """
-        credential_size = bytes_arr[index]
+        credential_size = view[index]
         index += 1
-        credential = ''.join(chr(bytes_arr[index + i]) for i in range(credential_size))
-        index += credential_size
-        return credential, index
+        credential = str(view[index:index + credential_size], "latin-1")
+        return credential, index + credential_size
 
-    def _write_credential(self, bytes_arr: bytearray, index: int, value: str) -> int:
+    @staticmethod
+    def _write_credential(view: memoryview, index: int, value: str) -> int:
         """
         Writes a credential to the byte array.
 
-        :param bytes_arr: The byte array to write to.
+        :param view: A memoryview of the byte array to write to.
         :param index: The starting index to write at.
         :param value: The credential to write.
         :return: The next index after writing the credential.
         """
-        bytes_arr[index] = len(value)
+        encoded = value.encode("latin-1")
+        size = len(encoded)
+        if index + 1 + size > len(view):
+            raise IndexError("Packet exceeds buffer size.")
+        view[index] = size
         index += 1
-        for char in value:
-            bytes_arr[index] = ord(char)
-            index += 1
-        return index
+        view[index:index + size] = encoded
+        return index + size
 
     def __str__(self) -> str:
         entries_str = ', '.join(str(e) for e in self._data_entries)
@@ -186,42 +257,65 @@ class Packet:
         )
 
     @staticmethod
-    def _read_parameters(bytes_arr: bytes, index: int) -> Tuple[List[DataEntry], int]:
+    def _read_parameters(view: memoryview, index: int, with_values: bool) -> Tuple[List[DataEntry], List[int], int]:
         """
         Reads data entries (parameters and values) from the byte array.
 
-        :param bytes_arr: The byte array containing the data entries.
+        :param view: A memoryview of the byte array containing the data entries.
         :param index: The starting index to read from.
-        :return: A tuple containing the array of DataEntry objects and the next index.
+        :param with_values: Whether the parameters are followed by values, which is not the case for requests
+                            such as READ.
+        :return: A tuple containing the array of DataEntry objects, the parameters reported as not supported
+                 and the next index.
         """
         entries = []
-        while index < len(bytes_arr) - 3:
-            parameter = bytes_arr[index]
+        unsupported = []
+        page = 0
+        end = len(view) - 2
+        while index < end:
+            parameter = view[index]
             index += 1
-            size = 1
-            if parameter == 0xFE:
-                size = bytes_arr[index]
+            if parameter == CHANGE_PAGE:
+                page = view[index]
                 index += 1
-                parameter = bytes_arr[index]
+                continue
+            if parameter == NOT_SUPPORTED:
+                unsupported.append(page << 8 | view[index])
                 index += 1
-            else:
-                size = get_size(Parameter(parameter))
+                continue
+            if parameter == CHANGE_FUNCTION:
+                index += 1
+                continue
+
+            if parameter == VALUE_SIZE:
+                size = view[index]
+                parameter = view[index + 1]
+                index += 2
+            elif not with_values:
+                size = 0
+            elif page == 0:
+                size = size_table[parameter]
                 if size < 0:
                     raise ValueError(f"Invalid parameter [param={parameter}]")
+            else:
+                raise ValueError(f"Invalid parameter [param={page << 8 | parameter}]")
 
             value = None
             if size > 0:
-                value = bytes_arr[index:index + size]
+                value = bytes(view[index:index + size])
                 index += size
-            entries.append(DataEntry(parameter, value))
-        return entries, index
+            if page == 0:
+                entries.append(DataEntry(parameter_table[parameter] or parameter, value))
+            else:
+                entries.append(DataEntry(page << 8 | parameter, value))
+        return entries, unsupported, index
 
     @staticmethod
     def _calculate_checksum(bytes_arr: bytes) -> int:
         """
         Calculates the checksum for a byte array.
 
-        :param bytes_arr: The byte array to calculate the checksum for.
+        :param bytes_arr: The byte array (or memoryview of one) to calculate the checksum for.
         :return: The calculated checksum.
         """
         return sum(bytes_arr) & 0xFFFF
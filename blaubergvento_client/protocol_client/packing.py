@@ -0,0 +1,107 @@
+from typing import Iterable, List, Optional
+
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.packet import MAX_PACKET_SIZE, PREAMBLE, Packet
+from blaubergvento_client.protocol_client.parameter import size_table
+from blaubergvento_client.protocol_client.response import Response
+
+VARIABLE_SIZE_RESERVE = 64
+"""The number of bytes reserved in a response for a value without a fixed size, e.g. a Wi-Fi name."""
+
+
+def estimate_response_size(parameter: int) -> int:
+    """
+    Estimates the number of bytes a parameter occupies in the data section of a response.
+
+    :param parameter: The parameter number.
+    :return: The estimated size, including the parameter byte.
+    """
+    size = size_table[parameter] if parameter <= 0xFF else -1
+    if size > 0:
+        return 1 + size
+    # Size marker, size, parameter and the value itself
+    return 3 + VARIABLE_SIZE_RESERVE
+
+
+def pack_parameters(
+        device_id: str,
+        password: str,
+        parameters: Iterable[int],
+        max_size: int = MAX_PACKET_SIZE
+) -> List[List[int]]:
+    """
+    Splits a set of parameters into as few groups as possible, such that the response to a read of each group
+    fits within `max_size` bytes.
+
+    The groups are filled first-fit in order of decreasing size, and the parameters of each group are sorted
+    by number so each page marker is only needed once. Duplicate parameters are read once.
+
+    :param device_id: The device ID the requests will carry.
+    :param password: The password the requests will carry.
+    :param parameters: The parameters to read.
+    :param max_size: The maximum size of a datagram.
+    :return: The groups of parameters, one per request.
+    :raises ValueError: If a single parameter cannot fit in a datagram.
+    """
+    # Preamble, credentials with their sizes, function and checksum
+    overhead = len(PREAMBLE) + 1 + len(device_id.encode("latin-1")) + 1 + len(password.encode("latin-1")) + 1 + 2
+    capacity = max_size - overhead
+
+    groups: List[List[int]] = []
+    free: List[int] = []
+    pages: List[set] = []
+    for parameter in sorted(set(parameters), key=estimate_response_size, reverse=True):
+        page = parameter >> 8
+        size = estimate_response_size(parameter)
+        for i, group in enumerate(groups):
+            needed = size if page in pages[i] else size + 2
+            if needed <= free[i]:
+                group.append(parameter)
+                free[i] -= needed
+                pages[i].add(page)
+                break
+        else:
+            # Page 0 is selected at the start of a packet, any other page needs a page marker
+            needed = size if page == 0 else size + 2
+            if needed > capacity:
+                raise ValueError(f"Parameter does not fit in a packet [param={parameter}]")
+            groups.append([parameter])
+            free.append(capacity - needed)
+            pages.append({0, page})
+
+    for group in groups:
+        group.sort()
+    return groups
+
+
+def merge_responses(responses: Iterable[Optional[Response]]) -> Optional[Response]:
+    """
+    Merges the responses to a set of split requests into a single response.
+
+    A parameter contained in several responses is taken from the first of them.
+
+    :param responses: The responses, with None for requests that went unanswered.
+    :return: A response with the data entries of all responses, or None if no response was received.
+    """
+    received = [r for r in responses if r is not None]
+    if not received:
+        return None
+    if len(received) == 1:
+        return received[0]
+
+    first = received[0].packet
+    data_entries: List[DataEntry] = []
+    unsupported_parameters: List[int] = []
+    seen = set()
+    for response in received:
+        for entry in response.packet.data_entries:
+            if entry.parameter not in seen:
+                seen.add(entry.parameter)
+                data_entries.append(entry)
+        for parameter in response.packet.unsupported_parameters:
+            if parameter not in seen:
+                seen.add(parameter)
+                unsupported_parameters.append(parameter)
+    missing = [p for p in dict.fromkeys(p for r in received for p in r.missing) if p not in seen]
+    packet = Packet(first.device_id, first.password, first.function_type, data_entries, unsupported_parameters)
+    return Response(packet=packet, ip=received[0].ip, missing=missing)
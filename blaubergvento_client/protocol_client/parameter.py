@@ -1,4 +1,13 @@
 from enum import IntEnum
+from typing import Any, Iterable
+
+from blaubergvento_client.protocol_client.access import Access
+from blaubergvento_client.protocol_client.parameter_schema import ParameterSchema
+from blaubergvento_client.protocol_client.value_codec import (
+    decode_bool, decode_bytes, decode_date, decode_firmware, decode_ip_address, decode_minutes, decode_seconds,
+    decode_text, decode_time, decode_uint, encode_bool, encode_bytes, encode_date, encode_ip_address, encode_text,
+    encode_time, encode_uint8
+)
 
 class Parameter(IntEnum):
     """ 
@@ -53,50 +62,82 @@ class Parameter(IntEnum):
     UNIT_TYPE = 0xB9
 
 
-# Parameter details with size information (converted to a dictionary for fast lookup)
-details = {
-    Parameter.ON_OFF: 1,
-    Parameter.SPEED: 1,
-    Parameter.BOOT_MODE: 1,
-    Parameter.TIMER_MODE: 1,
-    Parameter.TIMER_COUNT_DOWN: 3,
-    Parameter.HUMIDITY_SENSOR_ACTIVATION: 1,
-    Parameter.VOLTAGE_SENSOR_ACTIVATION: 1,
-    Parameter.HUMIDITY_THRESHOLD: 1,
-    Parameter.CURRENT_RTC_BATTERY_VOLTAGE: 2,
-    Parameter.CURRENT_HUMIDITY: 1,
-    Parameter.CURRENT_VOLTAGE_SENSOR_STATE: 1,
-    Parameter.CURRENT_RELAY_SENSOR_STATE: 1,
-    Parameter.MANUAL_SPEED: 1,
-    Parameter.FAN1RPM: 2,
-    Parameter.FAN2RPM: 2,
-    Parameter.FILTER_TIMER: 3,
-    Parameter.RESET_FILTER_TIMER: 1,
-    Parameter.BOOST_MODE_DEACTIVATION_DELAY: 1,
-    Parameter.RTC_TIME: 3,
-    Parameter.RTC_CALENDAR: 4,
-    Parameter.WEEKLY_SCHEDULE: 1,
-    Parameter.SCHEDULE_SETUP: 6,
-    Parameter.SEARCH: 16,
-    Parameter.MACHINE_HOURS: 4,
-    Parameter.RESET_ALARMS: 1,
-    Parameter.READ_ALARM: 1,
-    Parameter.CLOUD_SERVER_OPERATION_PERMISSION: 1,
-    Parameter.READ_FIRMWARE_VERSION: 6,
-    Parameter.RESTORE_FACTORY_SETTINGS: 1,
-    Parameter.FILTER_ALARM: 1,
-    Parameter.WIFI_MODE: 1,
-    Parameter.WIFI_NAME: 0,
-    Parameter.WIFI_PASSWORD: 0,
-    Parameter.WIFI_ENCRYPTION: 1,
-    Parameter.WIFI_CHANNEL: 1,
-    Parameter.WIFI_DHCP: 1,
-    Parameter.IP_ADDRESS: 4,
-    Parameter.SUBNET_MASK: 4,
-    Parameter.VENTILATION_MODE: 1,
-    Parameter.UNIT_TYPE: 2,
+_R = Access.READ
+_W = Access.WRITE
+_RW = Access.READ_WRITE
+
+# The schema of each parameter: size, decoder, encoder, unit and access. Everything else about parameters is derived
+# from this table.
+schema = {
+    Parameter.ON_OFF: ParameterSchema(1, decode_bool, encode_bool, None, _RW),
+    Parameter.SPEED: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.BOOT_MODE: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.TIMER_MODE: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.TIMER_COUNT_DOWN: ParameterSchema(3, decode_seconds, None, "s", _R),
+    Parameter.HUMIDITY_SENSOR_ACTIVATION: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.RELAY_SENSOR_ACTIVIATION: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.VOLTAGE_SENSOR_ACTIVATION: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.HUMIDITY_THRESHOLD: ParameterSchema(1, decode_uint, encode_uint8, "%", _RW),
+    Parameter.CURRENT_RTC_BATTERY_VOLTAGE: ParameterSchema(2, decode_uint, None, "mV", _R),
+    Parameter.CURRENT_HUMIDITY: ParameterSchema(1, decode_uint, None, "%", _R),
+    Parameter.CURRENT_VOLTAGE_SENSOR_STATE: ParameterSchema(1, decode_uint, None, "%", _R),
+    Parameter.CURRENT_RELAY_SENSOR_STATE: ParameterSchema(1, decode_bool, None, None, _R),
+    Parameter.MANUAL_SPEED: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.FAN1RPM: ParameterSchema(2, decode_uint, None, "rpm", _R),
+    Parameter.FAN2RPM: ParameterSchema(2, decode_uint, None, "rpm", _R),
+    Parameter.FILTER_TIMER: ParameterSchema(3, decode_minutes, None, "min", _R),
+    Parameter.RESET_FILTER_TIMER: ParameterSchema(1, decode_uint, encode_uint8, None, _W),
+    Parameter.BOOST_MODE_DEACTIVATION_DELAY: ParameterSchema(1, decode_uint, encode_uint8, "min", _RW),
+    Parameter.RTC_TIME: ParameterSchema(3, decode_time, encode_time, None, _RW),
+    Parameter.RTC_CALENDAR: ParameterSchema(4, decode_date, encode_date, None, _RW),
+    Parameter.WEEKLY_SCHEDULE: ParameterSchema(1, decode_bool, encode_bool, None, _RW),
+    Parameter.SCHEDULE_SETUP: ParameterSchema(6, decode_bytes, encode_bytes, None, _RW),
+    Parameter.SEARCH: ParameterSchema(16, decode_text, None, None, _R),
+    Parameter.PASSWORD: ParameterSchema(0, decode_text, encode_text, None, _RW),
+    Parameter.MACHINE_HOURS: ParameterSchema(4, decode_minutes, None, "min", _R),
+    Parameter.RESET_ALARMS: ParameterSchema(1, decode_uint, encode_uint8, None, _W),
+    Parameter.READ_ALARM: ParameterSchema(1, decode_uint, None, None, _R),
+    Parameter.CLOUD_SERVER_OPERATION_PERMISSION: ParameterSchema(1, decode_bool, encode_bool, None, _RW),
+    Parameter.READ_FIRMWARE_VERSION: ParameterSchema(6, decode_firmware, None, None, _R),
+    Parameter.RESTORE_FACTORY_SETTINGS: ParameterSchema(1, decode_uint, encode_uint8, None, _W),
+    Parameter.FILTER_ALARM: ParameterSchema(1, decode_bool, None, None, _R),
+    Parameter.WIFI_MODE: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.WIFI_NAME: ParameterSchema(0, decode_text, encode_text, None, _RW),
+    Parameter.WIFI_PASSWORD: ParameterSchema(0, decode_text, encode_text, None, _RW),
+    Parameter.WIFI_ENCRYPTION: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.WIFI_CHANNEL: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.WIFI_DHCP: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.IP_ADDRESS: ParameterSchema(4, decode_ip_address, encode_ip_address, None, _RW),
+    Parameter.SUBNET_MASK: ParameterSchema(4, decode_ip_address, encode_ip_address, None, _RW),
+    Parameter.GATEWAY: ParameterSchema(4, decode_ip_address, encode_ip_address, None, _RW),
+    Parameter.CURRENT_IP_ADDRESS: ParameterSchema(4, decode_ip_address, None, None, _R),
+    Parameter.VENTILATION_MODE: ParameterSchema(1, decode_uint, encode_uint8, None, _RW),
+    Parameter.UNIT_TYPE: ParameterSchema(2, decode_uint, None, None, _R),
 }
 
+# Parameter details with size information (converted to a dictionary for fast lookup)
+details = {parameter: entry.size for parameter, entry in schema.items()}
+
+# The parameters that can be written
+writable = frozenset(parameter for parameter, entry in schema.items() if entry.access & Access.WRITE)
+
+# Decoders and encoders by parameter, looked up once per value instead of branching on the parameter
+decoders = {parameter: entry.decode for parameter, entry in schema.items()}
+encoders = {parameter: schema[parameter].encode for parameter in writable}
+
+
+def check_writable(parameters: Iterable[int]):
+    """
+    Checks that parameters can be written. Parameters that are not known are assumed to be writable.
+
+    :param parameters: The parameters.
+    :raises ValueError: If a known parameter can only be read.
+    """
+    read_only = [parameter for parameter in parameters if parameter in schema and parameter not in writable]
+    if read_only:
+        raise ValueError(f"Parameters cannot be written [params={', '.join(hex(p) for p in read_only)}]")
+
+
 def get_size(parameter: Parameter) -> int:
     """
     Gets the size in bytes for a given parameter.
@@ -106,3 +147,36 @@ def get_size(parameter: Parameter) -> int:
     """
     return details.get(parameter, -1)
 
+
+def decode_value(parameter: int, value: bytes) -> Any:
+    """
+    Decodes the raw value of a parameter.
+
+    :param parameter: The parameter.
+    :param value: The raw value.
+    :return: The decoded value, or the raw value if the parameter is unknown.
+    """
+    return decoders.get(parameter, decode_bytes)(value)
+
+
+def encode_value(parameter: int, value: Any) -> bytes:
+    """
+    Encodes a value of a parameter.
+
+    :param parameter: The parameter.
+    :param value: The value.
+    :return: The raw value.
+    :raises ValueError: If the parameter cannot be written.
+    """
+    if parameter not in writable:
+        raise ValueError(f"Parameter cannot be written [param={parameter}]")
+    return encoders[parameter](value)
+
+
+# Sizes indexed by parameter number, precomputed so the codec can look them up without touching the enum
+size_table = [details.get(number, -1) for number in range(256)]
+
+# Parameters indexed by parameter number, or None for numbers that are not known
+parameter_table = [None] * 256
+for _parameter in Parameter:
+    parameter_table[_parameter] = _parameter
@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from blaubergvento_client.protocol_client.access import Access
+
+
+@dataclass(frozen=True)
+class ParameterSchema:
+    """
+    ParameterSchema class.
+
+    Describes the value of a parameter: its size on the wire, how it is decoded and encoded, its unit and whether it
+    can be read and written.
+    """
+
+    size: int
+    """The size of the value in bytes, or 0 for values without a fixed size."""
+
+    decode: Callable[[bytes], Any]
+    """Converts the raw value to a Python value."""
+
+    encode: Optional[Callable[[Any], bytes]]
+    """Converts a Python value to the raw value, or None for parameters that can only be read."""
+
+    unit: Optional[str] = None
+    """The unit of the decoded value, e.g. "%" or "rpm"."""
+
+    access: Access = Access.READ_WRITE
+    """Whether the parameter can be read, written or both."""
+
+    def __post_init__(self):
+        if (self.encode is not None) != bool(self.access & Access.WRITE):
+            raise ValueError("Exactly the parameters that can be written must have an encoder")
@@ -0,0 +1,169 @@
+import asyncio
+from typing import Dict, Optional
+
+from blaubergvento_client.protocol_client.token_bucket import TokenBucket
+
+DEFAULT_DEVICE_BURST = 1.0  # packets
+DEFAULT_MIN_RATE = 1.0  # packets per second
+DEFAULT_INCREASE = 1.0  # packets per second, per second without loss
+DEFAULT_DECREASE = 0.5
+DEFAULT_LOSS_THRESHOLD = 0.05
+LOSS_ALPHA = 1 / 16
+UNREACHABLE_LOSS = 0.5
+
+
+class RateLimiter:
+    """
+    Limits how fast `ProtocolClient` sends requests, to each device and in total.
+
+    Each device IP has a token bucket allowing `device_rate` packets per second, and all packets share a bucket
+    allowing `rate` packets per second. Packets wait until both buckets have a token, so bursts are smoothed out
+    instead of being dropped by the controllers.
+
+    With `aimd` enabled the rates adapt to the loss the client observes (additive increase, multiplicative
+    decrease). Every response raises the rate by `increase / rate`, i.e. by about `increase` packets per second
+    each second, up to the configured rate. A smoothed loss rate is kept per device and in total, and when a request
+    times out while it is above `loss_threshold`, the rate is multiplied by `decrease`. The rate decreases at most
+    once per round of requests: timeouts of requests sent before the last decrease are caused by the old rate and
+    are ignored. Timeouts of devices that are mostly unreachable are not held against the total rate, so a fan that
+    is switched off does not slow down the rest of the fleet.
+    """
+
+    def __init__(
+            self,
+            rate: Optional[float] = None,
+            device_rate: Optional[float] = None,
+            burst: Optional[float] = None,
+            device_burst: float = DEFAULT_DEVICE_BURST,
+            aimd: bool = False,
+            min_rate: float = DEFAULT_MIN_RATE,
+            increase: float = DEFAULT_INCREASE,
+            decrease: float = DEFAULT_DECREASE,
+            loss_threshold: float = DEFAULT_LOSS_THRESHOLD
+    ):
+        """
+        Creates a new RateLimiter.
+
+        Args:
+            rate (Optional[float]): The maximum number of packets sent per second in total, or None for no limit.
+            device_rate (Optional[float]): The maximum number of packets sent per second to each device IP, or None
+                for no limit.
+            burst (Optional[float]): How many packets may be sent back to back in total. Defaults to one second
+                worth of packets.
+            device_burst (float): How many packets may be sent back to back to each device IP.
+            aimd (bool): Whether to adapt the rates to the observed loss. The configured rates are the upper bounds.
+            min_rate (float): The lower bound of the adapted rates.
+            increase (float): How many packets per second the adapted rates grow each second without loss.
+            decrease (float): The factor the adapted rates are multiplied by when loss rises.
+            loss_threshold (float): The smoothed fraction of requests timing out above which the rates decrease.
+        """
+        self.rate = rate
+        self.device_rate = device_rate
+        self.device_burst = device_burst
+        self.aimd = aimd
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.loss_threshold = loss_threshold
+        self._total = TokenBucket(rate, burst) if rate is not None else None
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Smoothed loss rates and times of the last decrease, per device IP and None for the total
+        self._loss: Dict[Optional[str], float] = {}
+        self._decreased_at: Dict[Optional[str], float] = {}
+
+    def current_rate(self, ip: Optional[str] = None) -> Optional[float]:
+        """
+        Gets the rate packets are currently sent at, which differs from the configured rate when `aimd` is enabled.
+
+        Args:
+            ip (Optional[str]): The IP address of a device, or None for the total rate.
+
+        Returns:
+            float | None: The rate in packets per second, or None if it is not limited.
+        """
+        if ip is None:
+            return self._total.rate if self._total is not None else None
+        if self.device_rate is None:
+            return None
+        bucket = self._buckets.get(ip)
+        return bucket.rate if bucket is not None else self.device_rate
+
+    async def acquire(self, ip: str):
+        """
+        Waits until a packet may be sent to a device. If the wait is cancelled, the reserved tokens are given back.
+
+        Args:
+            ip (str): The IP address of the device.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        buckets = []
+        if self._total is not None:
+            buckets.append(self._total)
+        if self.device_rate is not None:
+            buckets.append(self._bucket(ip))
+        delay = max((bucket.reserve(now) for bucket in buckets), default=0.0)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # The packet is not sent, so the packets queued behind it may go earlier
+                now = loop.time()
+                for bucket in buckets:
+                    bucket.refund(now)
+                raise
+
+    def on_response(self, ip: str):
+        """
+        Records that a device answered a request.
+
+        Args:
+            ip (str): The IP address of the device.
+        """
+        if not self.aimd:
+            return
+        now = asyncio.get_running_loop().time()
+        self._observe(ip, 0.0)
+        if self.device_rate is not None:
+            self._increase(self._bucket(ip), self.device_rate, now)
+        if self._total is not None:
+            self._observe(None, 0.0)
+            self._increase(self._total, self.rate, now)
+
+    def on_timeout(self, ip: str, sent_at: float):
+        """
+        Records that a device did not answer a request in time.
+
+        Args:
+            ip (str): The IP address of the device.
+            sent_at (float): The event loop time the request was sent at.
+        """
+        if not self.aimd:
+            return
+        now = asyncio.get_running_loop().time()
+        loss = self._observe(ip, 1.0)
+        if self.device_rate is not None:
+            self._decrease(ip, self._bucket(ip), sent_at, now)
+        if self._total is not None and loss < UNREACHABLE_LOSS:
+            self._observe(None, 1.0)
+            self._decrease(None, self._total, sent_at, now)
+
+    def _bucket(self, ip: str) -> TokenBucket:
+        bucket = self._buckets.get(ip)
+        if bucket is None:
+            bucket = self._buckets[ip] = TokenBucket(self.device_rate, self.device_burst)
+        return bucket
+
+    def _observe(self, key: Optional[str], lost: float) -> float:
+        loss = self._loss[key] = (1 - LOSS_ALPHA) * self._loss.get(key, 0.0) + LOSS_ALPHA * lost
+        return loss
+
+    def _increase(self, bucket: TokenBucket, ceiling: float, now: float):
+        if bucket.rate < ceiling:
+            bucket.set_rate(min(ceiling, bucket.rate + self.increase / bucket.rate), now)
+
+    def _decrease(self, key: Optional[str], bucket: TokenBucket, sent_at: float, now: float):
+        if self._loss[key] <= self.loss_threshold or sent_at < self._decreased_at.get(key, float("-inf")):
+            return
+        bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease), now)
+        self._decreased_at[key] = now
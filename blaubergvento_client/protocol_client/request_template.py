@@ -0,0 +1,74 @@
+from typing import Dict, List, Tuple
+
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.function_type import FunctionType
+from blaubergvento_client.protocol_client.packet import Packet, PREAMBLE
+
+
+class RequestTemplate:
+    """
+    RequestTemplate class.
+
+    A request with a fixed function type and set of data entries, compiled once and reused for any number of
+    devices. The function and data bytes are serialized when the template is created, and the complete datagram
+    for each device is built on first use and cached, so repeated requests cost a single dict lookup.
+    """
+
+    def __init__(self, function_type: FunctionType, data_entries: List[DataEntry]):
+        """
+        Creates a new RequestTemplate instance.
+
+        :param function_type: The type of function to perform.
+        :param data_entries: The data entries to include in every request.
+        """
+        self._function_type = function_type
+        self._data_entries = data_entries
+
+        # Serialize with empty credentials and keep everything between the credentials and the checksum
+        data = Packet("", "", function_type, data_entries).to_bytes()
+        self._body = data[len(PREAMBLE) + 2:-2]
+        self._body_checksum = sum(self._body)
+        self._cache: Dict[Tuple[str, str], bytes] = {}
+
+    @property
+    def function_type(self) -> FunctionType:
+        """Gets the function type."""
+        return self._function_type
+
+    @property
+    def data_entries(self) -> List[DataEntry]:
+        """Gets the data entries."""
+        return self._data_entries
+
+    def to_bytes(self, device_id: str, password: str) -> bytes:
+        """
+        Gets the serialized request for a device.
+
+        The result is byte-for-byte identical to serializing a `Packet` with the same content.
+
+        :param device_id: The device ID to include in the packet.
+        :param password: The password for the device.
+        :return: The serialized byte array of the request.
+        """
+        key = (device_id, password)
+        data = self._cache.get(key)
+        if data is None:
+            data = self._cache[key] = self._compile(device_id, password)
+        return data
+
+    def to_packet(self, device_id: str, password: str) -> Packet:
+        """
+        Creates a `Packet` equivalent to the request for a device.
+
+        :param device_id: The device ID to include in the packet.
+        :param password: The password for the device.
+        :return: The packet.
+        """
+        return Packet(device_id, password, self._function_type, self._data_entries)
+
+    def _compile(self, device_id: str, password: str) -> bytes:
+        encoded_id = device_id.encode("latin-1")
+        encoded_password = password.encode("latin-1")
+        head = PREAMBLE + bytes([len(encoded_id)]) + encoded_id + bytes([len(encoded_password)]) + encoded_password
+        checksum = (sum(head[2:]) + self._body_checksum) & 0xFFFF
+        return head + self._body + bytes([checksum & 0xFF, (checksum >> 8) & 0xFF])
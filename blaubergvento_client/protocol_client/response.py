@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List
+
 from blaubergvento_client.protocol_client.packet import Packet
 
 @dataclass
@@ -14,3 +16,6 @@ class Response:
 
     ip: str
     """The IP address of the device or controller that sent the response."""
+
+    missing: List[int] = field(default_factory=list)
+    """The requested parameters the response lacks, because the packets reading them went unanswered."""
@@ -0,0 +1,76 @@
+import math
+from collections import deque
+from typing import Optional
+
+INITIAL_RTO = 0.5  # seconds
+MIN_RTO = 0.05  # seconds
+MAX_RTO = 2.0  # seconds
+SAMPLE_WINDOW = 64
+MIN_PERCENTILE_SAMPLES = 16
+
+
+class RttEstimator:
+    """
+    Round trip time estimate for a single device.
+
+    Keeps a smoothed round trip time (SRTT) and its variation (RTTVAR) the way TCP does (RFC 6298) and derives the
+    retransmission timeout from them. A window of recent samples is kept as well, so latency percentiles can be
+    used to decide when to send a hedged request.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial_rto: float = INITIAL_RTO, min_rto: float = MIN_RTO, max_rto: float = MAX_RTO):
+        """
+        Creates a new RttEstimator.
+
+        Args:
+            initial_rto (float): The timeout to use until the first sample is taken.
+            min_rto (float): The lower bound of the timeout.
+            max_rto (float): The upper bound of the timeout.
+        """
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self._rto = initial_rto
+        self._samples: deque = deque(maxlen=SAMPLE_WINDOW)
+
+    @property
+    def rto(self) -> float:
+        """Gets the current retransmission timeout in seconds."""
+        return self._rto
+
+    def update(self, rtt: float):
+        """
+        Adds a round trip time sample. Samples must only be taken from requests that were sent once, since the
+        response to a retransmitted request cannot be attributed to a specific transmission.
+
+        Args:
+            rtt (float): The measured round trip time in seconds.
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self._rto = min(self.max_rto, max(self.min_rto, self.srtt + self.K * self.rttvar))
+        self._samples.append(rtt)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Gets a percentile of the recent round trip times.
+
+        Args:
+            q (float): The percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            float | None: The percentile in seconds, or None if too few samples have been taken.
+        """
+        if len(self._samples) < MIN_PERCENTILE_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
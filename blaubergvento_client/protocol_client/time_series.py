@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy
+
+
+@dataclass
+class TimeSeries:
+    """
+    Parameter values decoded from many packets, in long format: one row per parameter value, sorted by time.
+    """
+
+    timestamp: numpy.ndarray
+    """The time (seconds since the epoch) of each value, as float64."""
+
+    device: numpy.ndarray
+    """The index into `devices` of the device each value came from, as int32."""
+
+    parameter: numpy.ndarray
+    """The parameter number of each value, as uint16."""
+
+    value: numpy.ndarray
+    """The decoded values, as int64."""
+
+    devices: List[str]
+    """The ids of the devices."""
+
+    rejected: int = 0
+    """The number of packets that were not responses or had an invalid header or checksum."""
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    @property
+    def device_id(self) -> numpy.ndarray:
+        """Gets the device id of each value."""
+        return numpy.asarray(self.devices, dtype=object)[self.device]
+
+    def series(self, parameter: int, device_id: Optional[str] = None) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Gets the values of one parameter.
+
+        Args:
+            parameter (int): The parameter.
+            device_id (Optional[str]): Only get the values of this device.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: The timestamps and the values.
+        """
+        mask = self.parameter == int(parameter)
+        if device_id is not None:
+            if device_id not in self.devices:
+                mask[:] = False
+            else:
+                mask &= self.device == self.devices.index(device_id)
+        return self.timestamp[mask], self.value[mask]
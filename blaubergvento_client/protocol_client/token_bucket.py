@@ -0,0 +1,71 @@
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A token bucket limiting how many packets are sent per second.
+
+    Tokens accumulate at `rate` per second up to `burst`. Each packet takes one token. A packet sent while the bucket
+    is empty reserves a future token, so concurrent senders are spaced out in the order they asked instead of all
+    waking up when the next token arrives.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Creates a new TokenBucket, initially full.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            burst (Optional[float]): The maximum number of tokens, i.e. how many packets may be sent back to back.
+                Defaults to one second worth of tokens at the current rate, but at least one.
+        """
+        self.rate = rate
+        self._burst = burst
+        self._tokens = self.burst
+        self._updated_at: Optional[float] = None
+
+    @property
+    def burst(self) -> float:
+        """Gets the maximum number of tokens."""
+        return max(1.0, self.rate) if self._burst is None else self._burst
+
+    def reserve(self, now: float) -> float:
+        """
+        Takes a token, reserving one if the bucket is empty.
+
+        Args:
+            now (float): The current time in seconds, from a monotonic clock.
+
+        Returns:
+            float: How long in seconds to wait before sending, 0 if a token was available.
+        """
+        self._refill(now)
+        self._tokens -= 1.0
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, now: float):
+        """
+        Gives back a token taken by `reserve`, e.g. because the packet was not sent after all.
+
+        Args:
+            now (float): The current time in seconds, from a monotonic clock.
+        """
+        self._refill(now)
+        self._tokens = min(self.burst, self._tokens + 1.0)
+
+    def set_rate(self, rate: float, now: float):
+        """
+        Changes the rate, keeping the tokens accumulated at the old rate up to the new burst.
+
+        Args:
+            rate (float): The new number of tokens added per second.
+            now (float): The current time in seconds, from a monotonic clock.
+        """
+        self._refill(now)
+        self.rate = rate
+        self._tokens = min(self.burst, self._tokens)
+
+    def _refill(self, now: float):
+        if self._updated_at is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
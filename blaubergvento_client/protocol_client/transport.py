@@ -0,0 +1,263 @@
+import asyncio
+import socket
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from blaubergvento_client.protocol_client.capture_log import CaptureLog
+from blaubergvento_client.protocol_client.function_type import FunctionType
+from blaubergvento_client.protocol_client.metrics import Metrics
+from blaubergvento_client.protocol_client.packet import Packet
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.protocol_client.response import Response
+
+PORT = 4000
+BROADCAST_ADDRESS = "255.255.255.255"
+RECEIVE_BUFFER_SIZE = 1 << 20  # bytes
+
+
+class Transport(asyncio.DatagramProtocol):
+    """
+    Non-blocking UDP transport shared by all requests of a `ProtocolClient`.
+
+    The transport owns a single long-lived socket bound to an ephemeral port. Requests register a waiter for
+    the device they address and the parameters they expect back, and every incoming response is matched to the
+    oldest waiter with the same device id, source IP and parameters. Any number of requests can therefore be in
+    flight at the same time, also to the same device. Search replies only resolve waiters expecting them, so
+    discovery running alongside other requests does not answer them.
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None, capture: Optional[CaptureLog] = None):
+        self.metrics = metrics
+        self.capture = capture
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: Dict[str, List[Tuple[str, Optional[FrozenSet[int]], asyncio.Future]]] = {}
+        self._listeners: List[Callable[[Response], None]] = []
+        # Late replies to be dropped per device: the IP, the parameters, how many and until when
+        self._ignored: Dict[str, List[list]] = {}
+
+    @staticmethod
+    async def open(metrics: Optional[Metrics] = None, capture: Optional[CaptureLog] = None) -> "Transport":
+        """
+        Opens a new transport on the running event loop.
+
+        Args:
+            metrics (Optional[Metrics]): Optional metrics to record traffic in.
+            capture (Optional[CaptureLog]): Optional log to write every datagram sent and received to.
+
+        Returns:
+            Transport: The connected transport.
+        """
+        loop = asyncio.get_running_loop()
+        _, protocol = await loop.create_datagram_endpoint(
+            lambda: Transport(metrics, capture),
+            local_addr=("0.0.0.0", 0),
+            allow_broadcast=True,
+        )
+        return protocol
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Gets the event loop the transport is bound to."""
+        return self._loop
+
+    @property
+    def closed(self) -> bool:
+        """Whether the underlying socket has been closed."""
+        return self._transport is None or self._transport.is_closing()
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self._transport = transport
+        self._loop = asyncio.get_running_loop()
+        set_receive_buffer_size(transport)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        for waiters in self._waiters.values():
+            for _, _, future in waiters:
+                if not future.done():
+                    future.cancel()
+        self._waiters.clear()
+
+    def error_received(self, exc: Exception):
+        # ICMP errors (e.g. port unreachable) are reported here. A request to an unreachable
+        # device simply times out, so there is nothing to do.
+        pass
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        if self.capture is not None:
+            self.capture.received(data, addr[0])
+        try:
+            packet = Packet.from_bytes(data)
+        except (ValueError, IndexError) as e:
+            if self.metrics is not None:
+                self.metrics.record_decode_error(e, len(data))
+            return
+
+        if self.metrics is not None:
+            self.metrics.increment("bytes_received", packet.device_id, packet.function_type.name, len(data))
+
+        if packet.function_type != FunctionType.RESPONSE:
+            return
+
+        response = Response(packet=packet, ip=addr[0])
+        for listener in self._listeners:
+            listener(response)
+
+        waiters = self._waiters.get(packet.device_id)
+        ignored = self._ignored.get(packet.device_id)
+        if not waiters and not ignored:
+            return
+        parameters = packet_parameters(packet)
+        if ignored and self._drop_ignored(packet.device_id, ignored, response.ip, parameters):
+            return
+        if not waiters:
+            return
+        for index, (ip, expected, future) in enumerate(waiters):
+            if ip != response.ip and ip != BROADCAST_ADDRESS:
+                continue
+            if (Parameter.SEARCH not in parameters) if expected is None else expected == parameters:
+                del waiters[index]
+                if not waiters:
+                    del self._waiters[packet.device_id]
+                if not future.done():
+                    future.set_result(response)
+                return
+
+    def expect(self, device_id: str, ip: str, parameters: Optional[FrozenSet[int]] = None) -> asyncio.Future:
+        """
+        Registers a waiter for the next response from a device.
+
+        Args:
+            device_id (str): The id of the device the response must come from.
+            ip (str): The IP address the response must come from. The broadcast address matches any IP.
+            parameters (Optional[FrozenSet[int]]): The parameters the response must contain, including those
+                reported as not supported, i.e. the parameters of the request. None matches any response except a
+                search reply.
+
+        Returns:
+            asyncio.Future: A future resolved with the `Response` once it arrives.
+        """
+        future = self._loop.create_future()
+        self._waiters.setdefault(device_id, []).append((ip, parameters, future))
+        return future
+
+    def discard(self, device_id: str, future: asyncio.Future):
+        """
+        Removes a waiter that is no longer needed, e.g. because its request timed out.
+
+        Args:
+            device_id (str): The device id the waiter was registered for.
+            future (asyncio.Future): The future returned by `expect`.
+        """
+        waiters = self._waiters.get(device_id)
+        if not waiters:
+            return
+        waiters[:] = [w for w in waiters if w[2] is not future]
+        if not waiters:
+            del self._waiters[device_id]
+
+    def ignore(self, device_id: str, ip: str, parameters: FrozenSet[int], count: int, timeout: float):
+        """
+        Drops the next replies to a request that has been answered, e.g. the reply to a hedged duplicate, so they do
+        not answer a later request with stale values.
+
+        Args:
+            device_id (str): The id of the device.
+            ip (str): The IP address the replies come from. The broadcast address matches any IP.
+            parameters (FrozenSet[int]): The parameters of the request.
+            count (int): The number of replies to drop.
+            timeout (float): How long in seconds to wait for the replies.
+        """
+        if count > 0:
+            until = self._loop.time() + timeout
+            self._ignored.setdefault(device_id, []).append([ip, parameters, count, until])
+
+    def _drop_ignored(self, device_id: str, ignored: List[list], ip: str, parameters: FrozenSet[int]) -> bool:
+        """
+        Drops a reply if it is one of the late replies to ignore.
+
+        Returns:
+            bool: True if the reply was dropped.
+        """
+        now = self._loop.time()
+        ignored[:] = [entry for entry in ignored if entry[3] > now]
+        dropped = False
+        for entry in ignored:
+            if (entry[0] == ip or entry[0] == BROADCAST_ADDRESS) and entry[1] == parameters:
+                entry[2] -= 1
+                if entry[2] == 0:
+                    ignored.remove(entry)
+                dropped = True
+                break
+        if not ignored:
+            del self._ignored[device_id]
+        return dropped
+
+    def add_listener(self, listener: Callable[[Response], None]):
+        """
+        Adds a callback invoked for every response received, regardless of pending requests.
+
+        Args:
+            listener (Callable[[Response], None]): The callback.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Response], None]):
+        """
+        Removes a callback previously added with `add_listener`.
+
+        Args:
+            listener (Callable[[Response], None]): The callback.
+        """
+        self._listeners.remove(listener)
+
+    def sendto(self, data: bytes, ip: str, port: int = PORT):
+        """
+        Sends a datagram without waiting for anything.
+
+        Args:
+            data (bytes): The serialized packet.
+            ip (str): The destination IP address.
+            port (int): The destination port.
+        """
+        self._transport.sendto(data, (ip, port))
+        if self.capture is not None:
+            self.capture.sent(data, ip)
+        if self.metrics is not None:
+            self.metrics.record_sent(data)
+
+    def close(self):
+        """Closes the underlying socket."""
+        if self._transport is not None:
+            self._transport.close()
+
+
+def packet_parameters(packet: Packet) -> FrozenSet[int]:
+    """
+    Gets the parameters of a packet, including those reported as not supported. A response contains the same
+    parameters as the request it answers.
+
+    Args:
+        packet (Packet): The packet.
+
+    Returns:
+        FrozenSet[int]: The parameter numbers.
+    """
+    return frozenset([entry.parameter for entry in packet.data_entries] + packet.unsupported_parameters)
+
+
+def set_receive_buffer_size(transport: asyncio.DatagramTransport, size: int = RECEIVE_BUFFER_SIZE):
+    """
+    Enlarges the receive buffer of a socket, so bursts of datagrams (e.g. replies to a search broadcast from a
+    large fleet) are not dropped before they are read. The operating system may cap the size.
+
+    Args:
+        transport (asyncio.DatagramTransport): The transport of the socket.
+        size (int): The requested buffer size in bytes.
+    """
+    sock = transport.get_extra_info("socket")
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    except OSError:
+        pass
@@ -0,0 +1,82 @@
+"""
+Decoders and encoders for the values of parameters. Decoders take the raw value and return a Python value, encoders
+do the opposite. Only the values of parameters that can be written have an encoder.
+"""
+import socket
+from datetime import date, datetime, time
+from typing import Tuple
+
+
+def decode_bytes(value: bytes) -> bytes:
+    return bytes(value)
+
+
+def encode_bytes(value: bytes) -> bytes:
+    return bytes(value)
+
+
+def decode_bool(value: bytes) -> bool:
+    return value[0] == 1
+
+
+def encode_bool(value: bool) -> bytes:
+    return b"\x01" if value else b"\x00"
+
+
+def decode_uint(value: bytes) -> int:
+    """Decodes a little-endian unsigned integer of any size."""
+    return int.from_bytes(value, "little")
+
+
+def encode_uint8(value: int) -> bytes:
+    return bytes([value])
+
+
+def decode_text(value: bytes) -> str:
+    return str(value, "latin-1").rstrip("\0")
+
+
+def encode_text(value: str) -> bytes:
+    return value.encode("latin-1")
+
+
+def decode_ip_address(value: bytes) -> str:
+    return socket.inet_ntoa(bytes(value))
+
+
+def encode_ip_address(value: str) -> bytes:
+    return socket.inet_aton(value)
+
+
+def decode_seconds(value: bytes) -> int:
+    """Decodes seconds, minutes and hours into seconds."""
+    return value[0] + value[1] * 60 + value[2] * 3600
+
+
+def decode_minutes(value: bytes) -> int:
+    """Decodes minutes, hours and days into minutes. The days are a single byte or a little-endian 16 bit value."""
+    return value[0] + (int.from_bytes(value[2:], "little") * 24 + value[1]) * 60
+
+
+def decode_time(value: bytes) -> time:
+    """Decodes seconds, minutes and hours into a time of day."""
+    return time(value[2], value[1], value[0])
+
+
+def encode_time(value: time) -> bytes:
+    return bytes([value.second, value.minute, value.hour])
+
+
+def decode_date(value: bytes) -> date:
+    """Decodes day, day of week, month and year since 2000 into a date."""
+    return date(2000 + value[3], value[2], value[0])
+
+
+def encode_date(value: date) -> bytes:
+    return bytes([value.day, value.isoweekday(), value.month, value.year - 2000])
+
+
+def decode_firmware(value: bytes) -> Tuple[str, datetime]:
+    """Decodes major and minor version, day, month and a little-endian 16 bit year into a version and its date."""
+    major, minor, day, month, year_low, year_high = value
+    return f"{major}.{minor}", datetime(year_low + (year_high << 8), month, day)
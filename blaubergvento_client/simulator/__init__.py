@@ -0,0 +1,4 @@
+from .simulator import Simulator
+from .virtual_device import VirtualDevice
+
+__all__ = ['Simulator', 'VirtualDevice']
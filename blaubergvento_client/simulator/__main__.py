@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+
+from blaubergvento_client.protocol_client.transport import PORT
+from blaubergvento_client.simulator.simulator import Simulator
+
+
+async def main(args: argparse.Namespace):
+    simulator = Simulator.create(
+        args.devices,
+        prefix=args.prefix,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        bad_checksum=args.bad_checksum,
+        seed=args.seed,
+    )
+    await simulator.start(args.host, args.port)
+    host, port = simulator.address
+    print(f"Simulating {len(simulator.devices)} device(s) on {host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        simulator.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate Blauberg Vento controllers.")
+    parser.add_argument("--devices", type=int, default=10, help="number of devices to simulate")
+    parser.add_argument("--prefix", default="SIM", help="prefix of the generated device ids")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum random delay added to the latency")
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of losing a datagram")
+    parser.add_argument("--bad-checksum", type=float, default=0.0, help="probability of a corrupted response")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,151 @@
+import asyncio
+import random
+from typing import Dict, Iterable, Optional, Tuple
+
+from blaubergvento_client.protocol_client.packet import Packet
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.protocol_client.transport import PORT, set_receive_buffer_size
+from blaubergvento_client.simulator.virtual_device import DEFAULT_PASSWORD, VirtualDevice
+
+SEARCH_DEVICE_ID = "DEFAULT_DEVICEID"
+
+
+class Simulator(asyncio.DatagramProtocol):
+    """
+    A UDP server that simulates any number of Vento controllers.
+
+    All virtual devices share one socket and requests are routed to them by the device id in the packet, so a
+    single event loop can host thousands of devices. Search broadcasts are answered by every device. Latency,
+    packet loss and corrupted checksums can be injected to reproduce the behaviour of a real network.
+    """
+
+    def __init__(
+            self,
+            devices: Iterable[VirtualDevice] = (),
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            loss: float = 0.0,
+            bad_checksum: float = 0.0,
+            seed: Optional[int] = None
+    ):
+        """
+        Creates a new Simulator.
+
+        :param devices: The devices to host.
+        :param latency: The fixed delay in seconds before a response is sent.
+        :param jitter: The maximum random delay in seconds added to the latency.
+        :param loss: The probability that a request or a response is lost.
+        :param bad_checksum: The probability that a response is sent with a wrong checksum.
+        :param seed: Optional seed for the random generator, for reproducible runs.
+        """
+        self.devices: Dict[str, VirtualDevice] = {device.id: device for device in devices}
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.bad_checksum = bad_checksum
+        self.requests = 0
+        self.responses = 0
+        self._random = random.Random(seed)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    @staticmethod
+    def create(count: int, prefix: str = "SIM", password: str = DEFAULT_PASSWORD, **kwargs) -> "Simulator":
+        """
+        Creates a simulator hosting a number of devices with generated ids.
+
+        :param count: The number of devices.
+        :param prefix: The prefix of the device ids, which are padded with digits to 16 characters.
+        :param password: The password of the devices.
+        :param kwargs: Further arguments for the Simulator constructor.
+        :return: The simulator.
+        """
+        width = 16 - len(prefix)
+        return Simulator([VirtualDevice(f"{prefix}{i:0{width}d}", password) for i in range(count)], **kwargs)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Gets the address the simulator is listening on."""
+        return self._transport.get_extra_info("sockname")[:2]
+
+    async def start(self, host: str = "0.0.0.0", port: int = PORT):
+        """
+        Starts listening on the running event loop.
+
+        :param host: The address to bind to.
+        :param port: The port to bind to. Use 0 to pick a free port.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port), allow_broadcast=True)
+
+    def close(self):
+        """Stops listening."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def __aenter__(self) -> "Simulator":
+        if self._transport is None:
+            await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_device(self, device: VirtualDevice):
+        """
+        Adds a device to the simulator.
+
+        :param device: The device.
+        """
+        self.devices[device.id] = device
+
+    def remove_device(self, device_id: str):
+        """
+        Removes a device from the simulator.
+
+        :param device_id: The id of the device.
+        """
+        self.devices.pop(device_id, None)
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self._transport = transport
+        set_receive_buffer_size(transport)
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        self.requests += 1
+        if self.loss and self._random.random() < self.loss:
+            return
+        try:
+            packet = Packet.from_bytes(data)
+        except (ValueError, IndexError):
+            return
+
+        if packet.device_id == SEARCH_DEVICE_ID and any(e.parameter == Parameter.SEARCH for e in packet.data_entries):
+            for device in self.devices.values():
+                self._reply(device.respond([Parameter.SEARCH]), addr)
+            return
+
+        device = self.devices.get(packet.device_id)
+        if device is None:
+            return
+        response = device.handle(packet)
+        if response is not None:
+            self._reply(response, addr)
+
+    def _reply(self, packet: Packet, addr: Tuple[str, int]):
+        if self.loss and self._random.random() < self.loss:
+            return
+        data = packet.to_bytes()
+        if self.bad_checksum and self._random.random() < self.bad_checksum:
+            data = data[:-1] + bytes([data[-1] ^ 0xFF])
+
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._send, data, addr)
+        else:
+            self._send(data, addr)
+
+    def _send(self, data: bytes, addr: Tuple[str, int]):
+        if self._transport is not None:
+            self._transport.sendto(data, addr)
+            self.responses += 1
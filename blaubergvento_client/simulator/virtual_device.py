@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional
+
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.function_type import FunctionType
+from blaubergvento_client.protocol_client.packet import Packet
+from blaubergvento_client.protocol_client.parameter import Parameter, details, writable
+
+DEFAULT_PASSWORD = "1111"
+
+# Values a new virtual device starts with. Parameters not listed start with zeroes.
+DEFAULT_VALUES: Dict[int, bytes] = {
+    Parameter.ON_OFF: bytes([1]),
+    Parameter.SPEED: bytes([1]),
+    Parameter.CURRENT_HUMIDITY: bytes([45]),
+    Parameter.HUMIDITY_THRESHOLD: bytes([60]),
+    Parameter.MANUAL_SPEED: bytes([128]),
+    Parameter.FAN1RPM: (1200).to_bytes(2, "little"),
+    Parameter.FAN2RPM: (1200).to_bytes(2, "little"),
+    Parameter.FILTER_TIMER: bytes([0, 0, 90]),
+    Parameter.READ_FIRMWARE_VERSION: bytes([1, 2, 15, 6]) + (2020).to_bytes(2, "little"),
+    Parameter.WIFI_NAME: b"vento",
+    Parameter.WIFI_PASSWORD: b"",
+    Parameter.IP_ADDRESS: bytes([127, 0, 0, 1]),
+    Parameter.SUBNET_MASK: bytes([255, 0, 0, 0]),
+    Parameter.GATEWAY: bytes([127, 0, 0, 1]),
+    Parameter.CURRENT_IP_ADDRESS: bytes([127, 0, 0, 1]),
+    Parameter.UNIT_TYPE: bytes([3, 0]),
+}
+
+
+class VirtualDevice:
+    """
+    A simulated Vento controller.
+
+    The device keeps a value for every parameter in `parameter.details` and answers requests the way a physical
+    controller does: READ, WRITEREAD, INCREAD and DECREAD are answered with the current values, WRITE is applied
+    without an answer, parameters it does not know are reported as not supported and requests with a wrong
+    password are ignored.
+    """
+
+    def __init__(self, device_id: str, password: str = DEFAULT_PASSWORD):
+        """
+        Creates a new VirtualDevice.
+
+        :param device_id: The id of the device, normally 16 characters.
+        :param password: The password the device accepts.
+        """
+        self.id = device_id
+        self.password = password
+        self.values: Dict[int, bytes] = {
+            parameter: DEFAULT_VALUES.get(parameter, bytes(size)) for parameter, size in details.items()
+        }
+        self.values[Parameter.SEARCH] = device_id.encode("latin-1")[:16].ljust(16, b"\0")
+        self.values[Parameter.PASSWORD] = password.encode("latin-1")
+
+    def handle(self, packet: Packet) -> Optional[Packet]:
+        """
+        Handles a request addressed to this device.
+
+        :param packet: The request.
+        :return: The response, or None if the device does not answer the request.
+        """
+        if packet.password != self.password:
+            return None
+
+        function_type = packet.function_type
+        if function_type in (FunctionType.WRITE, FunctionType.WRITEREAD):
+            for entry in packet.data_entries:
+                # Like a real controller, writes of parameters that can only be read are ignored
+                if entry.value is not None and entry.parameter in self.values and entry.parameter in writable:
+                    self.values[entry.parameter] = bytes(entry.value)
+            if function_type == FunctionType.WRITE:
+                return None
+        elif function_type in (FunctionType.INCREAD, FunctionType.DECREAD):
+            step = 1 if function_type == FunctionType.INCREAD else -1
+            for entry in packet.data_entries:
+                value = self.values.get(entry.parameter)
+                if value:
+                    number = (int.from_bytes(value, "little") + step) % (1 << (8 * len(value)))
+                    self.values[entry.parameter] = number.to_bytes(len(value), "little")
+        elif function_type != FunctionType.READ:
+            return None
+
+        return self.respond([entry.parameter for entry in packet.data_entries])
+
+    def respond(self, parameters: List[int]) -> Packet:
+        """
+        Builds a response with the current values of a set of parameters.
+
+        :param parameters: The parameters to include.
+        :return: The response packet.
+        """
+        entries = []
+        unsupported = []
+        for parameter in parameters:
+            value = self.values.get(parameter)
+            if value is None:
+                unsupported.append(parameter)
+            else:
+                entries.append(DataEntry(parameter, value))
+        return Packet(self.id, self.password, FunctionType.RESPONSE, entries, unsupported)
@@ -1,7 +1,7 @@
 """
 Setup of the blauberg vento module
 """
-from setuptools import setup
+from setuptools import find_packages, setup
 
 setup(
     name="blaubergvento_client",
@@ -14,6 +14,6 @@ setup(
     ),
     author="Michael Krog",
     url="https://github.com/michaelkrog/blaubergvento-python",
-    packages=["blaubergvento_client"],
+    packages=find_packages(include=["blaubergvento_client", "blaubergvento_client.*"]),
     license="GPL-3.0",
 )
\ No newline at end of file
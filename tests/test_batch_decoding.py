@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.function_type import FunctionType
+from blaubergvento_client.protocol_client.packet import Packet
+from blaubergvento_client.protocol_client.parameter import Parameter, size_table
+from blaubergvento_client.simulator.virtual_device import VirtualDevice
+
+pytest.importorskip("numpy")
+
+from blaubergvento_client.protocol_client.batch_decoding import MAX_VALUE_SIZE, decode_packets  # noqa: E402
+
+# Parameter numbers no device knows, which are answered as not supported
+UNKNOWN_PARAMETERS = [0x03, 0x04, 0x05, 0x30]
+
+
+def _mixed_packets(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    devices = [VirtualDevice(f"SIM{index:013d}") for index in range(20)] + [VirtualDevice("SHORT", "")]
+    for device in devices:
+        device.values[Parameter.CURRENT_HUMIDITY] = bytes([rng.randrange(100)])
+        device.values[Parameter.FILTER_TIMER] = bytes([rng.randrange(60), rng.randrange(24), rng.randrange(200)])
+    known = list(devices[0].values)
+
+    packets = []
+    for _ in range(count):
+        device = rng.choice(devices)
+        parameters = rng.sample(known, rng.randint(1, 6))
+        if rng.random() < 0.2:
+            parameters.append(rng.choice(UNKNOWN_PARAMETERS))
+        if rng.random() < 0.1:
+            request = Packet(device.id, device.password, FunctionType.READ, [DataEntry.of(p) for p in parameters])
+            data = request.to_bytes()
+        else:
+            data = device.respond(parameters).to_bytes()
+
+        damage = rng.random()
+        if damage < 0.05:
+            # Bad checksum
+            data = data[:-2] + bytes([data[-2] ^ 0xFF, data[-1]])
+        elif damage < 0.1:
+            data = data[:rng.randrange(len(data))]
+        elif damage < 0.12:
+            data = bytes(rng.randrange(256) for _ in range(rng.randrange(30)))
+        packets.append(data)
+    return packets
+
+
+def _decode_scalar(packets, times):
+    rows = []
+    rejected = 0
+    for data, timestamp in zip(packets, times):
+        try:
+            packet = Packet.from_bytes(data)
+        except (ValueError, IndexError):
+            rejected += 1
+            continue
+        if packet.function_type != FunctionType.RESPONSE:
+            rejected += 1
+            continue
+        for entry in packet.data_entries:
+            # Values of size 0, e.g. an empty Wi-Fi password, are decoded as None
+            value = bytes(entry.value or b"")
+            if not 0 < len(value) <= MAX_VALUE_SIZE:
+                continue
+            if entry.parameter == Parameter.FILTER_TIMER and len(value) == size_table[Parameter.FILTER_TIMER]:
+                number = value[0] + (value[2] * 24 + value[1]) * 60
+            else:
+                number = int.from_bytes(value, "little")
+            rows.append((timestamp, packet.device_id, int(entry.parameter), number))
+    return sorted(rows), rejected
+
+
+def test_vectorized_decoding_matches_packet_decoding():
+    packets = _mixed_packets(3000)
+    times = [float(index) for index in range(len(packets))]
+    expected, expected_rejected = _decode_scalar(packets, times)
+
+    series = decode_packets(packets, times, parameters=None)
+
+    rows = sorted(zip(series.timestamp.tolist(), series.device_id.tolist(), series.parameter.tolist(),
+                      series.value.tolist()))
+    assert rows == expected
+    assert series.rejected == expected_rejected
+    assert expected_rejected > 0
+
+
+@pytest.mark.parametrize("parameters", [[Parameter.CURRENT_HUMIDITY], [Parameter.FILTER_TIMER, Parameter.FAN1RPM]])
+def test_vectorized_decoding_of_selected_parameters_matches_packet_decoding(parameters):
+    packets = _mixed_packets(500, seed=11)
+    times = [float(index) for index in range(len(packets))]
+    expected, _ = _decode_scalar(packets, times)
+    wanted = {int(p) for p in parameters}
+
+    series = decode_packets(packets, times, parameters)
+
+    rows = sorted(zip(series.timestamp.tolist(), series.device_id.tolist(), series.parameter.tolist(),
+                      series.value.tolist()))
+    assert rows == [row for row in expected if row[2] in wanted]
@@ -0,0 +1,76 @@
+import os
+
+from blaubergvento_client.protocol_client.capture_log import FILE_HEADER, RECORD_HEADER, CaptureLog
+from blaubergvento_client.protocol_client.capture_reader import CaptureReader
+from blaubergvento_client.protocol_client.capture_record import RECEIVED, SENT
+
+MAX_BYTES = 200
+
+
+def _records(count: int):
+    return [
+        (1700000000.0 + index * 0.25, SENT if index % 2 == 0 else RECEIVED, f"192.168.1.{index % 250}",
+         bytes([index % 256]) * (1 + index % 40))
+        for index in range(count)
+    ]
+
+
+def _read(path: str):
+    with CaptureReader(path) as reader:
+        return [(r.timestamp, r.direction, r.ip, bytes(r.data)) for r in reader]
+
+
+def test_rotated_segments_read_back_every_record(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    written = _records(60)
+    with CaptureLog(path, max_bytes=MAX_BYTES, backup_count=100) as log:
+        for timestamp, direction, ip, data in written:
+            log.record(data, ip, direction, timestamp)
+
+    segments = [path]
+    while os.path.exists(f"{path}.{len(segments)}"):
+        segments.append(f"{path}.{len(segments)}")
+    assert len(segments) > 2
+    for segment in segments:
+        # A record only exceeds max_bytes if it is the first one of its file
+        size = os.path.getsize(segment)
+        assert size <= MAX_BYTES or len(_read(segment)) == 1
+
+    # The highest number is the oldest file
+    read = [record for segment in reversed(segments) for record in _read(segment)]
+    assert read == written
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    written = _records(60)
+    with CaptureLog(path, max_bytes=MAX_BYTES, backup_count=2) as log:
+        for timestamp, direction, ip, data in written:
+            log.record(data, ip, direction, timestamp)
+
+    assert os.path.exists(f"{path}.2")
+    assert not os.path.exists(f"{path}.3")
+    read = [record for segment in (f"{path}.2", f"{path}.1", path) for record in _read(segment)]
+    assert read == written[-len(read):]
+
+
+def test_reopened_log_appends_and_truncated_records_end_iteration(tmp_path):
+    path = str(tmp_path / "capture.bin")
+    written = _records(3)
+    with CaptureLog(path) as log:
+        log.sent(written[0][3], written[0][2])
+    with CaptureLog(path) as log:
+        log.received(written[1][3], written[1][2])
+
+    with open(path, "rb") as f:
+        content = f.read()
+    assert content.startswith(FILE_HEADER) and content.count(FILE_HEADER) == 1
+    # Cut the last record short, as if the writer was still running
+    with open(path, "ab") as f:
+        f.write(RECORD_HEADER.pack(0.0, SENT, bytes(4), 10) + b"abc")
+
+    read = _read(path)
+    assert [(direction, ip, data) for _, direction, ip, data in read] == [
+        (SENT, written[0][2], written[0][3]),
+        (RECEIVED, written[1][2], written[1][3]),
+    ]
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.client.read_cache import ReadCache
+from blaubergvento_client.client.speed import Speed
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.simulator import Simulator
+
+
+def test_apply_by_id_reports_the_state_read_back():
+    async def run():
+        simulator = Simulator.create(3, seed=1, latency=0.005)
+        await simulator.start("127.0.0.1", 0)
+        host, port = simulator.address
+        protocol = ProtocolClient(broadcast_address=host, port=port)
+        client = Client(client=protocol)
+        try:
+            device_ids = [device.id for device in await client.find_all()]
+            results = await client.apply(device_ids, speed=Speed.HIGH)
+            assert all(result.success for result in results)
+            for result in results:
+                assert result.device.speed == Speed.HIGH
+                assert result.device.mode is not None
+                assert result.device.firmware_version is not None
+        finally:
+            protocol.close()
+            simulator.close()
+
+    asyncio.run(run())
+
+
+def test_subscribe_rejects_unknown_fields():
+    async def run():
+        client = Client()
+        try:
+            with pytest.raises(ValueError, match="humdity"):
+                async for _ in client.subscribe(["humidity", "humdity"]):
+                    pass
+        finally:
+            client.client.close()
+
+    asyncio.run(run())
+
+
+def test_reads_overlapping_a_save_do_not_cache_old_values():
+    async def run():
+        simulator = Simulator.create(1, seed=1, latency=0.02)
+        await simulator.start("127.0.0.1", 0)
+        host, port = simulator.address
+        protocol = ProtocolClient(broadcast_address=host, port=port)
+        client = Client(client=protocol, cache=ReadCache({Parameter.SPEED: 3600.0}))
+        try:
+            device = (await client.find_all())[0]
+            old = device.speed
+            new = Speed.LOW if old != Speed.LOW else Speed.HIGH
+            device.speed = new
+
+            async def save():
+                await asyncio.sleep(0.005)
+                return await client.save(device)
+
+            async def read_during_save():
+                await asyncio.sleep(0.01)
+                return await client.read_parameters(device.id, [Parameter.SPEED])
+
+            # The first read is answered with the speed from before the save, and the second must not join it
+            before, saved, during = await asyncio.gather(
+                client.read_parameters(device.id, [Parameter.SPEED], cached=False),
+                save(),
+                read_during_save()
+            )
+            assert before.packet.data_entries[0].value == bytes([old])
+            assert saved is device
+            assert during.packet.data_entries[0].value == bytes([new])
+
+            after = await client.read_parameters(device.id, [Parameter.SPEED])
+            assert after.packet.data_entries[0].value == bytes([new])
+        finally:
+            protocol.close()
+            simulator.close()
+
+    asyncio.run(run())
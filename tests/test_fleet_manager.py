@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.client.fleet_manager import FleetManager
+
+
+def test_failed_syncs_are_logged_and_retried(caplog):
+    async def run():
+        manager = FleetManager(workers=1, client=Client(), sync_interval=0.01)
+        calls = []
+
+        async def sync():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise OSError("Network is unreachable")
+
+        manager.sync = sync
+        task = asyncio.ensure_future(manager._run())
+        try:
+            await asyncio.sleep(0.1)
+            assert not task.done()
+            assert len(calls) > 1
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            manager.client.client.close()
+
+    with caplog.at_level(logging.ERROR, logger="blaubergvento_client.client.fleet_manager"):
+        asyncio.run(run())
+    assert "Failed to sync the fleet" in caplog.text
@@ -0,0 +1,21 @@
+from blaubergvento_client.client.device import Device
+from blaubergvento_client.client.fleet_snapshot import FleetSnapshot
+
+
+def _device(device_id: str, humidity: int) -> Device:
+    device = Device(device_id, "")
+    device.humidity = humidity
+    return device
+
+
+def test_columns_do_not_block_adding_devices():
+    snapshot = FleetSnapshot.from_devices([_device("a", 40), _device("b", 75)])
+    column = snapshot.column("humidity")
+
+    # The column is a copy, so the snapshot can grow while the caller holds it
+    snapshot.update(_device("c", 80))
+    snapshot.update(_device("a", 50))
+
+    assert list(column) == [40, 75]
+    assert list(snapshot.column("humidity")) == [50, 75, 80]
+    assert snapshot.where("humidity", ">", 60) == ["b", "c"]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.client.poller import Poller
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.simulator import Simulator
+
+
+def test_iteration_raises_when_the_scheduler_fails():
+    async def run():
+        client = Client()
+
+        async def fail():
+            raise OSError("Network is unreachable")
+
+        client.device_addresses = fail
+        try:
+            with pytest.raises(OSError, match="unreachable"):
+                await asyncio.wait_for(_first(Poller(client)), 3.0)
+        finally:
+            client.client.close()
+
+    asyncio.run(run())
+
+
+def test_empty_intervals_are_rejected():
+    with pytest.raises(ValueError):
+        Poller(Client(), intervals={})
+
+
+def test_iteration_yields_polled_values():
+    async def run():
+        simulator = Simulator.create(2, seed=1, latency=0.005)
+        await simulator.start("127.0.0.1", 0)
+        host, port = simulator.address
+        protocol = ProtocolClient(broadcast_address=host, port=port)
+        poller = Poller(Client(client=protocol), intervals={Parameter.CURRENT_HUMIDITY: 0.05})
+        try:
+            async with poller:
+                result = await asyncio.wait_for(_first(poller), 3.0)
+            assert [entry.parameter for entry in result.entries] == [Parameter.CURRENT_HUMIDITY]
+            assert result.device.humidity is not None
+        finally:
+            protocol.close()
+            simulator.close()
+
+    asyncio.run(run())
+
+
+async def _first(poller: Poller):
+    async for result in poller:
+        return result
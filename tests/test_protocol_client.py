@@ -0,0 +1,32 @@
+import asyncio
+from collections import Counter
+
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.simulator import Simulator
+
+DEVICE_ID = "SIM0000000000000"
+
+
+def test_split_reads_are_merged_without_duplicates_and_report_missing_parameters():
+    async def run():
+        simulator = Simulator.create(1, loss=0.15, latency=0.002, jitter=0.004, seed=7)
+        await simulator.start("127.0.0.1", 0)
+        host, port = simulator.address
+        client = ProtocolClient(broadcast_address=host, port=port, retries=4)
+        requested = set(Parameter) - {Parameter.SEARCH, Parameter.PASSWORD}
+        try:
+            for _ in range(40):
+                response = await client.read_parameters(DEVICE_ID, "1111", requested, host)
+                if response is None:
+                    continue
+                received = [e.parameter for e in response.packet.data_entries]
+                received += response.packet.unsupported_parameters
+                assert not [p for p, count in Counter(received).items() if count > 1]
+                assert set(received) | set(response.missing) == requested
+                assert not set(received) & set(response.missing)
+        finally:
+            client.close()
+            simulator.close()
+
+    asyncio.run(run())
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from blaubergvento_client.protocol_client import rate_limiter as rate_limiter_module
+from blaubergvento_client.protocol_client.rate_limiter import RateLimiter
+from blaubergvento_client.protocol_client.token_bucket import TokenBucket
+
+IP = "192.168.1.10"
+
+
+class _Clock:
+    """Stands in for the event loop, whose time is all the limiter reads outside of acquire()."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiter_module.asyncio, "get_running_loop", lambda: clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_spaces_packets_at_the_rate():
+    bucket = TokenBucket(10.0, burst=3.0)
+    assert [bucket.reserve(0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve(0.0) == pytest.approx(0.1)
+    assert bucket.reserve(0.0) == pytest.approx(0.2)
+
+    # Tokens accumulate at the rate, up to the burst
+    assert bucket.reserve(0.35) == pytest.approx(0.0)
+    assert [bucket.reserve(10.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve(10.0) == pytest.approx(0.1)
+
+
+def test_bucket_burst_defaults_to_one_second_of_tokens():
+    assert TokenBucket(20.0).burst == 20.0
+    assert TokenBucket(0.5).burst == 1.0
+
+
+def test_refunded_tokens_go_to_the_next_packet():
+    bucket = TokenBucket(10.0, burst=1.0)
+    bucket.reserve(0.0)
+    assert bucket.reserve(0.0) == pytest.approx(0.1)
+    bucket.refund(0.0)
+    assert bucket.reserve(0.0) == pytest.approx(0.1)
+
+
+def test_timeouts_decrease_the_rates_once_per_round(clock):
+    limiter = RateLimiter(rate=100.0, device_rate=10.0, aimd=True, min_rate=2.0)
+
+    clock.now = 1.0
+    limiter.on_timeout(IP, sent_at=0.5)
+    assert limiter.current_rate(IP) == pytest.approx(5.0)
+    assert limiter.current_rate() == pytest.approx(50.0)
+
+    # Sent before the decrease, so caused by the old rate
+    clock.now = 1.1
+    limiter.on_timeout(IP, sent_at=0.9)
+    assert limiter.current_rate(IP) == pytest.approx(5.0)
+
+    clock.now = 2.0
+    limiter.on_timeout(IP, sent_at=1.5)
+    assert limiter.current_rate(IP) == pytest.approx(2.5)
+    clock.now = 3.0
+    limiter.on_timeout(IP, sent_at=2.5)
+    assert limiter.current_rate(IP) == pytest.approx(2.0)
+
+
+def test_responses_recover_the_rates_up_to_the_configured_rate(clock):
+    limiter = RateLimiter(device_rate=10.0, aimd=True, increase=1.0)
+    clock.now = 1.0
+    limiter.on_timeout(IP, sent_at=0.5)
+    assert limiter.current_rate(IP) == pytest.approx(5.0)
+
+    # Each response adds increase / rate, so a second's worth of responses adds about `increase`
+    rates = []
+    for _ in range(5):
+        clock.now += 0.2
+        limiter.on_response(IP)
+        rates.append(limiter.current_rate(IP))
+    assert rates == sorted(rates)
+    assert rates[-1] == pytest.approx(6.0, abs=0.1)
+
+    for _ in range(200):
+        limiter.on_response(IP)
+    assert limiter.current_rate(IP) == 10.0
+
+
+def test_unreachable_devices_do_not_slow_down_the_fleet(clock):
+    limiter = RateLimiter(rate=100.0, device_rate=10.0, aimd=True, min_rate=1.0)
+    # A round of timeouts decreases the total rate once, until the device's loss shows it is unreachable
+    clock.now = 1.0
+    for _ in range(11):
+        limiter.on_timeout(IP, sent_at=0.5)
+    assert limiter.current_rate() == pytest.approx(50.0)
+
+    for index in range(5):
+        clock.now = 2.0 + index
+        limiter.on_timeout(IP, sent_at=clock.now - 0.5)
+    assert limiter.current_rate(IP) == 1.0
+    assert limiter.current_rate() == pytest.approx(50.0)
+
+
+def test_without_aimd_the_rates_stay_fixed(clock):
+    limiter = RateLimiter(rate=100.0, device_rate=10.0)
+    limiter.on_timeout(IP, sent_at=0.0)
+    limiter.on_response(IP)
+    assert limiter.current_rate(IP) == 10.0
+    assert limiter.current_rate() == 100.0
+
+
+def test_cancelled_waits_give_their_tokens_back():
+    async def run():
+        limiter = RateLimiter(device_rate=10.0, device_burst=1.0)
+        await limiter.acquire(IP)
+        waiters = [asyncio.ensure_future(limiter.acquire(IP)) for _ in range(5)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        # Without the refunds, the next packet would wait behind the five cancelled ones
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        await limiter.acquire(IP)
+        assert loop.time() - started_at < 0.2
+
+    asyncio.run(run())
@@ -0,0 +1,29 @@
+from blaubergvento_client.client.read_cache import ReadCache
+from blaubergvento_client.protocol_client.data_entry import DataEntry
+from blaubergvento_client.protocol_client.parameter import Parameter
+
+
+def test_values_read_before_an_invalidation_are_dropped():
+    cache = ReadCache({Parameter.SPEED: 60.0})
+    generation = cache.generation("a")
+    other = cache.generation("b")
+    cache.invalidate("a")
+
+    cache.put("a", [DataEntry(Parameter.SPEED, bytes([1]))], generation)
+    cache.put("b", [DataEntry(Parameter.SPEED, bytes([2]))], other)
+    assert cache.get("a", Parameter.SPEED) is None
+    assert cache.get("b", Parameter.SPEED).value == bytes([2])
+
+    cache.put("a", [DataEntry(Parameter.SPEED, bytes([3]))], cache.generation("a"))
+    assert cache.get("a", Parameter.SPEED).value == bytes([3])
+
+
+def test_invalidating_all_devices_drops_every_older_read():
+    cache = ReadCache({Parameter.SPEED: 60.0})
+    cache.invalidate("a")
+    generations = {device_id: cache.generation(device_id) for device_id in ("a", "b")}
+    cache.invalidate()
+
+    for device_id, generation in generations.items():
+        cache.put(device_id, [DataEntry(Parameter.SPEED, bytes([1]))], generation)
+    assert len(cache) == 0
@@ -0,0 +1,113 @@
+import json
+
+from blaubergvento_client.client import registry as registry_module
+from blaubergvento_client.client.registry import DeviceRegistry
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _patch_time(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(registry_module.time, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = _patch_time(monkeypatch)
+    registry = DeviceRegistry(ttl=60.0)
+    assert registry.is_stale()
+    registry.put("a", "10.0.0.1")
+    clock.now += 30.0
+    registry.put("b", "10.0.0.2")
+    assert not registry.is_stale()
+
+    clock.now += 31.0
+    assert registry.get("a") is None
+    assert registry.get("b") == "10.0.0.2"
+    assert registry.items() == [("b", "10.0.0.2")]
+    assert registry.is_stale()
+    assert registry.confirmed_at("a") == 1000.0
+
+    # Confirming the same address again restarts its time to live
+    assert not registry.put("b", "10.0.0.2")
+    clock.now += 59.0
+    assert registry.get("b") == "10.0.0.2"
+
+
+def test_prune_removes_only_expired_entries(monkeypatch):
+    clock = _patch_time(monkeypatch)
+    registry = DeviceRegistry(ttl=60.0)
+    registry.put("a", "10.0.0.1")
+    clock.now += 61.0
+    registry.put("b", "10.0.0.2")
+
+    assert registry.prune() == ["a"]
+    assert "a" not in registry
+    assert len(registry) == 1
+    assert not registry.is_stale()
+    assert registry.prune() == []
+
+
+def test_entries_without_ttl_never_expire(monkeypatch):
+    clock = _patch_time(monkeypatch)
+    registry = DeviceRegistry(ttl=None)
+    registry.put("a", "10.0.0.1")
+    clock.now += 1e9
+    assert registry.get("a") == "10.0.0.1"
+    assert registry.prune() == []
+
+
+def test_save_and_load_round_trip(monkeypatch, tmp_path):
+    clock = _patch_time(monkeypatch)
+    path = tmp_path / "registry.json"
+    registry = DeviceRegistry(ttl=60.0, path=str(path))
+    registry.put("a", "10.0.0.1")
+    clock.now += 10.0
+    registry.put("b", "10.0.0.2")
+    registry.save()
+
+    assert json.loads(path.read_text())["devices"]["b"] == {"ip": "10.0.0.2", "updated": 1010.0}
+    assert not (tmp_path / "registry.json.tmp").exists()
+
+    loaded = DeviceRegistry(ttl=60.0, path=str(path))
+    assert loaded.items() == [("a", "10.0.0.1"), ("b", "10.0.0.2")]
+    assert loaded.confirmed_at("a") == 1000.0
+
+    # The entries keep the time they were confirmed, so they expire as if the process had not restarted
+    clock.now += 55.0
+    assert loaded.get("a") is None
+    assert loaded.get("b") == "10.0.0.2"
+
+
+def test_save_replaces_the_snapshot_atomically(monkeypatch, tmp_path):
+    _patch_time(monkeypatch)
+    path = tmp_path / "registry.json"
+    registry = DeviceRegistry(path=str(path))
+    registry.put("a", "10.0.0.1")
+    registry.save()
+
+    replaced = []
+    original = registry_module.os.replace
+
+    def replace(src, dst):
+        replaced.append((src, dst))
+        original(src, dst)
+
+    monkeypatch.setattr(registry_module.os, "replace", replace)
+    registry.put("b", "10.0.0.2")
+    registry.save()
+
+    assert replaced == [(f"{path}.tmp", str(path))]
+    assert set(json.loads(path.read_text())["devices"]) == {"a", "b"}
+
+
+def test_load_without_snapshot_keeps_the_registry_empty(tmp_path):
+    registry = DeviceRegistry(path=str(tmp_path / "missing.json"))
+    assert len(registry) == 0
+    assert registry.is_stale()
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.client.read_cache import ReadCache
+from blaubergvento_client.client.speed import Speed
+from blaubergvento_client.client.sync_client import SyncClient
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.simulator import Simulator
+
+
+@pytest.fixture
+def simulator():
+    # The simulator runs on its own event loop thread, so the test itself is plain blocking code
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    simulator = Simulator.create(3, seed=1, latency=0.005)
+    asyncio.run_coroutine_threadsafe(simulator.start("127.0.0.1", 0), loop).result()
+    yield simulator
+    loop.call_soon_threadsafe(simulator.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def _client(simulator: Simulator, **kwargs) -> SyncClient:
+    host, port = simulator.address
+    return SyncClient(Client(client=ProtocolClient(broadcast_address=host, port=port), **kwargs))
+
+
+def test_find_all_and_save_from_a_plain_thread(simulator):
+    client = _client(simulator)
+    try:
+        devices = client.find_all()
+        assert sorted(device.id for device in devices) == sorted(simulator.devices)
+
+        device = devices[0]
+        device.speed = Speed.HIGH
+        assert client.save(device) is device
+        assert not device.dirty_fields
+        assert client.find_by_id(device.id).speed == Speed.HIGH
+    finally:
+        client.close()
+
+    assert not client._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        client.find_all()
+
+
+def test_read_parameters_can_bypass_the_cache(simulator):
+    client = _client(simulator, cache=ReadCache({Parameter.CURRENT_HUMIDITY: 3600.0}))
+    try:
+        device_id = client.find_all()[0].id
+        first = client.read_parameters(device_id, [Parameter.CURRENT_HUMIDITY])
+        assert first.packet.data_entries[0].value == bytes([45])
+
+        simulator.devices[device_id].values[Parameter.CURRENT_HUMIDITY] = bytes([70])
+        cached = client.read_parameters(device_id, [Parameter.CURRENT_HUMIDITY])
+        fresh = client.read_parameters(device_id, [Parameter.CURRENT_HUMIDITY], cached=False)
+        assert cached.packet.data_entries[0].value == bytes([45])
+        assert fresh.packet.data_entries[0].value == bytes([70])
+    finally:
+        client.close()
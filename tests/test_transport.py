@@ -0,0 +1,55 @@
+import asyncio
+
+from blaubergvento_client.client.client import Client
+from blaubergvento_client.protocol_client.client import ProtocolClient
+from blaubergvento_client.protocol_client.parameter import Parameter
+from blaubergvento_client.simulator import Simulator
+
+DEVICE_ID = "SIM0000000000000"
+
+
+async def _start(count: int = 1, **kwargs):
+    simulator = Simulator.create(count, seed=1, **kwargs)
+    await simulator.start("127.0.0.1", 0)
+    host, port = simulator.address
+    return simulator, ProtocolClient(broadcast_address=host, port=port)
+
+
+def test_concurrent_requests_to_one_device_get_their_own_responses():
+    async def run():
+        simulator, protocol = await _start(latency=0.005, jitter=0.005)
+        client = Client(client=protocol)
+        await client.find_all()
+        try:
+            for _ in range(50):
+                device, response = await asyncio.gather(
+                    client.find_by_id(DEVICE_ID),
+                    client.read_parameters(DEVICE_ID, [Parameter.CURRENT_HUMIDITY], cached=False)
+                )
+                assert device.speed is not None
+                assert device.firmware_version is not None
+                assert [e.parameter for e in response.packet.data_entries] == [Parameter.CURRENT_HUMIDITY]
+        finally:
+            protocol.close()
+            simulator.close()
+
+    asyncio.run(run())
+
+
+def test_search_replies_do_not_answer_reads():
+    async def run():
+        simulator, protocol = await _start(20, latency=0.005)
+        client = Client(client=protocol)
+        await client.find_all()
+        device_ids = [device_id for device_id, _ in client.registry.items()]
+        try:
+            _, *devices = await asyncio.gather(
+                protocol.find_devices(),
+                *(client.find_by_id(device_id) for device_id in device_ids)
+            )
+            assert all(device.firmware_version is not None for device in devices)
+        finally:
+            protocol.close()
+            simulator.close()
+
+    asyncio.run(run())